@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .catalog import fire_year
+from .stats import SEVERITY_CLASSES
+
+
+GROUP_DIMENSIONS = ("state", "year", "region")
+
+# Burned acres per dnbr6 class, e.g. "highAcres", from /api/fires/{id}/stats.
+SEVERITY_METRICS = {f"{key}Acres": key for key, _ in SEVERITY_CLASSES.values()}
+METRICS: Tuple[str, ...] = (
+  "fires",
+  "acres",
+  "mappedFires",
+  "mappedAcres",
+  *SEVERITY_METRICS,
+  "highSeverityPatches",
+)
+METRIC_POSITIONS = {name: position for position, name in enumerate(METRICS)}
+
+GroupKey = Tuple
+# One tuple per subset of GROUP_DIMENSIONS, in GROUP_DIMENSIONS order.
+GROUPINGS: Tuple[Tuple[str, ...], ...] = tuple(
+  grouping
+  for size in range(len(GROUP_DIMENSIONS) + 1)
+  for grouping in combinations(GROUP_DIMENSIONS, size)
+)
+
+
+class Contribution(NamedTuple):
+  """What one fire adds to every roll-up: its group values and metric vector."""
+  dimensions: Dict[str, object]
+  values: Tuple[float, ...]
+
+
+def fire_contribution(fire: Dict, stats: Optional[Dict]) -> Contribution:
+  dimensions = {"state": fire.get("state"), "year": fire_year(fire), "region": fire.get("region")}
+  values = dict.fromkeys(METRICS, 0.0)
+  values["fires"] = 1
+  values["acres"] = fire.get("acres") or 0
+  if stats:
+    values["mappedFires"] = 1
+    values["mappedAcres"] = stats["mappedAcres"]
+    severity = {entry["key"]: entry["acres"] for entry in stats["severity"]}
+    for metric, key in SEVERITY_METRICS.items():
+      values[metric] = severity.get(key, 0.0)
+    values["highSeverityPatches"] = stats["highSeverityPatches"]
+  return Contribution(dimensions, tuple(float(values[name]) for name in METRICS))
+
+
+class RollupStore:
+  """
+  Materialized sums of METRICS for every grouping of GROUP_DIMENSIONS.
+
+  Each fire's contribution is remembered, so adding, changing or removing a
+  fire subtracts its old vector from and adds its new one to one row per
+  grouping; nothing is recomputed from the rest of the catalog. Reads pick a
+  precomputed table by its grouping, so their cost depends only on the
+  number of groups returned. `version` changes whenever any row does.
+  """
+
+  def __init__(self):
+    self.tables: Dict[Tuple[str, ...], Dict[GroupKey, List[float]]] = {grouping: {} for grouping in GROUPINGS}
+    self.contributions: Dict[str, Contribution] = {}
+    self.version = 0
+    self.synced = False
+    self._lock = threading.Lock()
+
+  def _apply(self, contribution: Contribution, sign: int) -> None:
+    fires = METRIC_POSITIONS["fires"]
+    for grouping, table in self.tables.items():
+      key = tuple(contribution.dimensions[dimension] for dimension in grouping)
+      row = table.get(key)
+      if row is None:
+        row = table[key] = [0.0] * len(METRICS)
+      for position, value in enumerate(contribution.values):
+        row[position] += sign * value
+      if row[fires] <= 0:
+        del table[key]
+
+  def update(self, fire_id: str, contribution: Optional[Contribution]) -> bool:
+    """Replaces one fire's contribution (None removes it); returns whether anything changed."""
+    with self._lock:
+      previous = self.contributions.get(fire_id)
+      if previous == contribution:
+        return False
+      if previous is not None:
+        self._apply(previous, -1)
+        del self.contributions[fire_id]
+      if contribution is not None:
+        self._apply(contribution, 1)
+        self.contributions[fire_id] = contribution
+      self.version += 1
+      return True
+
+  def sync(self, fires: Iterable[Dict], stats_for: Callable[[Dict], Optional[Dict]]) -> int:
+    """
+    Brings the roll-ups in line with `fires`. Stats are memoized per raster
+    version, so unchanged fires cost a lookup and leave the tables alone.
+    Returns the number of fires whose contribution changed.
+    """
+    changed = 0
+    seen = set()
+    for fire in fires:
+      seen.add(fire["id"])
+      changed += self.update(fire["id"], fire_contribution(fire, stats_for(fire)))
+    for fire_id in set(self.contributions) - seen:
+      changed += self.update(fire_id, None)
+    self.synced = True
+    return changed
+
+  def query(self, group_by: Sequence[str], metrics: Sequence[str]) -> Tuple[int, List[Dict]]:
+    """(version, rows) for one grouping, rows sorted by the `group_by` values."""
+    grouping = tuple(dimension for dimension in GROUP_DIMENSIONS if dimension in group_by)
+    positions = [METRIC_POSITIONS[metric] for metric in metrics]
+    with self._lock:
+      version = self.version
+      table = [(key, [row[position] for position in positions]) for key, row in self.tables[grouping].items()]
+
+    rows = []
+    for key, values in table:
+      groups = dict(zip(grouping, key))
+      rows.append({
+        **{dimension: groups[dimension] for dimension in group_by},
+        **{metric: _round(metric, value) for metric, value in zip(metrics, values)},
+      })
+    # Groups with an unknown value (e.g. undated fires) sort last.
+    rows.sort(key=lambda row: tuple((row[dimension] is None, row[dimension] if row[dimension] is not None else 0) for dimension in group_by))
+    return version, rows
+
+
+def _round(metric: str, value: float):
+  if metric in ("fires", "mappedFires", "highSeverityPatches"):
+    return int(round(value))
+  return round(value, 1)
@@ -0,0 +1,306 @@
+"""
+Load and latency benchmarks for the API routes.
+
+Drives the FastAPI app in-process (httpx over ASGI, no sockets) and/or
+through a local uvicorn subprocess, at one or more concurrency levels, and
+records throughput, p50/p95/p99 latency, bytes per response and peak RSS
+per case. Results are written as JSON; pass a saved result as --baseline to
+flag regressions. Run from the project root:
+
+  python -m backend.bench --output bench.json
+  python -m backend.bench --mode uvicorn --concurrency 1,16 --requests 500
+  python -m backend.bench --baseline bench.json --output bench-new.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_FIRE = "canyon-fire-2016"
+QUESTIONS = ["What caused the fire?", "How severe was the damage?", "When did it start?", "Where did it burn?", "How is recovery going?"]
+
+# Relative change past which a comparison is flagged.
+DEFAULT_THRESHOLD = 0.10
+
+
+def _scenario_path(rng: random.Random) -> str:
+  # Slider scrubbing: revisits a small set of positions, like a real session.
+  return (
+    f"/api/scenario?fireId={BENCH_FIRE}&timeline={rng.randrange(5)}"
+    f"&priorityCommunity={rng.choice((40, 55, 70, 85))}&priorityWatershed={rng.choice((40, 55, 70))}"
+    f"&priorityInfrastructure={rng.choice((45, 60, 75))}"
+  )
+
+
+def _ask_path(rng: random.Random) -> str:
+  return f"/api/ask?fireId={BENCH_FIRE}&question={rng.choice(QUESTIONS).replace(' ', '+').replace('?', '%3F')}"
+
+
+# Case name -> path generator; each request draws its own path.
+CASES: Dict[str, Callable[[random.Random], str]] = {
+  "fires": lambda rng: "/api/fires",
+  "scenario": _scenario_path,
+  "ask": _ask_path,
+  "health": lambda rng: "/api/health",
+  "burn-severity.tif": lambda rng: f"/api/burn-severity/{BENCH_FIRE}.tif",
+  "reburn-risk.tif": lambda rng: f"/api/reburn-risk/{BENCH_FIRE}.tif",
+  "best-next-steps.tif": lambda rng: f"/api/best-next-steps/{BENCH_FIRE}.tif",
+}
+
+
+def peak_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+  """High-water RSS of `pid` (default: this process)."""
+  if pid is not None:
+    try:
+      with open(f"/proc/{pid}/status") as handle:
+        for line in handle:
+          if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    except OSError:
+      return None
+    return None
+  usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Kilobytes on Linux, bytes on macOS
+  return usage if sys.platform == "darwin" else usage * 1024
+
+
+def summarize(latencies: List[float], sizes: List[int], statuses: Dict[int, int], elapsed: float) -> Dict:
+  values = np.array(latencies) * 1000.0
+  ok = sum(count for status, count in statuses.items() if 0 < status < 400)
+  return {
+    "requests": len(latencies),
+    "errors": len(latencies) - ok,
+    "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    "seconds": round(elapsed, 4),
+    "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+    "latencyMs": {
+      "mean": round(float(values.mean()), 3),
+      "p50": round(float(np.percentile(values, 50)), 3),
+      "p95": round(float(np.percentile(values, 95)), 3),
+      "p99": round(float(np.percentile(values, 99)), 3),
+      "max": round(float(values.max()), 3),
+    },
+    "bytesPerResponse": round(sum(sizes) / len(sizes), 1),
+    "totalBytes": sum(sizes),
+  }
+
+
+async def _fetch(client: httpx.AsyncClient, path: str) -> Tuple[int, int]:
+  """(status, body bytes); status 0 when the connection failed."""
+  try:
+    response = await client.get(path)
+  except httpx.TransportError:
+    return 0, 0
+  return response.status_code, len(response.content)
+
+
+async def run_case(client: httpx.AsyncClient, case: str, requests: int, concurrency: int, warmup: int, seed: int) -> Dict:
+  rng = random.Random(f"{seed}:{case}")
+  paths = [CASES[case](rng) for _ in range(warmup + requests)]
+  for path in paths[:warmup]:
+    await _fetch(client, path)
+
+  latencies: List[float] = []
+  sizes: List[int] = []
+  statuses: Dict[int, int] = {}
+  pending = iter(paths[warmup:])
+
+  async def worker() -> None:
+    for path in pending:
+      start = time.perf_counter()
+      status, size = await _fetch(client, path)
+      latencies.append(time.perf_counter() - start)
+      sizes.append(size)
+      statuses[status] = statuses.get(status, 0) + 1
+
+  start = time.perf_counter()
+  await asyncio.gather(*(worker() for _ in range(concurrency)))
+  return summarize(latencies, sizes, statuses, time.perf_counter() - start)
+
+
+async def run_suite(client: httpx.AsyncClient, cases: List[str], concurrencies: List[int], requests: int, warmup: int, seed: int) -> Dict[str, Dict[str, Dict]]:
+  results: Dict[str, Dict[str, Dict]] = {}
+  for case in cases:
+    results[case] = {}
+    for concurrency in concurrencies:
+      results[case][str(concurrency)] = await run_case(client, case, requests, concurrency, warmup, seed)
+      print(f"  {case:<22} c={concurrency:<4} {results[case][str(concurrency)]['throughput']:>9} req/s  p95 {results[case][str(concurrency)]['latencyMs']['p95']} ms", file=sys.stderr)
+  return results
+
+
+async def bench_in_process(cases: List[str], concurrencies: List[int], requests: int, warmup: int, seed: int) -> Dict:
+  from .main import app
+
+  # Record app errors as 500s (as uvicorn would) instead of aborting the run
+  transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+  async with app.router.lifespan_context(app):
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+      results = await run_suite(client, cases, concurrencies, requests, warmup, seed)
+  return {"cases": results, "peakRssBytes": peak_rss_bytes()}
+
+
+def _free_port() -> int:
+  with socket.socket() as sock:
+    sock.bind(("127.0.0.1", 0))
+    return sock.getsockname()[1]
+
+
+async def _wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30.0) -> None:
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    if server.poll() is not None:
+      raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+    try:
+      await client.get("/api/health")
+      return
+    except httpx.TransportError:
+      await asyncio.sleep(0.1)
+  raise RuntimeError("uvicorn did not start in time")
+
+
+async def bench_uvicorn(cases: List[str], concurrencies: List[int], requests: int, warmup: int, seed: int) -> Dict:
+  port = _free_port()
+  server = subprocess.Popen(
+    [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+    cwd=PROJECT_ROOT,
+  )
+  try:
+    limits = httpx.Limits(max_connections=max(concurrencies), max_keepalive_connections=max(concurrencies))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60.0) as client:
+      await _wait_until_up(client, server)
+      results = await run_suite(client, cases, concurrencies, requests, warmup, seed)
+    return {"cases": results, "peakRssBytes": peak_rss_bytes(server.pid)}
+  finally:
+    server.terminate()
+    try:
+      server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+      server.kill()
+
+
+def _git_commit() -> Optional[str]:
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+  """
+  One row per (mode, case, concurrency) present in both runs. A row is a
+  regression when p95 latency grew or throughput fell by more than
+  `threshold`; peak RSS is compared per mode the same way.
+  """
+  rows = []
+  for mode, result in current["modes"].items():
+    base_mode = baseline.get("modes", {}).get(mode)
+    if not base_mode:
+      continue
+    for case, by_concurrency in result["cases"].items():
+      for concurrency, stats in by_concurrency.items():
+        base = base_mode["cases"].get(case, {}).get(concurrency)
+        if not base:
+          continue
+        p95_change = stats["latencyMs"]["p95"] / base["latencyMs"]["p95"] - 1 if base["latencyMs"]["p95"] else 0.0
+        throughput_change = stats["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+        rows.append({
+          "mode": mode,
+          "case": case,
+          "concurrency": int(concurrency),
+          "p95Change": round(p95_change, 4),
+          "throughputChange": round(throughput_change, 4),
+          "regression": p95_change > threshold or throughput_change < -threshold,
+        })
+    if result.get("peakRssBytes") and base_mode.get("peakRssBytes"):
+      rss_change = result["peakRssBytes"] / base_mode["peakRssBytes"] - 1
+      rows.append({"mode": mode, "case": "peakRss", "rssChange": round(rss_change, 4), "regression": rss_change > threshold})
+  return rows
+
+
+def _print_comparison(rows: List[Dict]) -> None:
+  for row in rows:
+    flag = "REGRESSION" if row["regression"] else "ok"
+    if row["case"] == "peakRss":
+      print(f"{row['mode']:<10} {'peak RSS':<22} rss {row['rssChange']:+.1%}  {flag}", file=sys.stderr)
+    else:
+      print(
+        f"{row['mode']:<10} {row['case']:<22} c={row['concurrency']:<4} "
+        f"p95 {row['p95Change']:+.1%}  throughput {row['throughputChange']:+.1%}  {flag}",
+        file=sys.stderr,
+      )
+
+
+def _int_list(value: str) -> List[int]:
+  return [int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(description="Benchmark the TerraNova API routes.")
+  parser.add_argument("--mode", choices=("in-process", "uvicorn", "both"), default="both")
+  parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of: {', '.join(CASES)}")
+  parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="Comma-separated concurrency levels")
+  parser.add_argument("--requests", type=int, default=200, help="Measured requests per case and concurrency level")
+  parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per case and level")
+  parser.add_argument("--seed", type=int, default=0, help="Seed for the request parameter mix")
+  parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+  parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+  parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change flagged as a regression")
+  args = parser.parse_args(argv)
+
+  cases = [case for case in args.cases.split(",") if case]
+  unknown = [case for case in cases if case not in CASES]
+  if unknown:
+    parser.error(f"unknown cases: {', '.join(unknown)}")
+
+  modes = ("in-process", "uvicorn") if args.mode == "both" else (args.mode,)
+  result: Dict = {
+    "createdAt": datetime.now(timezone.utc).isoformat(),
+    "commit": _git_commit(),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "cpus": os.cpu_count(),
+    "settings": {"requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency, "seed": args.seed},
+    "modes": {},
+  }
+  runners = {"in-process": bench_in_process, "uvicorn": bench_uvicorn}
+  for mode in modes:
+    print(f"{mode}:", file=sys.stderr)
+    result["modes"][mode] = asyncio.run(runners[mode](cases, args.concurrency, args.requests, args.warmup, args.seed))
+
+  exit_code = 0
+  if args.baseline:
+    with open(args.baseline) as handle:
+      rows = compare(result, json.load(handle), args.threshold)
+    result["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+    _print_comparison(rows)
+    if any(row["regression"] for row in rows):
+      exit_code = 1
+
+  encoded = json.dumps(result, indent=2)
+  if args.output:
+    with open(args.output, "w") as handle:
+      handle.write(encoded + "\n")
+  else:
+    print(encoded)
+  return exit_code
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+# Events a subscriber may fall behind by before it is resynced with a snapshot.
+MAX_PENDING_EVENTS = 32
+
+
+class StreamEvent:
+  """One published event; encoded once per wire format, shared by all subscribers."""
+
+  def __init__(self, kind: str, seq: int, data: Dict):
+    self.kind = kind
+    self.seq = seq
+    self.data = data
+    self._json: Optional[str] = None
+
+  def _encoded(self) -> str:
+    if self._json is None:
+      self._json = json.dumps({"type": self.kind, "seq": self.seq, **self.data}, separators=(",", ":"))
+    return self._json
+
+  def sse(self) -> bytes:
+    return f"event: {self.kind}\nid: {self.seq}\ndata: {self._encoded()}\n\n".encode("utf-8")
+
+  def ndjson(self) -> bytes:
+    return (self._encoded() + "\n").encode("utf-8")
+
+
+class Channel:
+  """Subscribers of one stream key, fed by a single producer task."""
+
+  def __init__(self, key: Hashable):
+    self.key = key
+    self.seq = 0
+    self.snapshot: Optional[StreamEvent] = None
+    self.subscribers: List[asyncio.Queue] = []
+    self.task: Optional[asyncio.Task] = None
+
+  def publish(self, kind: str, data: Dict, snapshot: Optional[Dict]) -> None:
+    """
+    Sends `data` to every subscriber and remembers `snapshot` (the full state
+    after this event) for late joiners and for subscribers that fell behind.
+    A None `snapshot` means the state did not change (e.g. an error event);
+    the last one, if any, is kept.
+    """
+    self.seq += 1
+    event = StreamEvent(kind, self.seq, data)
+    if snapshot is not None:
+      self.snapshot = StreamEvent("snapshot", self.seq, snapshot)
+    for queue in self.subscribers:
+      if queue.full():
+        # Too slow to keep up with diffs: drop them and resync.
+        while not queue.empty():
+          queue.get_nowait()
+        queue.put_nowait(self.snapshot or event)
+      else:
+        queue.put_nowait(event)
+
+  def add_subscriber(self) -> asyncio.Queue:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+    if self.snapshot is not None:
+      queue.put_nowait(self.snapshot)
+    self.subscribers.append(queue)
+    return queue
+
+
+class Broadcaster:
+  """
+  Fans one producer per key out to any number of subscribers. The producer
+  starts with the first subscriber and is cancelled when the last one leaves,
+  so idle streams cost nothing.
+  """
+
+  def __init__(self):
+    self._channels: Dict[Hashable, Channel] = {}
+
+  @asynccontextmanager
+  async def subscribe(self, key: Hashable, produce: Callable[[Channel], Awaitable[None]]) -> AsyncIterator[asyncio.Queue]:
+    channel = self._channels.get(key)
+    if channel is None:
+      channel = self._channels[key] = Channel(key)
+      channel.task = asyncio.create_task(produce(channel))
+    queue = channel.add_subscriber()
+    try:
+      yield queue
+    finally:
+      channel.subscribers.remove(queue)
+      if not channel.subscribers:
+        channel.task.cancel()
+        self._channels.pop(key, None)
+
+  def subscriber_counts(self) -> Dict[Hashable, int]:
+    return {key: len(channel.subscribers) for key, channel in self._channels.items()}
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import math
+import tempfile
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi.responses import Response
+from rasterio.warp import transform_bounds
+from starlette.requests import ClientDisconnect
+
+from .composite import SEVERITY_SCORES
+from .rasters import open_dataset
+from .sampling import MISSING, WGS84, ProjectedPoints, sample_band
+from .stats import MAPPED_CLASSES, REBURN_CLASSES, SEVERITY_CLASSES, StatsKey, compute_stats
+
+
+# Rows scored per thread-pool call; bounds memory whatever the upload size.
+BATCH_ROWS = 10_000
+MAX_LINE_BYTES = 64 * 1024
+# Upload bytes kept in memory before the spool moves to a temp file.
+SPOOL_MEMORY_BYTES = 1024 * 1024
+SPOOL_READ_BYTES = 256 * 1024
+
+# Accepted column (CSV header) / field (NDJSON) names, lower-cased.
+ID_FIELDS = ("id", "row_id", "parcel", "parcel_id")
+ZIP_FIELDS = ("zip", "zipcode", "zip_code", "postal_code", "postcode")
+LAT_FIELDS = ("lat", "latitude")
+LNG_FIELDS = ("lng", "lon", "long", "longitude")
+
+ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# (fire_id, zipcode, start_date, stats key) per catalog fire; hashable so the
+# index is built once per catalog and raster version.
+RiskIndexKey = Tuple[Tuple[str, Optional[str], str, Optional[StatsKey]], ...]
+
+
+class BulkRow(NamedTuple):
+  row_id: Optional[str]
+  zipcode: Optional[str]
+  lat: Optional[float]
+  lng: Optional[float]
+  error: Optional[str]
+
+
+class RiskTarget(NamedTuple):
+  fire_id: str
+  bounds: Tuple[float, float, float, float]
+  severity: Tuple[str, int]
+  reburn: Optional[Tuple[str, int]]
+
+
+def normalize_zipcode(value) -> Optional[str]:
+  """Five-digit ZIP, so "93436-1234" and 93436 match the catalog's "93436"."""
+  if value is None:
+    return None
+  digits = str(value).strip().split("-", 1)[0]
+  return digits.zfill(5) if digits.isdigit() and len(digits) <= 5 else None
+
+
+def severity_score(stats: Dict) -> Optional[float]:
+  """Area-weighted burn severity (composite.SEVERITY_SCORES) over the mapped classes."""
+  acres = {entry["class"]: entry["acres"] for entry in stats["severity"] if entry["class"] in MAPPED_CLASSES}
+  total = sum(acres.values())
+  if not total:
+    return None
+  return round(sum(float(SEVERITY_SCORES[value]) * area for value, area in acres.items()) / total, 3)
+
+
+class RiskIndex:
+  """
+  Everything a bulk request is scored against, built once per catalog and
+  raster version: the WGS84 extents of every MTBS severity raster (points
+  are only sampled against rasters whose extent holds them) and, per ZIP
+  code, the fires recorded there with their severity summary.
+  """
+
+  def __init__(self, key: RiskIndexKey):
+    self.targets: List[RiskTarget] = []
+    self.by_zipcode: Dict[str, List[Dict]] = {}
+    # Oldest first: where extents overlap, the most recent assessment wins.
+    for fire_id, zipcode, _, stats_key in sorted(key, key=lambda entry: entry[2] or ""):
+      stats = compute_stats(stats_key) if stats_key else None
+      if zipcode:
+        self.by_zipcode.setdefault(zipcode, []).append({
+          "fireId": fire_id,
+          "severityScore": severity_score(stats) if stats else None,
+          "highRatio": stats["highRatio"] if stats else None,
+          "mappedAcres": stats["mappedAcres"] if stats else None,
+        })
+      if not stats_key:
+        continue
+      files = {product: (path, mtime_ns) for product, path, mtime_ns in stats_key}
+      dataset = open_dataset(*files["dnbr6"])
+      bounds = transform_bounds(dataset.crs, WGS84, *dataset.bounds)
+      self.targets.append(RiskTarget(fire_id, bounds, files["dnbr6"], files.get("reburn_risk")))
+    self.extents = np.array([target.bounds for target in self.targets], dtype=np.float64).reshape(-1, 4)
+
+  def sample(self, lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(target number or -1, dnbr6 class, reburn class) per point; MISSING where unknown."""
+    count = len(lats)
+    matched = np.full(count, -1, dtype=np.int32)
+    severity = np.full(count, MISSING, dtype=np.int32)
+    reburn = np.full(count, MISSING, dtype=np.int32)
+    for number, (west, south, east, north) in enumerate(self.extents):
+      candidates = np.nonzero((lngs >= west) & (lngs <= east) & (lats >= south) & (lats <= north))[0]
+      if not len(candidates):
+        continue
+      target = self.targets[number]
+      points = ProjectedPoints(lats[candidates], lngs[candidates])
+      indices, values = sample_band(*target.severity, points)
+      # Class 0 is outside the burn boundary: not this fire.
+      inside = values > 0
+      hits = candidates[indices[inside]]
+      severity[hits] = values[inside]
+      matched[hits] = number
+      # A later fire that re-matches a point must not keep the earlier one's reburn class.
+      reburn[hits] = MISSING
+      if target.reburn:
+        indices, values = sample_band(*target.reburn, ProjectedPoints(lats[hits], lngs[hits]))
+        reburn[hits[indices]] = values
+    return matched, severity, reburn
+
+
+@lru_cache(maxsize=4)
+def build_risk_index(key: RiskIndexKey) -> RiskIndex:
+  return RiskIndex(key)
+
+
+def _field_index(names: Sequence[str], aliases: Sequence[str]) -> Optional[int]:
+  for alias in aliases:
+    if alias in names:
+      return names.index(alias)
+  return None
+
+
+def _float(value) -> Optional[float]:
+  if value is None or value == "":
+    return None
+  number = float(value)
+  if not math.isfinite(number):
+    raise ValueError("coordinates must be finite")
+  return number
+
+
+def _make_row(row_id, zipcode, lat, lng) -> BulkRow:
+  try:
+    lat, lng = _float(lat), _float(lng)
+  except (TypeError, ValueError):
+    return BulkRow(None if row_id is None else str(row_id), None, None, None, "invalid lat/lng")
+  row_id = None if row_id in (None, "") else str(row_id)
+  if lat is not None and lng is not None:
+    return BulkRow(row_id, None, lat, lng, None)
+  if zipcode not in (None, ""):
+    zipcode = normalize_zipcode(zipcode)
+    if zipcode is None:
+      return BulkRow(row_id, None, None, None, "invalid ZIP code")
+    return BulkRow(row_id, zipcode, None, None, None)
+  return BulkRow(row_id, None, None, None, "row needs a ZIP code or lat and lng")
+
+
+class CsvRows:
+  """Rows of a CSV upload whose header names the ZIP and/or lat/lng columns."""
+
+  def __init__(self, header: bytes):
+    names = [name.strip().lower() for name in next(csv.reader([header.decode("utf-8-sig")]))]
+    self.id_column = _field_index(names, ID_FIELDS)
+    self.zip_column = _field_index(names, ZIP_FIELDS)
+    self.lat_column = _field_index(names, LAT_FIELDS)
+    self.lng_column = _field_index(names, LNG_FIELDS)
+    if self.zip_column is None and (self.lat_column is None or self.lng_column is None):
+      raise ValueError(f"CSV header needs a ZIP column ({', '.join(ZIP_FIELDS)}) or lat and lng columns")
+
+  def parse(self, lines: List[Optional[bytes]]) -> List[BulkRow]:
+    def cell(values: List[str], column: Optional[int]) -> Optional[str]:
+      return values[column].strip() if column is not None and column < len(values) else None
+
+    rows = []
+    for line in lines:
+      if line is None:
+        rows.append(BulkRow(None, None, None, None, "row too long"))
+        continue
+      try:
+        values = next(csv.reader([line.decode("utf-8")]))
+      except (UnicodeDecodeError, csv.Error, StopIteration):
+        rows.append(BulkRow(None, None, None, None, "unreadable CSV row"))
+        continue
+      rows.append(_make_row(
+        cell(values, self.id_column),
+        cell(values, self.zip_column),
+        cell(values, self.lat_column),
+        cell(values, self.lng_column),
+      ))
+    return rows
+
+
+class NdjsonRows:
+  """Rows of an NDJSON upload: one object per line with a ZIP field or lat/lng."""
+
+  def parse(self, lines: List[Optional[bytes]]) -> List[BulkRow]:
+    rows = []
+    for line in lines:
+      if line is None:
+        rows.append(BulkRow(None, None, None, None, "row too long"))
+        continue
+      try:
+        record = json.loads(line)
+      except ValueError:
+        rows.append(BulkRow(None, None, None, None, "invalid JSON"))
+        continue
+      if not isinstance(record, dict):
+        rows.append(BulkRow(None, None, None, None, "row must be a JSON object"))
+        continue
+      record = {str(name).lower(): value for name, value in record.items()}
+
+      def field(aliases: Sequence[str]):
+        return next((record[alias] for alias in aliases if alias in record), None)
+
+      rows.append(_make_row(field(ID_FIELDS), field(ZIP_FIELDS), field(LAT_FIELDS), field(LNG_FIELDS)))
+    return rows
+
+
+def score_rows(index: RiskIndex, parser, first_row: int, lines: List[Optional[bytes]]) -> bytes:
+  """Parses and scores one batch of raw lines; returns their NDJSON results in input order."""
+  rows = parser.parse(lines)
+  point_rows = [number for number, row in enumerate(rows) if row.lat is not None]
+  lats = np.array([rows[number].lat for number in point_rows], dtype=np.float64)
+  lngs = np.array([rows[number].lng for number in point_rows], dtype=np.float64)
+  matched, severity, reburn = index.sample(lats, lngs)
+  sampled = {
+    number: (int(target), int(severity_class), int(reburn_class))
+    for number, target, severity_class, reburn_class in zip(point_rows, matched.tolist(), severity.tolist(), reburn.tolist())
+  }
+
+  out = []
+  for number, row in enumerate(rows):
+    result: Dict = {"row": first_row + number}
+    if row.row_id is not None:
+      result["id"] = row.row_id
+    if row.error:
+      result["error"] = row.error
+    elif row.zipcode is not None:
+      fires = index.by_zipcode.get(row.zipcode, [])
+      scores = [fire["severityScore"] for fire in fires if fire["severityScore"] is not None]
+      result.update(
+        zipcode=row.zipcode,
+        fires=fires,
+        score=max(scores) if scores else (None if fires else 0.0),
+      )
+    else:
+      target, severity_class, reburn_class = sampled[number]
+      result.update(
+        lat=row.lat,
+        lng=row.lng,
+        fireId=index.targets[target].fire_id if target >= 0 else None,
+        burnSeverity=SEVERITY_CLASSES[severity_class][0] if severity_class in SEVERITY_CLASSES else None,
+        reburnRisk=REBURN_CLASSES[reburn_class][0] if reburn_class in REBURN_CLASSES else None,
+        score=round(float(SEVERITY_SCORES[severity_class]), 3) if severity_class != MISSING else 0.0,
+      )
+    out.append(ENCODER.encode(result))
+  return ("\n".join(out) + "\n").encode("utf-8") if out else b""
+
+
+class UploadSpool:
+  """
+  Drains the request body into a spooled temp file as fast as it arrives,
+  independent of how quickly results are written back. Most HTTP clients
+  send the whole upload before reading the response; without the spool,
+  a full response socket would stop the upload and both sides would wait
+  on each other. Memory stays at SPOOL_MEMORY_BYTES; the rest goes to disk.
+  """
+
+  def __init__(self, body: AsyncIterator[bytes]):
+    self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    self.written = 0
+    self.done = False
+    self.error: Optional[Exception] = None
+    self._ready = asyncio.Event()
+    self._task = asyncio.create_task(self._fill(body))
+
+  async def _fill(self, body: AsyncIterator[bytes]) -> None:
+    try:
+      async for chunk in body:
+        self.file.seek(0, 2)
+        self.file.write(chunk)
+        self.written += len(chunk)
+        self._ready.set()
+    except ClientDisconnect as exc:
+      self.error = exc
+    finally:
+      self.done = True
+      self._ready.set()
+
+  async def chunks(self) -> AsyncIterator[bytes]:
+    """The body as spooled so far, then as it keeps arriving."""
+    position = 0
+    while True:
+      if position < self.written:
+        self.file.seek(position)
+        data = self.file.read(min(SPOOL_READ_BYTES, self.written - position))
+        position += len(data)
+        yield data
+      elif self.done:
+        if self.error is not None:
+          raise self.error
+        return
+      else:
+        self._ready.clear()
+        await self._ready.wait()
+
+  def close(self) -> None:
+    self._task.cancel()
+    self.file.close()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[bytes]]:
+  """
+  Splits a byte stream into non-blank lines without holding more than one
+  line; a line longer than MAX_LINE_BYTES is dropped and reported as None.
+  """
+  buffer = b""
+  overflow = False
+  async for chunk in chunks:
+    buffer += chunk
+    *lines, buffer = buffer.split(b"\n")
+    for line in lines:
+      if overflow:
+        overflow = False
+        yield None
+      elif line.strip():
+        yield line.rstrip(b"\r")
+    if len(buffer) > MAX_LINE_BYTES:
+      overflow, buffer = True, b""
+  if overflow:
+    yield None
+  elif buffer.strip():
+    yield buffer.rstrip(b"\r")
+
+
+async def open_upload(lines: AsyncIterator[Optional[bytes]], content_type: str):
+  """
+  Reads up to the first data line and returns (parser, pending lines). The
+  format comes from the content type, or from the first line when it is
+  neither text/csv nor NDJSON. Raises ValueError for an unusable upload.
+  """
+  first = await lines.__anext__()
+  if first is None:
+    raise ValueError("first line is too long")
+  if "csv" in content_type:
+    return CsvRows(first), []
+  if "ndjson" in content_type or "jsonl" in content_type or first.lstrip().startswith(b"{"):
+    return NdjsonRows(), [first]
+  return CsvRows(first), []
+
+
+class BulkRiskResponse(Response):
+  """
+  Streams NDJSON results while the upload is still arriving: lines are read
+  in batches of BATCH_ROWS, parsed and scored on the thread pool, and each
+  batch is sent before the next is read, so memory stays bounded by one
+  batch and a slow reader leaves rows waiting in the spool rather than
+  piling up output. The upload itself is drained by an UploadSpool. Starlette's
+  StreamingResponse would compete with the request body for `receive`,
+  so the body stream here is its only reader.
+  """
+
+  media_type = "application/x-ndjson"
+
+  def __init__(
+    self,
+    index: RiskIndex,
+    parser,
+    spool: UploadSpool,
+    lines: AsyncIterator[Optional[bytes]],
+    pending: List[bytes],
+    run: Callable,
+  ):
+    super().__init__(headers={"Cache-Control": "no-store"})
+    # The length is unknown up front; without the header the body is chunked.
+    self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+    self.index = index
+    self.parser = parser
+    self.spool = spool
+    self.lines = lines
+    self.pending = pending
+    self.run = run
+
+  async def __call__(self, scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+    first_row = 1
+    batch: List[Optional[bytes]] = list(self.pending)
+    try:
+      async for line in self.lines:
+        batch.append(line)
+        if len(batch) >= BATCH_ROWS:
+          body = await self.run(score_rows, self.index, self.parser, first_row, batch)
+          first_row += len(batch)
+          batch = []
+          await send({"type": "http.response.body", "body": body, "more_body": True})
+      if batch:
+        body = await self.run(score_rows, self.index, self.parser, first_row, batch)
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+    except ClientDisconnect:
+      return
+    finally:
+      self.spool.close()
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import base64
+import json
+import math
+import re
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE_LAT = 111_320.0
+GRID_CELL_DEGREES = 1.0
+
+# (undated flag, -date ordinal, id): newest first, undated fires last.
+SortKey = Tuple[int, int, str]
+BBox = Tuple[float, float, float, float]
+
+
+def fire_sort_key(fire: Dict) -> SortKey:
+  try:
+    ordinal = date.fromisoformat(fire.get("start_date") or "").toordinal()
+  except ValueError:
+    return (1, 0, fire["id"])
+  return (0, -ordinal, fire["id"])
+
+
+def fire_year(fire: Dict) -> Optional[int]:
+  try:
+    return date.fromisoformat(fire.get("start_date") or "").year
+  except ValueError:
+    return None
+
+
+def fire_extent(fire: Dict) -> BBox:
+  """(min_lng, min_lat, max_lng, max_lat) of the fire's approximate perimeter."""
+  radius = fire.get("perimeter_radius") or 0
+  lat, lng = fire["lat"], fire["lng"]
+  lat_delta = radius / METERS_PER_DEGREE_LAT
+  lng_delta = radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+  return lng - lng_delta, lat - lat_delta, lng + lng_delta, lat + lat_delta
+
+
+def _display_name(name: Optional[str]) -> str:
+  if not name or name.upper() == "UNNAMED":
+    return "Unnamed Fire"
+  title = name.title()
+  return title if re.search(r"\b(fire|complex)\b", title, re.IGNORECASE) else f"{title} Fire"
+
+
+def _extent_radius(event: Dict) -> Optional[float]:
+  if any(event.get(side) is None for side in ("west", "south", "east", "north")):
+    return None
+  half_height = (event["north"] - event["south"]) / 2 * METERS_PER_DEGREE_LAT
+  half_width = (event["east"] - event["west"]) / 2 * METERS_PER_DEGREE_LAT * math.cos(math.radians(event["lat"]))
+  return math.hypot(half_height, half_width)
+
+
+def event_metadata(event: Dict) -> Dict:
+  """The MTBS assessment details of an event, in API (camelCase) form."""
+  return {
+    "eventId": event["event_id"],
+    "incidentType": event.get("incident_type"),
+    "assessmentType": event.get("assessment_type"),
+    "preFire": {"sensor": event.get("pre_sensor"), "date": event.get("pre_date"), "sceneId": event.get("pre_scene_id")},
+    "postFire": {"sensor": event.get("post_sensor"), "date": event.get("post_date"), "sceneId": event.get("post_scene_id")},
+    "bounds": [event.get("west"), event.get("south"), event.get("east"), event.get("north")],
+    "dnbrOffset": event.get("dnbr_offset"),
+    "dnbrStdDev": event.get("dnbr_stddev"),
+    "thresholds": {
+      "noData": event.get("nodata_threshold"),
+      "increasedGreenness": event.get("increased_greenness_threshold"),
+      "low": event.get("low_threshold"),
+      "moderate": event.get("moderate_threshold"),
+      "high": event.get("high_threshold"),
+    },
+  }
+
+
+def fire_from_event(event: Dict) -> Dict:
+  """Catalog entry for an ingested MTBS event (a row of the catalog store)."""
+  name = _display_name(event.get("name"))
+  year = event.get("year")
+  slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+  sensor = event.get("post_sensor") or event.get("pre_sensor")
+  summary = f"{year or 'Undated'} {(event.get('incident_type') or 'fire').lower()} in {event['state']}, mapped by MTBS"
+  if sensor:
+    summary += f" with {sensor} imagery"
+  if event.get("assessment_type"):
+    summary += f" ({event['assessment_type']} assessment)"
+  return {
+    "id": f"{slug}-{year}" if year and event.get("name") not in (None, "", "UNNAMED") else event["event_id"],
+    "name": name,
+    "state": event["state"],
+    "lat": round(event["lat"], 4),
+    "lng": round(event["lng"], 4),
+    "acres": int(round(event["acres"])) if event.get("acres") is not None else None,
+    "start_date": event.get("ignition_date"),
+    "summary": summary + ".",
+    "cause": "Undetermined",
+    "region": event["state"],
+    "perimeter_radius": int(_extent_radius(event) or 10_000),
+    "mtbs_event_id": event["event_id"],
+    "mtbs": event_metadata(event),
+  }
+
+
+def merge_catalog(curated: List[Dict], events: List[Dict]) -> List[Dict]:
+  """
+  Curated demo fires plus one entry per ingested event. A curated fire that
+  names an event keeps its hand-written fields and gains the event metadata.
+  """
+  fires = [dict(fire) for fire in curated]
+  by_event = {fire["mtbs_event_id"]: fire for fire in fires if fire.get("mtbs_event_id")}
+  ids = {fire["id"] for fire in fires}
+  for event in events:
+    if event.get("lat") is None or event.get("lng") is None:
+      continue
+    fire = by_event.get(event["event_id"])
+    if fire is not None:
+      fire["mtbs"] = event_metadata(event)
+      continue
+    fire = fire_from_event(event)
+    if fire["id"] in ids:
+      fire["id"] = f"{fire['id']}-{event['event_id']}"
+    ids.add(fire["id"])
+    fires.append(fire)
+  return fires
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+  phi1, phi2 = math.radians(lat1), math.radians(lat2)
+  dphi = phi2 - phi1
+  dlmb = math.radians(lng2 - lng1)
+  a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+  return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def encode_cursor(key: SortKey) -> str:
+  raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+  return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+  padded = cursor + "=" * (-len(cursor) % 4)
+  flag, ordinal, fire_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+  return (int(flag), int(ordinal), str(fire_id))
+
+
+def _cells(extent: BBox) -> Iterable[Tuple[int, int]]:
+  min_lng, min_lat, max_lng, max_lat = extent
+  for cell_x in range(math.floor(min_lng / GRID_CELL_DEGREES), math.floor(max_lng / GRID_CELL_DEGREES) + 1):
+    for cell_y in range(math.floor(min_lat / GRID_CELL_DEGREES), math.floor(max_lat / GRID_CELL_DEGREES) + 1):
+      yield cell_x, cell_y
+
+
+def _overlaps(a: BBox, b: BBox) -> bool:
+  return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class FireCatalogIndex:
+  """
+  Immutable, query-ready view of the fire catalog.
+
+  Fires are stored once in date order (newest first) and referenced by
+  position from state/year buckets and from a 1-degree grid over each fire's
+  extent. Queries start from the most selective of those candidate lists,
+  walk it in date order and stop at `limit`, so they never re-sort the
+  catalog or re-parse dates.
+  A changed catalog gets a new index that is swapped in whole.
+  """
+
+  def __init__(self, fires: List[Dict]):
+    ordered = sorted(fires, key=fire_sort_key)
+    self.fires: List[Dict] = ordered
+    self.keys: List[SortKey] = [fire_sort_key(fire) for fire in ordered]
+    self.extents: List[BBox] = [fire_extent(fire) for fire in ordered]
+    self.states: List[str] = [(fire.get("state") or "").upper() for fire in ordered]
+    self.years: List[Optional[int]] = [fire_year(fire) for fire in ordered]
+    self.by_state: Dict[str, List[int]] = {}
+    self.by_year: Dict[int, List[int]] = {}
+    self.by_state_year: Dict[Tuple[str, int], List[int]] = {}
+    self.grid: Dict[Tuple[int, int], List[int]] = {}
+
+    for position, (state, year) in enumerate(zip(self.states, self.years)):
+      self.by_state.setdefault(state, []).append(position)
+      if year is not None:
+        self.by_year.setdefault(year, []).append(position)
+        self.by_state_year.setdefault((state, year), []).append(position)
+      for cell in _cells(self.extents[position]):
+        self.grid.setdefault(cell, []).append(position)
+
+  def __len__(self) -> int:
+    return len(self.fires)
+
+  def _grid_cells(self, extent: BBox) -> List[Tuple[int, int]]:
+    min_x, min_y = math.floor(extent[0] / GRID_CELL_DEGREES), math.floor(extent[1] / GRID_CELL_DEGREES)
+    max_x, max_y = math.floor(extent[2] / GRID_CELL_DEGREES), math.floor(extent[3] / GRID_CELL_DEGREES)
+    query_cells = (max_x - min_x + 1) * (max_y - min_y + 1)
+    if query_cells > len(self.grid):
+      # Huge query box: walk the occupied cells instead of the empty ones.
+      return [cell for cell in self.grid if min_x <= cell[0] <= max_x and min_y <= cell[1] <= max_y]
+    return [cell for cell in _cells(extent) if cell in self.grid]
+
+  def _spatial_candidates(self, extent: BBox, budget: int) -> Optional[Set[int]]:
+    """
+    Positions whose grid cells touch `extent`, or None when that would be
+    more than `budget` entries and a date-order scan is cheaper.
+    """
+    cells = self._grid_cells(extent)
+    if sum(len(self.grid[cell]) for cell in cells) > budget:
+      return None
+    candidates: Set[int] = set()
+    for cell in cells:
+      candidates.update(self.grid[cell])
+    return candidates
+
+  def query(
+    self,
+    state: Optional[str] = None,
+    year: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    near: Optional[Tuple[float, float]] = None,
+    radius_m: float = 0.0,
+    limit: Optional[int] = None,
+    cursor: Optional[SortKey] = None,
+  ) -> Tuple[List[Dict], Optional[SortKey]]:
+    """
+    Returns (fires, next cursor key). `bbox` is (min_lng, min_lat, max_lng,
+    max_lat) and matches fires whose extent overlaps it; `near` is (lat, lng)
+    and matches fires whose perimeter comes within `radius_m` of the point.
+    """
+    state = state.upper().strip() if state else None
+    positions: Sequence[int] = range(len(self.fires))
+    if state and year is not None:
+      positions = self.by_state_year.get((state, year), [])
+    elif state:
+      positions = self.by_state.get(state, [])
+    elif year is not None:
+      positions = self.by_year.get(year, [])
+
+    # Use the grid only when it narrows things down well below the bucket;
+    # otherwise walk the bucket in date order and let the exact checks filter.
+    budget = len(positions) // 8
+    spatial: Optional[Set[int]] = None
+    if bbox:
+      spatial = self._spatial_candidates(bbox, budget)
+    if near and spatial is None:
+      near_extent = fire_extent({"lat": near[0], "lng": near[1], "perimeter_radius": radius_m})
+      spatial = self._spatial_candidates(near_extent, budget)
+    if spatial is not None:
+      positions = sorted(
+        position for position in spatial
+        if (not state or self.states[position] == state) and (year is None or self.years[position] == year)
+      )
+
+    start = 0
+    if cursor is not None:
+      # Positions are in key order, so skip everything up to the cursor key
+      start = bisect_right(positions, bisect_right(self.keys, cursor) - 1)
+
+    results: List[Dict] = []
+    last_position: Optional[int] = None
+    has_more = False
+    for position in positions[start:]:
+      if bbox and not _overlaps(self.extents[position], bbox):
+        continue
+      if near:
+        fire = self.fires[position]
+        reach = radius_m + (fire.get("perimeter_radius") or 0)
+        if haversine_m(near[0], near[1], fire["lat"], fire["lng"]) > reach:
+          continue
+      if limit is not None and len(results) >= limit:
+        has_more = True
+        break
+      results.append(self.fires[position])
+      last_position = position
+
+    next_cursor = self.keys[last_position] if has_more and last_position is not None else None
+    return results, next_cursor
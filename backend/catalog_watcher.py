@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+import rasterio
+from rasterio.errors import RasterioIOError
+
+from .catalog import FireCatalogIndex
+from .raster_index import RasterIndex
+from .retrieval import PassageIndex
+
+
+# An event joins the catalog only once these are present and readable: the
+# metadata feeds the catalog entry, burn_bndy the stats/vectors, dnbr6 the
+# stats, tiles and composites.
+REQUIRED_PRODUCTS = ("metadata", "burn_bndy", "dnbr6")
+SHAPEFILE_SIDECARS = (".shx", ".dbf")
+
+logger = logging.getLogger(__name__)
+
+# (product, path, mtime_ns, size) for every indexed file of an event.
+EventSignature = Tuple[Tuple[str, str, int, int], ...]
+
+
+class CatalogSnapshot(NamedTuple):
+  """
+  Everything request handlers derive from the fire catalog. Built complete
+  off the request path and swapped in with one assignment, so a handler that
+  reads the snapshot once sees either the old catalog or the new one.
+  """
+  fires: List[Dict]
+  lookup: Dict[str, Dict]
+  index: FireCatalogIndex
+  ask_index: PassageIndex
+
+
+def event_problems(index: RasterIndex, event_id: str) -> List[str]:
+  """What keeps an event directory from being served; empty when it is complete."""
+  problems = []
+  for product in REQUIRED_PRODUCTS:
+    product_file = index.get(event_id, product)
+    if product_file is None:
+      problems.append(f"missing {product}")
+    elif product_file.size == 0:
+      problems.append(f"empty {product}")
+  burn_boundary = index.get(event_id, "burn_bndy")
+  if burn_boundary is not None:
+    stem = burn_boundary.path[:-4]
+    problems.extend(f"missing burn_bndy{ext}" for ext in SHAPEFILE_SIDECARS if not os.path.exists(stem + ext))
+  dnbr6 = index.get(event_id, "dnbr6")
+  if dnbr6 is not None and dnbr6.size:
+    try:
+      with rasterio.open(dnbr6.path):
+        pass
+    except RasterioIOError:
+      problems.append("unreadable dnbr6")
+  return problems
+
+
+class EventWatcher:
+  """
+  Decides when new or changed event directories are ready to ingest.
+
+  Directories are usually copied in file by file, and a large GeoTIFF grows
+  in place without touching its directory's mtime. So a changed event is
+  re-scanned on every poll and only reported once its files are unchanged
+  between two consecutive polls and every required product is readable.
+  """
+
+  def __init__(self, index: RasterIndex):
+    self.index = index
+    self.pending: Dict[str, EventSignature] = {}
+    self.reported: Dict[str, List[str]] = {}
+
+  def signature(self, event_id: str) -> EventSignature:
+    return tuple(sorted(
+      (product, item.path, item.mtime_ns, item.size)
+      for product, files in self.index.products(event_id).items()
+      for item in files
+    ))
+
+  def watch(self, event_ids: Iterable[str]) -> None:
+    """Marks events to check on the next poll (e.g. ones the catalog store has not seen)."""
+    for event_id in event_ids:
+      self.pending.setdefault(event_id, ())
+
+  def poll(self) -> Tuple[List[str], List[str]]:
+    """
+    Refreshes the raster index and returns (ready, removed) event IDs. Blocking;
+    run it off the event loop.
+    """
+    changed = self.index.refresh()
+    known = set(self.index.events())
+    removed = [event_id for event_id in changed if event_id not in known]
+    for event_id in removed:
+      self.pending.pop(event_id, None)
+      self.reported.pop(event_id, None)
+
+    candidates: Set[str] = set(self.pending) | {event_id for event_id in changed if event_id in known}
+    self.index.rescan(candidates)
+    ready = []
+    for event_id in sorted(candidates):
+      signature = self.signature(event_id)
+      if self.pending.get(event_id) != signature:
+        self.pending[event_id] = signature
+        continue
+      problems = event_problems(self.index, event_id)
+      if problems:
+        # Stays pending: the rest of the directory may still be on its way.
+        if self.reported.get(event_id) != problems:
+          self.reported[event_id] = problems
+          logger.warning("%s not ingested yet: %s", event_id, ", ".join(problems))
+        continue
+      del self.pending[event_id]
+      self.reported.pop(event_id, None)
+      ready.append(event_id)
+    return ready, removed
@@ -0,0 +1,103 @@
+"""
+Offline conversion of CA_data rasters to Cloud-Optimized GeoTIFFs.
+
+Rewrites each MTBS product in place as a tiled, DEFLATE-compressed COG with
+internal overviews, so HTTP range requests and windowed reads can fetch just
+the blocks and overview level they need. Run from the project root:
+
+  python -m backend.cog               # convert everything under CA_data
+  python -m backend.cog --dry-run     # list what would be converted
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional
+
+import rasterio
+import rasterio.shutil
+
+from .raster_index import ProductFile, RasterIndex, remove_overview_sidecars
+
+
+# Class rasters keep a real class per overview pixel; continuous ones average.
+CATEGORICAL_PRODUCTS = {"dnbr6", "reburn_risk", "best_next_steps_grid", "best_next_steps"}
+CONTINUOUS_PRODUCTS = {"dnbr", "rdnbr", "refl"}
+COG_PRODUCTS = CATEGORICAL_PRODUCTS | CONTINUOUS_PRODUCTS
+
+COG_BLOCKSIZE = 256
+
+
+def is_cog(path: str) -> bool:
+  with rasterio.open(path) as dataset:
+    return dataset.tags(ns="IMAGE_STRUCTURE").get("LAYOUT") == "COG"
+
+
+def cog_options(product: str) -> Dict[str, str]:
+  options = {
+    "COMPRESS": "DEFLATE",
+    "BLOCKSIZE": str(COG_BLOCKSIZE),
+    "OVERVIEWS": "IGNORE_EXISTING",
+  }
+  if product in CATEGORICAL_PRODUCTS:
+    options["OVERVIEW_RESAMPLING"] = "MODE"
+  else:
+    options["OVERVIEW_RESAMPLING"] = "AVERAGE"
+    options["PREDICTOR"] = "YES"
+  return options
+
+
+def convert_to_cog(product_file: ProductFile) -> int:
+  """
+  Rewrites one product as a COG next to the original, then atomically swaps it
+  into place. Returns the size of the new file in bytes.
+  """
+  tmp_path = f"{product_file.path}.cog.tmp"
+  try:
+    rasterio.shutil.copy(product_file.path, tmp_path, driver="COG", **cog_options(product_file.product))
+    os.replace(tmp_path, product_file.path)
+    # The COG carries its own overviews; external ones (and cached .aux.xml
+    # statistics) would otherwise shadow them.
+    remove_overview_sidecars(product_file.path)
+  finally:
+    if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+    remove_overview_sidecars(tmp_path)
+  return os.path.getsize(product_file.path)
+
+
+def pending_conversions(index: RasterIndex) -> List[ProductFile]:
+  pending = []
+  for event_id in index.events():
+    for product, files in index.products(event_id).items():
+      if product not in COG_PRODUCTS:
+        continue
+      pending.extend(item for item in files if item.path.endswith(".tif") and not is_cog(item.path))
+  return pending
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  default_root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CA_data")
+  parser = argparse.ArgumentParser(description="Convert CA_data rasters to Cloud-Optimized GeoTIFFs.")
+  parser.add_argument("--data-root", default=default_root, help="Directory holding MTBS event folders")
+  parser.add_argument("--dry-run", action="store_true", help="List files that would be converted")
+  args = parser.parse_args(argv)
+
+  pending = pending_conversions(RasterIndex(args.data_root))
+  if not pending:
+    print("All rasters are already Cloud-Optimized GeoTIFFs.")
+    return 0
+
+  for product_file in pending:
+    if args.dry_run:
+      print(f"would convert {product_file.path}")
+      continue
+    new_size = convert_to_cog(product_file)
+    print(f"{os.path.basename(product_file.path)}: {product_file.size:,} -> {new_size:,} bytes")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.io import MemoryFile
+
+from .shared_rasters import read_raster_band, shared_arrays, version_name
+from .stats import rasterize_mask
+
+
+PRIORITY_KEYS = ("community", "watershed", "infrastructure")
+# Weights are quantized to 1/WEIGHT_STEPS so nearby slider positions share a result.
+WEIGHT_STEPS = 20
+NODATA = 255
+
+# Burn severity per dnbr6 class, 0..1 (0 outside, 6 non-processing).
+SEVERITY_SCORES = np.zeros(256, dtype=np.float32)
+SEVERITY_SCORES[[1, 2, 3, 4, 5]] = [0.1, 0.4, 0.7, 1.0, 0.05]
+MODERATE_OR_HIGH = (3, 4)
+UNBURNED = (0, 1, 5)
+
+# Neighbourhood radii in pixels (30 m): the wildland-urban edge is local,
+# access corridors and drainages are judged over a wider area.
+COMMUNITY_RADIUS = 5
+INFRASTRUCTURE_RADIUS = 15
+WATERSHED_RADIUS = 8
+
+# reburn_risk classes: composite score below each break -> class index.
+REBURN_BREAKS = (0.25, 0.5)
+
+# Input signature: ((product, path, mtime_ns), ...) as in stats.StatsKey.
+CompositeKey = Tuple[Tuple[str, str, int], ...]
+QuantizedWeights = Tuple[int, int, int]
+
+
+class CompositeInputs(NamedTuple):
+  """Per-pixel bands derived once per input version and reused for every weight vector."""
+  profile: Dict
+  valid: np.ndarray
+  severity: np.ndarray
+  bands: Dict[str, np.ndarray]
+
+
+def box_mean(values: np.ndarray, radius: int) -> np.ndarray:
+  """
+  Mean over a (2r+1)^2 window via an integral image, edges clamped. The
+  integral is exact (int64 for masks, float64 otherwise): float32 running
+  sums lose the window differences on large rasters.
+  """
+  accumulator = np.int64 if values.dtype == np.bool_ else np.float64
+  padded = np.pad(values, radius, mode="edge")
+  integral = np.pad(padded.cumsum(axis=0, dtype=accumulator).cumsum(axis=1), ((1, 0), (1, 0)))
+  size = 2 * radius + 1
+  total = integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+  return (total / (size * size)).astype(np.float32)
+
+
+def derive_bands(key: CompositeKey) -> Dict[str, np.ndarray]:
+  paths = {product: path for product, path, _ in key}
+  with rasterio.open(paths["dnbr6"]) as dataset:
+    transform = dataset.transform
+  mtimes = {product: mtime_ns for product, _, mtime_ns in key}
+  classes = read_raster_band(paths["dnbr6"], mtimes["dnbr6"])
+
+  valid = np.isin(classes, (1, 2, 3, 4, 5))
+  if "burn_bndy" in paths:
+    inside = rasterize_mask(paths["burn_bndy"], classes.shape, transform)
+    if inside is not None:
+      valid &= inside
+  if "mask" in paths:
+    masked = rasterize_mask(paths["mask"], classes.shape, transform)
+    if masked is not None:
+      valid &= ~masked
+
+  unburned = np.isin(classes, UNBURNED) | ~valid
+  return {
+    "valid": valid,
+    "severity": SEVERITY_SCORES[classes],
+    # Burned pixels next to unburned land: where homes meet the fire.
+    "community": box_mean(unburned, COMMUNITY_RADIUS),
+    # Contiguous moderate/high severity drives runoff and debris flows.
+    "watershed": box_mean(np.isin(classes, MODERATE_OR_HIGH), WATERSHED_RADIUS),
+    # Roads and lines run through the wider unburned surroundings.
+    "infrastructure": box_mean(unburned, INFRASTRUCTURE_RADIUS),
+  }
+
+
+@lru_cache(maxsize=32)
+def load_inputs(key: CompositeKey) -> CompositeInputs:
+  """
+  The derived bands live in the shared raster store, so they are computed
+  once per host and every worker maps the same pages.
+  """
+  _, dnbr6_path, dnbr6_mtime = next(entry for entry in key if entry[0] == "dnbr6")
+  # Boundary and mask versions are part of the entry name as well.
+  suffix = "".join(f"-{mtime_ns:x}" for product, _, mtime_ns in key if product != "dnbr6")
+  arrays = shared_arrays.get(version_name(dnbr6_path, dnbr6_mtime, f"-composite{suffix}"), lambda: derive_bands(key))
+
+  with rasterio.open(dnbr6_path) as dataset:
+    profile = dataset.profile.copy()
+  for name in ("blockxsize", "blockysize", "tiled", "interleave", "photometric"):
+    profile.pop(name, None)
+  profile.update(driver="GTiff", count=1, dtype="uint8", nodata=NODATA, compress="deflate")
+  return CompositeInputs(
+    profile=profile,
+    valid=arrays["valid"],
+    severity=arrays["severity"],
+    bands={name: arrays[name] for name in PRIORITY_KEYS},
+  )
+
+
+def quantize_weights(priorities: Dict[str, float]) -> QuantizedWeights:
+  """Normalizes the priority weights and rounds them to 1/WEIGHT_STEPS."""
+  values = [max(0.0, float(priorities.get(name, 0.0))) for name in PRIORITY_KEYS]
+  total = sum(values)
+  if total == 0:
+    values, total = [1.0] * len(values), float(len(values))
+  return tuple(int(round(WEIGHT_STEPS * value / total)) for value in values)
+
+
+def exposure(inputs: CompositeInputs, weights: QuantizedWeights) -> np.ndarray:
+  total = sum(weights) or 1
+  result = np.zeros(inputs.severity.shape, dtype=np.float32)
+  for name, weight in zip(PRIORITY_KEYS, weights):
+    if weight:
+      result += (weight / total) * inputs.bands[name]
+  return result
+
+
+def reburn_risk(inputs: CompositeInputs, weights: QuantizedWeights) -> np.ndarray:
+  """Severity scaled by the priority-weighted exposure, in three classes."""
+  score = inputs.severity * (0.5 + exposure(inputs, weights))
+  classes = np.digitize(score, REBURN_BREAKS).astype(np.uint8)
+  classes[~inputs.valid] = NODATA
+  return classes
+
+
+def best_next_steps(inputs: CompositeInputs, weights: QuantizedWeights) -> np.ndarray:
+  """
+  Treatment with the highest priority-weighted benefit per pixel, in the
+  classes of tiles.TILE_COLORMAPS["best-next-steps"].
+  """
+  total = sum(weights) or 1
+  community, watershed, infrastructure = (weight / total for weight in weights)
+  severity = inputs.severity
+  bands = inputs.bands
+  unburned_fuel = 1.0 - severity
+  benefits = np.stack([
+    # 0 Abandon/Monitor: lightly burned, nothing pressing.
+    0.5 * unburned_fuel,
+    # 1 Fuel reduction: fuel left standing near communities and infrastructure.
+    unburned_fuel * (community * bands["community"] + infrastructure * bands["infrastructure"]) * 2.0,
+    # 2 Reforest: severe burn away from erosion-prone drainages.
+    severity * (1.0 - bands["watershed"]) * (0.5 + community + infrastructure),
+    # 3 Soil stabilization: contiguous severe burn, weighted by watershed priority.
+    severity * bands["watershed"] * (0.5 + 2.0 * watershed),
+  ])
+  classes = benefits.argmax(axis=0).astype(np.uint8)
+  classes[~inputs.valid] = NODATA
+  return classes
+
+
+COMPOSITE_BUILDERS = {
+  "reburn_risk": reburn_risk,
+  "best_next_steps": best_next_steps,
+}
+
+
+def render_composite(product: str, key: CompositeKey, weights: QuantizedWeights) -> bytes:
+  """Classifies `product` for one weight vector and encodes it as a GeoTIFF."""
+  inputs = load_inputs(key)
+  data = COMPOSITE_BUILDERS[product](inputs, weights)
+  with MemoryFile() as memfile:
+    with memfile.open(**inputs.profile) as dataset:
+      dataset.write(data, 1)
+    return memfile.read()
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from .profiler import in_request_context
+
+
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+  """
+  Parses a single `bytes=` range into an inclusive (start, end) pair.
+
+  Returns None for headers we do not handle (other units, multiple ranges),
+  in which case the full body is served. Raises ValueError when the range
+  cannot be satisfied.
+  """
+  unit, _, spec = header.partition("=")
+  if unit.strip().lower() != "bytes" or "," in spec:
+    return None
+  start_text, _, end_text = spec.strip().partition("-")
+  try:
+    if not start_text:
+      suffix = int(end_text)
+      if suffix <= 0:
+        raise ValueError("empty suffix range")
+      return max(0, size - suffix), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+  except ValueError:
+    raise ValueError(f"malformed range: {header}")
+  if start >= size or end < start:
+    raise ValueError(f"unsatisfiable range: {header}")
+  return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+  if not header:
+    return False
+  candidates = [value.strip() for value in header.split(",")]
+  return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def accepts_encoding(header: Optional[str], coding: str) -> bool:
+  """Whether an Accept-Encoding header allows `coding`, honoring q=0 and `*`."""
+  weights: Dict[str, float] = {}
+  for item in (header or "").split(","):
+    name, _, params = item.partition(";")
+    name = name.strip().lower()
+    if not name:
+      continue
+    weight = 1.0
+    for param in params.split(";"):
+      key, _, value = param.partition("=")
+      if key.strip().lower() == "q":
+        try:
+          weight = float(value)
+        except ValueError:
+          weight = 0.0
+    weights[name] = weight
+  return weights.get(coding, weights.get("*", 0.0)) > 0
+
+
+class DownloadLimiter:
+  """
+  Admission control for file bodies: at most `max_active` downloads at once
+  and `max_per_client` per client address. A request waits up to
+  `queue_seconds` for a global slot, then is shed; a client already at its
+  limit is shed straight away. Lives on the event loop, so no locking.
+  """
+
+  def __init__(self, max_active: int, max_per_client: int, queue_seconds: float):
+    self.max_active = max_active
+    self.max_per_client = max_per_client
+    self.queue_seconds = queue_seconds
+    self.active = 0
+    self.shed = 0
+    self._per_client: Dict[str, int] = {}
+    self._slots: Optional[asyncio.Semaphore] = None
+
+  async def acquire(self, client: str) -> Optional[Callable[[], None]]:
+    """Returns an idempotent release callback, or None when the request is shed."""
+    if self._slots is None:
+      self._slots = asyncio.Semaphore(self.max_active)
+    if self._per_client.get(client, 0) >= self.max_per_client:
+      self.shed += 1
+      return None
+
+    # Counted against the client while queued, so one client cannot fill the queue.
+    self._per_client[client] = self._per_client.get(client, 0) + 1
+    try:
+      await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_seconds)
+    except asyncio.TimeoutError:
+      self._release_client(client)
+      self.shed += 1
+      return None
+    self.active += 1
+
+    released = False
+
+    def release() -> None:
+      nonlocal released
+      if not released:
+        released = True
+        self.active -= 1
+        self._slots.release()
+        self._release_client(client)
+    return release
+
+  def _release_client(self, client: str) -> None:
+    remaining = self._per_client.get(client, 1) - 1
+    if remaining:
+      self._per_client[client] = remaining
+    else:
+      self._per_client.pop(client, None)
+
+
+class FileRangeResponse(Response):
+  """
+  Sends bytes [start, end] of a file. Uses the server's zero-copy
+  `http.response.zerocopysend` (sendfile) or `pathsend` extension when it
+  offers one; otherwise reads chunks with os.pread on the file I/O pool, so
+  disk waits never run on the event loop and each chunk waits for the
+  socket to drain before the next is read. Stops reading if the client
+  disconnects, and calls `release` once the body is done either way.
+  `on_sent`, if given, is called with the size of each piece of the body
+  once it has been handed to the server.
+  """
+
+  def __init__(
+    self,
+    path: str,
+    start: int,
+    end: int,
+    size: int,
+    executor: ThreadPoolExecutor,
+    release: Callable[[], None],
+    status_code: int,
+    media_type: str,
+    headers: Dict[str, str],
+    on_sent: Optional[Callable[[int], None]] = None,
+  ):
+    super().__init__(status_code=status_code, media_type=media_type, headers={**headers, "Content-Length": str(end - start + 1)})
+    self.path = path
+    self.start = start
+    self.end = end
+    self.size = size
+    self.executor = executor
+    self.release = release
+    self.on_sent = on_sent or (lambda size: None)
+
+  async def __call__(self, scope, receive, send) -> None:
+    try:
+      await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+      if scope["method"].upper() == "HEAD":
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return
+      await self._send_body(scope, receive, send)
+    finally:
+      self.release()
+
+  async def _send_body(self, scope, receive, send) -> None:
+    loop = asyncio.get_running_loop()
+    extensions = scope.get("extensions") or {}
+    count = self.end - self.start + 1
+    if "http.response.pathsend" in extensions and count == self.size:
+      await send({"type": "http.response.pathsend", "path": self.path})
+      self.on_sent(count)
+      return
+
+    fd = await loop.run_in_executor(self.executor, in_request_context(os.open, self.path, os.O_RDONLY))
+    try:
+      if "http.response.zerocopysend" in extensions:
+        await send({"type": "http.response.zerocopysend", "file": fd, "offset": self.start, "count": count})
+        self.on_sent(count)
+        return
+
+      disconnected = asyncio.Event()
+
+      async def watch_disconnect() -> None:
+        while (await receive())["type"] != "http.disconnect":
+          pass
+        disconnected.set()
+
+      watcher = asyncio.create_task(watch_disconnect())
+      try:
+        offset, remaining = self.start, count
+        finished = False
+        while remaining > 0 and not disconnected.is_set():
+          chunk = await loop.run_in_executor(self.executor, in_request_context(os.pread, fd, min(CHUNK_SIZE, remaining), offset))
+          if not chunk:
+            break
+          offset += len(chunk)
+          remaining -= len(chunk)
+          finished = remaining == 0
+          await send({"type": "http.response.body", "body": chunk, "more_body": not finished})
+          self.on_sent(len(chunk))
+        # Also covers an empty body: every response must end with more_body=False.
+        if not finished and not disconnected.is_set():
+          await send({"type": "http.response.body", "body": b"", "more_body": False})
+      finally:
+        watcher.cancel()
+    finally:
+      os.close(fd)
+
+
+class FileServer:
+  """
+  Serves product files off the event loop: metadata calls and body reads
+  run on a dedicated, bounded thread pool (not the shared threadpool the
+  JSON routes use), and bodies are admitted through a DownloadLimiter so a
+  burst of multi-MB downloads is queued or shed with 503 + Retry-After.
+  """
+
+  def __init__(self, io_threads: int, limiter: DownloadLimiter, retry_after: int):
+    self.executor = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="terranova-file-io")
+    self.limiter = limiter
+    self.retry_after = retry_after
+
+  async def run(self, function, *args):
+    """Runs blocking file-system work on the file I/O pool."""
+    return await asyncio.get_running_loop().run_in_executor(self.executor, in_request_context(function, *args))
+
+  async def serve(
+    self,
+    request: Request,
+    path: str,
+    stat: os.stat_result,
+    etag: str,
+    media_type: str,
+    headers: Optional[Dict[str, str]] = None,
+    on_sent: Optional[Callable[[int], None]] = None,
+  ) -> Response:
+    """
+    Serves `path` with a strong ETag, answering `If-None-Match` with 304 and a
+    single `Range` request with 206. Only responses with a body take a
+    download slot; raises HTTPException(503) when none is available.
+    `on_sent` is passed on to FileRangeResponse.
+    """
+    size = stat.st_size
+    base_headers = dict(headers or {})
+    base_headers.update({
+      "ETag": etag,
+      "Accept-Ranges": "bytes",
+      "Cache-Control": "no-cache",
+    })
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+      return Response(status_code=304, headers=base_headers)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+      try:
+        byte_range = parse_range(range_header, size)
+      except ValueError:
+        return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{size}"})
+      if byte_range:
+        start, end = byte_range
+        status_code = 206
+        base_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    client = request.client.host if request.client else "unknown"
+    release = await self.limiter.acquire(client)
+    if release is None:
+      raise HTTPException(
+        status_code=503,
+        detail="Too many concurrent downloads; retry shortly",
+        headers={"Retry-After": str(self.retry_after)},
+      )
+    return FileRangeResponse(path, start, end, size, self.executor, release, status_code, media_type, base_headers, on_sent)
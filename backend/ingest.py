@@ -0,0 +1,205 @@
+"""
+Ingests MTBS event metadata into the SQLite catalog store.
+
+Each event's *_metadata.xml is stream-parsed (see metadata.py) together with
+the attribute row of its burn_bndy shapefile, and upserted into one indexed
+table. The API only reads that table at startup, so it never parses XML.
+Events whose metadata files have not changed since the last run are skipped.
+Run from the project root:
+
+  python -m backend.ingest             # ingest everything under CA_data
+  python -m backend.ingest --rebuild   # drop the store and re-ingest
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metadata import parse_metadata_xml, read_burn_boundary_record
+from .raster_index import RasterIndex
+
+
+SCHEMA_VERSION = 1
+
+# Column name -> SQLite type, in table order.
+EVENT_COLUMNS: Dict[str, str] = {
+  "event_id": "TEXT PRIMARY KEY",
+  "name": "TEXT",
+  "state": "TEXT",
+  "ignition_date": "TEXT",
+  "year": "INTEGER",
+  "incident_type": "TEXT",
+  "assessment_type": "TEXT",
+  "acres": "REAL",
+  "lat": "REAL",
+  "lng": "REAL",
+  "west": "REAL",
+  "south": "REAL",
+  "east": "REAL",
+  "north": "REAL",
+  "pre_sensor": "TEXT",
+  "pre_date": "TEXT",
+  "pre_scene_id": "TEXT",
+  "post_sensor": "TEXT",
+  "post_date": "TEXT",
+  "post_scene_id": "TEXT",
+  "dnbr_offset": "REAL",
+  "dnbr_stddev": "REAL",
+  "nodata_threshold": "REAL",
+  "increased_greenness_threshold": "REAL",
+  "low_threshold": "REAL",
+  "moderate_threshold": "REAL",
+  "high_threshold": "REAL",
+  "published": "TEXT",
+  "description": "TEXT",
+  "source_path": "TEXT",
+  "source_mtime_ns": "INTEGER",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS events ({", ".join(f"{name} {kind}" for name, kind in EVENT_COLUMNS.items())});
+CREATE INDEX IF NOT EXISTS events_state_year ON events (state, year);
+CREATE INDEX IF NOT EXISTS events_year ON events (year);
+CREATE INDEX IF NOT EXISTS events_bounds ON events (west, east, south, north);
+"""
+
+
+def build_event_record(metadata_path: str, burn_boundary_path: Optional[str]) -> Optional[Dict]:
+  """
+  Combines the XML fields with the burn boundary attributes. The XML wins for
+  name, date and acreage (it is the published assessment); the dbf adds the
+  centroid and dNBR thresholds the XML does not carry.
+  """
+  record = parse_metadata_xml(metadata_path)
+  if record is None:
+    return None
+  if burn_boundary_path:
+    for key, value in read_burn_boundary_record(burn_boundary_path).items():
+      record.setdefault(key, value)
+
+  record["state"] = record["event_id"][:2].upper()
+  if record.get("ignition_date"):
+    record["year"] = int(record["ignition_date"][:4])
+  if record.get("lat") is None and all(record.get(side) is not None for side in ("west", "south", "east", "north")):
+    record["lat"] = (record["south"] + record["north"]) / 2
+    record["lng"] = (record["west"] + record["east"]) / 2
+  record["source_path"] = metadata_path
+  record["source_mtime_ns"] = os.stat(metadata_path).st_mtime_ns
+  return {column: record.get(column) for column in EVENT_COLUMNS}
+
+
+class CatalogStore:
+  """SQLite-backed table of ingested MTBS events."""
+
+  def __init__(self, path: str):
+    self.path = path
+    self._lock = threading.Lock()
+
+  @contextmanager
+  def connect(self) -> Iterator[sqlite3.Connection]:
+    """One serialized connection; commits on success, always closes."""
+    with self._lock:
+      connection = sqlite3.connect(self.path)
+      try:
+        connection.row_factory = sqlite3.Row
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+          connection.executescript("DROP TABLE IF EXISTS events;" + SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION};")
+        with connection:
+          yield connection
+      finally:
+        connection.close()
+
+  def exists(self) -> bool:
+    return os.path.exists(self.path)
+
+  def source_mtimes(self) -> Dict[str, Tuple[str, int]]:
+    with self.connect() as connection:
+      rows = connection.execute("SELECT event_id, source_path, source_mtime_ns FROM events")
+      return {row["event_id"]: (row["source_path"], row["source_mtime_ns"]) for row in rows}
+
+  def upsert(self, records: Iterable[Dict]) -> int:
+    columns = list(EVENT_COLUMNS)
+    statement = (
+      f"INSERT OR REPLACE INTO events ({', '.join(columns)}) "
+      f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    with self.connect() as connection:
+      cursor = connection.executemany(statement, ([record[column] for column in columns] for record in records))
+      return cursor.rowcount
+
+  def delete(self, event_ids: Iterable[str]) -> None:
+    with self.connect() as connection:
+      connection.executemany("DELETE FROM events WHERE event_id = ?", ((event_id,) for event_id in event_ids))
+
+  def load_events(self) -> List[Dict]:
+    """All events, without the long description text; one indexed scan."""
+    if not self.exists():
+      return []
+    columns = [column for column in EVENT_COLUMNS if column != "description"]
+    with self.connect() as connection:
+      rows = connection.execute(f"SELECT {', '.join(columns)} FROM events ORDER BY event_id")
+      return [dict(row) for row in rows]
+
+  def load_descriptions(self) -> Dict[str, str]:
+    if not self.exists():
+      return {}
+    with self.connect() as connection:
+      rows = connection.execute("SELECT event_id, description FROM events")
+      return {row["event_id"]: row["description"] or "" for row in rows}
+
+
+def ingest(index: RasterIndex, store: CatalogStore, event_ids: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+  """
+  Parses the metadata of `event_ids` (default: every indexed event) whose
+  XML changed since it was last stored. Returns (ingested, skipped).
+  """
+  known = store.source_mtimes()
+  records = []
+  skipped = 0
+  for event_id in event_ids if event_ids is not None else index.events():
+    metadata = index.get(event_id, "metadata")
+    if metadata is None:
+      continue
+    if known.get(event_id) == (metadata.path, metadata.mtime_ns):
+      skipped += 1
+      continue
+    burn_boundary = index.get(event_id, "burn_bndy")
+    record = build_event_record(metadata.path, burn_boundary.path if burn_boundary else None)
+    if record:
+      records.append(record)
+
+  if records:
+    store.upsert(records)
+  return len(records), skipped
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  backend_dir = os.path.dirname(os.path.abspath(__file__))
+  parser = argparse.ArgumentParser(description="Ingest MTBS metadata into the catalog store.")
+  parser.add_argument("--data-root", default=os.path.join(os.path.dirname(backend_dir), "CA_data"), help="Directory holding MTBS event folders")
+  parser.add_argument("--db", default=os.environ.get("TERRANOVA_CATALOG_DB", os.path.join(backend_dir, "catalog.sqlite")), help="SQLite catalog store to write")
+  parser.add_argument("--rebuild", action="store_true", help="Delete the store and ingest every event again")
+  args = parser.parse_args(argv)
+
+  if args.rebuild and os.path.exists(args.db):
+    os.remove(args.db)
+
+  store = CatalogStore(args.db)
+  index = RasterIndex(args.data_root)
+  ingested, skipped = ingest(index, store)
+  removed = set(store.source_mtimes()) - set(index.events())
+  if removed:
+    store.delete(removed)
+  print(f"{args.db}: {ingested} ingested, {skipped} unchanged, {len(removed)} removed")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,32 +1,168 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import hashlib
+import hmac
+import json
+import logging
 import random
-import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from fastapi import FastAPI, Query, HTTPException
+import numpy as np
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, StreamingResponse
+
+from .aggregates import GROUP_DIMENSIONS, METRICS, RollupStore
+from .broadcast import Broadcaster, Channel
+from .bulk_risk import BulkRiskResponse, RiskIndexKey, UploadSpool, build_risk_index, iter_lines, open_upload
+from .catalog_watcher import CatalogSnapshot, EventWatcher
+from .composite import load_inputs, quantize_weights, render_composite
+from .catalog import FireCatalogIndex, decode_cursor, encode_cursor, merge_catalog
+from .fileserve import DownloadLimiter, FileServer, accepts_encoding, etag_matches
+from .ingest import CatalogStore, ingest
+from .metrics import CacheStats, Metrics, MetricsMiddleware, lru_cache_stats
+from .profiler import ProfilerMiddleware, SamplingProfiler
+from .pyramid import MIN_LEVEL_DIM, PyramidStore
+from .raster_index import ProductFile, RasterIndex
+from .response_cache import CachedBody, ResponseCache, version_etag
+from .shared_rasters import shared_arrays
+from .retrieval import IntentMatcher, Passage, PassageIndex, split_passages, tokenize
+from .sampling import MAX_BINARY_SAMPLE_BYTES, MAX_JSON_SAMPLE_BYTES, MAX_SAMPLE_POINTS, SAMPLE_LAYERS, SampleTarget, parse_binary_points, parse_points, sample_points
+from .stats import STATS_PRODUCTS, compute_stats, fire_stats, stats_key
+from .vectors import MAX_SIMPLIFY_ZOOM, load_vector_payload, tolerance_level
+from .tiles import EMPTY_TILE, TILE_COLORMAPS, TileCache, is_valid_tile, load_source, render_tile, tile_cache_key
 
 
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(BACKEND_DIR, ".."))
-DATA_ROOT = os.path.join(PROJECT_ROOT, "CA_data")
+DATA_ROOT = os.environ.get("TERRANOVA_DATA_ROOT", os.path.join(PROJECT_ROOT, "CA_data"))
+TILE_CACHE_DIR = os.environ.get("TERRANOVA_TILE_CACHE_DIR", os.path.join(BACKEND_DIR, ".tile_cache"))
+PYRAMID_DIR = os.environ.get("TERRANOVA_PYRAMID_DIR", os.path.join(BACKEND_DIR, ".pyramid_cache"))
+TILE_CACHE_MAX_BYTES = int(os.environ.get("TERRANOVA_TILE_CACHE_MB", "256")) * 1024 * 1024
+CATALOG_DB = os.environ.get("TERRANOVA_CATALOG_DB", os.path.join(BACKEND_DIR, "catalog.sqlite"))
+SCENARIO_CACHE_ENTRIES = int(os.environ.get("TERRANOVA_SCENARIO_CACHE_ENTRIES", "4096"))
+COMPOSITE_CACHE_ENTRIES = int(os.environ.get("TERRANOVA_COMPOSITE_CACHE_ENTRIES", "256"))
+AGGREGATE_CACHE_ENTRIES = 128
+STREAM_TICK_SECONDS = float(os.environ.get("TERRANOVA_STREAM_TICK_SECONDS", "5"))
+INDEX_POLL_SECONDS = float(os.environ.get("TERRANOVA_INDEX_POLL_SECONDS", "5"))
+# Raster downloads: dedicated I/O threads and admission limits (503 beyond them).
+FILE_IO_THREADS = int(os.environ.get("TERRANOVA_FILE_IO_THREADS", "8"))
+MAX_DOWNLOADS = int(os.environ.get("TERRANOVA_MAX_DOWNLOADS", "16"))
+MAX_DOWNLOADS_PER_CLIENT = int(os.environ.get("TERRANOVA_MAX_DOWNLOADS_PER_CLIENT", "4"))
+DOWNLOAD_QUEUE_SECONDS = float(os.environ.get("TERRANOVA_DOWNLOAD_QUEUE_SECONDS", "2"))
+DOWNLOAD_RETRY_AFTER_SECONDS = 5
+# Admin routes (profiling) are disabled unless a token is configured.
+ADMIN_TOKEN = os.environ.get("TERRANOVA_ADMIN_TOKEN", "")
+MAX_PROFILE_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_events(ready: List[str], removed: List[str]) -> Optional[CatalogSnapshot]:
+  """
+  Ingests the ready events, drops removed ones, and builds the next catalog
+  snapshot with the new fires' stats and vector payloads already cached.
+  Returns None when the catalog is unchanged.
+  """
+  if removed:
+    catalog_store.delete(removed)
+  ingested, _ = ingest(raster_index, catalog_store, ready)
+  if not ingested and not removed:
+    return None
+  snapshot = build_catalog(catalog_store.load_events(), catalog_store.load_descriptions())
+  warm_fire_caches(fire for fire in snapshot.fires if fire.get("mtbs_event_id") in ready)
+  return snapshot
+
+
+async def watch_catalog() -> None:
+  """
+  Polls DATA_ROOT for new, changed and removed event directories. Scanning,
+  ingestion and warm-up run on the ingest thread; only the final swap of
+  `catalog` happens on the event loop.
+  """
+  global catalog
+  loop = asyncio.get_running_loop()
+  while True:
+    await asyncio.sleep(INDEX_POLL_SECONDS)
+    try:
+      ready, removed = await loop.run_in_executor(ingest_pool, event_watcher.poll)
+      if ready or removed:
+        snapshot = await loop.run_in_executor(ingest_pool, ingest_events, ready, removed)
+        if snapshot is not None:
+          catalog = snapshot
+          logger.info("catalog updated: %d fires (ingested %s, removed %s)", len(snapshot.fires), ready, removed)
+      # `ready` includes events whose rasters were rewritten in place (the
+      # index re-stats their files), so their stats and roll-ups follow. An
+      # unsynced store means the startup warm-up failed; retry it here.
+      if ready or removed or not rollups.synced:
+        await loop.run_in_executor(ingest_pool, rollups.sync, catalog.fires, get_fire_stats)
+    except Exception:
+      # A bad event directory must not stop the watcher; it is retried when it changes.
+      logger.exception("catalog ingestion failed")
+
+
+def warm_fire_caches(fires: Iterable[Dict]) -> None:
+  for fire in fires:
+    get_fire_stats(fire)
+    mtbs_event_id = fire.get("mtbs_event_id")
+    for product in ("burn_bndy", "mask") if mtbs_event_id else ():
+      product_file = raster_index.get(mtbs_event_id, product)
+      if product_file:
+        for level in range(-1, MAX_SIMPLIFY_ZOOM + 1):
+          load_vector_payload(product_file.path, product_file.mtime_ns, level)
 
 
-app = FastAPI(title="TerraNova Demo API", version="0.2.0")
+def warm_catalog(fires: List[Dict]) -> None:
+  try:
+    warm_fire_caches(fires)
+  except Exception:
+    # Warming is an optimization; whatever was skipped is built on first request.
+    logger.exception("cache warm-up failed")
+  rollups.sync(fires, get_fire_stats)
+
+
+def log_warm_up(future: "asyncio.Future[None]") -> None:
+  if not future.cancelled() and future.exception() is not None:
+    # The watcher retries rollups.sync on its next poll while they are unsynced.
+    logger.error("roll-up warm-up failed", exc_info=future.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  warm_up = asyncio.get_running_loop().run_in_executor(ingest_pool, warm_catalog, catalog.fires)
+  warm_up.add_done_callback(log_warm_up)
+  watcher = asyncio.create_task(watch_catalog())
+  try:
+    yield
+  finally:
+    watcher.cancel()
+
+
+metrics = Metrics()
+profiler = SamplingProfiler()
+app = FastAPI(title="TerraNova Demo API", version="0.2.0", lifespan=lifespan)
 
 app.add_middleware(
   CORSMiddleware,
   allow_origins=["*"],
   allow_methods=["*"],
   allow_headers=["*"],
+  expose_headers=["ETag", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
+app.add_middleware(ProfilerMiddleware, profiler=profiler)
+# Added last so it wraps everything, CORS included.
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 
-FIRE_CATALOG: List[Dict] = [
+# Hand-written demo fires; MTBS events from the catalog store are merged in below.
+DEMO_FIRES: List[Dict] = [
   {
     "id": "camp-fire-2018",
     "name": "Camp Fire",
@@ -115,7 +251,54 @@ FIRE_CATALOG: List[Dict] = [
   },
 ]
 
-FIRE_LOOKUP: Dict[str, Dict] = {fire["id"]: fire for fire in FIRE_CATALOG}
+catalog_store = CatalogStore(CATALOG_DB)
+
+
+def fire_passages(fire: Dict, description: str) -> List[Passage]:
+  """Searchable text of one fire: catalog fields, MTBS assessment details and metadata prose."""
+  fire_id = fire["id"]
+  acres = f"{fire['acres']:,} acres" if fire.get("acres") is not None else "an unreported area"
+  passages = [
+    Passage(fire_id, "overview", f"The {fire['name']} burned {acres} in {fire['region']}, {fire['state']}, starting {fire['start_date']}. Cause: {fire['cause']}."),
+    Passage(fire_id, "summary", fire["summary"]),
+  ]
+  mtbs = fire.get("mtbs")
+  if mtbs:
+    pre, post = mtbs["preFire"], mtbs["postFire"]
+    passages.append(Passage(
+      fire_id,
+      "mtbs",
+      f"MTBS {mtbs.get('assessmentType') or ''} assessment of event {mtbs['eventId']} ({mtbs.get('incidentType') or 'fire'}, "
+      f"ignition date {fire['start_date']}, located at latitude {fire['lat']}, longitude {fire['lng']}): pre-fire {pre['sensor']} imagery from {pre['date']}, post-fire {post['sensor']} imagery from {post['date']}. "
+      f"dNBR severity thresholds: low {mtbs['thresholds']['low']}, moderate {mtbs['thresholds']['moderate']}, high {mtbs['thresholds']['high']}.",
+    ))
+  # MTBS metadata prose is program boilerplate up to the per-event "Fire Information" block.
+  program, marker, details = description.partition("Fire Information")
+  passages.extend(Passage(fire_id, "program", text) for text in split_passages(program))
+  passages.extend(Passage(fire_id, "metadata", text) for text in split_passages(marker + details))
+  return passages
+
+
+def build_ask_index(catalog: List[Dict], descriptions: Dict[str, str]) -> PassageIndex:
+  return PassageIndex(
+    passage
+    for fire in catalog
+    for passage in fire_passages(fire, descriptions.get(fire.get("mtbs_event_id") or "", ""))
+  )
+
+
+def build_catalog(events: List[Dict], descriptions: Dict[str, str]) -> CatalogSnapshot:
+  fires = merge_catalog(DEMO_FIRES, events)
+  return CatalogSnapshot(
+    fires=fires,
+    lookup={fire["id"]: fire for fire in fires},
+    index=FireCatalogIndex(fires),
+    ask_index=build_ask_index(fires, descriptions),
+  )
+
+
+# Replaced wholesale by watch_catalog(); handlers read it once per request.
+catalog = build_catalog(catalog_store.load_events(), catalog_store.load_descriptions())
 
 TIMELINE_STAGES = [
   {"value": 0, "label": "Pre-fire baseline", "description": "Vegetation health before ignition", "days_from_ignition": -30},
@@ -126,14 +309,112 @@ TIMELINE_STAGES = [
 ]
 
 
+# Product suffixes served per tile layer, in order of preference.
+TILE_PRODUCTS: Dict[str, List[str]] = {
+  "burn-severity": ["dnbr6"],
+  "reburn-risk": ["reburn_risk"],
+  "best-next-steps": ["best_next_steps_grid", "best_next_steps"],
+}
+
+tile_cache = TileCache(TILE_CACHE_DIR, TILE_CACHE_MAX_BYTES)
+pyramid_store = PyramidStore(PYRAMID_DIR)
+raster_index = RasterIndex(DATA_ROOT)
+event_watcher = EventWatcher(raster_index)
+# Events on disk that the catalog store has not seen yet are ingested on the first polls.
+event_watcher.watch(set(raster_index.events()) - set(catalog_store.source_mtimes()))
+ingest_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="terranova-ingest")
+scenario_cache = ResponseCache(SCENARIO_CACHE_ENTRIES)
+scenario_broadcaster = Broadcaster()
+composite_cache = ResponseCache(COMPOSITE_CACHE_ENTRIES)
+rollups = RollupStore()
+aggregate_cache = ResponseCache(AGGREGATE_CACHE_ENTRIES)
+download_limiter = DownloadLimiter(MAX_DOWNLOADS, MAX_DOWNLOADS_PER_CLIENT, DOWNLOAD_QUEUE_SECONDS)
+file_server = FileServer(FILE_IO_THREADS, download_limiter, DOWNLOAD_RETRY_AFTER_SECONDS)
+
+metrics.register_cache("scenario", lambda: CacheStats(scenario_cache.hits, scenario_cache.misses, len(scenario_cache)))
+metrics.register_cache("composites", lambda: CacheStats(composite_cache.hits, composite_cache.misses, len(composite_cache)))
+metrics.register_cache("composite_inputs", lru_cache_stats(load_inputs))
+metrics.register_cache("shared_rasters", lambda: CacheStats(shared_arrays.hits, shared_arrays.misses, len(shared_arrays)))
+metrics.register_cache("aggregates", lambda: CacheStats(aggregate_cache.hits, aggregate_cache.misses, len(aggregate_cache)))
+metrics.register_cache("tiles", lambda: CacheStats(tile_cache.hits, tile_cache.misses, len(tile_cache)))
+metrics.register_cache("fire_stats", lru_cache_stats(compute_stats))
+metrics.register_cache("vector_payloads", lru_cache_stats(load_vector_payload))
+metrics.register_cache("tile_sources", lru_cache_stats(load_source))
+metrics.register_value("terranova_downloads_active", "gauge", "Raster downloads currently sending a body.", lambda: download_limiter.active)
+metrics.register_value("terranova_downloads_shed_total", "counter", "Raster downloads refused with 503 by the download limits.", lambda: download_limiter.shed)
+
+
 def clamp(value: float, low: float = 0.0, high: float = 1.0) -> float:
   return max(low, min(high, value))
 
 
 def pick_fire(fire_id: Optional[str]) -> Dict:
-  if fire_id and fire_id in FIRE_LOOKUP:
-    return FIRE_LOOKUP[fire_id]
-  return FIRE_CATALOG[0]
+  snapshot = catalog
+  if fire_id and fire_id in snapshot.lookup:
+    return snapshot.lookup[fire_id]
+  return snapshot.fires[0]
+
+
+def find_mtbs_raster(fire_id: str, products: List[str], label: Optional[str] = None) -> ProductFile:
+  """
+  Resolves a fire to the first indexed MTBS product among `products`
+  (e.g. ["best_next_steps_grid", "best_next_steps"]).
+  """
+  fire = pick_fire(fire_id)
+  mtbs_event_id = fire.get("mtbs_event_id")
+  if not mtbs_event_id:
+    raise HTTPException(status_code=404, detail=f"No MTBS data available for fire: {fire_id}")
+
+  product_file = raster_index.first(mtbs_event_id, products)
+  if not product_file:
+    label = label or f"MTBS raster ({products[0]}.tif)"
+    raise HTTPException(status_code=404, detail=f"{label} not found for fire: {fire_id}")
+  return product_file
+
+
+async def raster_response(request: Request, product_file: ProductFile, filename: str, media_type: str = "image/tiff") -> Response:
+  # Stat at serve time: a file rewritten in place since the last index poll
+  # must not go out under its old ETag and length.
+  try:
+    product_file = product_file._replace(stat=await file_server.run(os.stat, product_file.path))
+  except FileNotFoundError:
+    raise HTTPException(status_code=404, detail=f"{os.path.basename(product_file.path)} was removed")
+  return await file_server.serve(
+    request,
+    product_file.path,
+    product_file.stat,
+    product_file.etag,
+    media_type=media_type,
+    headers={
+      "Content-Disposition": f"inline; filename={filename}",
+      "Access-Control-Allow-Origin": "*",
+    },
+    # Counted as sent, so HEAD requests and aborted downloads add only what went out.
+    on_sent=lambda size: metrics.add_file_bytes(product_file.product, size),
+  )
+
+
+async def pyramid_response(
+  request: Request,
+  product_file: ProductFile,
+  filename: str,
+  max_dim: Optional[int],
+  resolution: Optional[float],
+) -> Response:
+  """Serves `product_file`, or its pyramid level when maxDim/resolution ask for a smaller raster."""
+  if max_dim is None and resolution is None:
+    return await raster_response(request, product_file, filename)
+  level = await file_server.run(pyramid_store.select, product_file, max_dim, resolution)
+  if level is not product_file:
+    filename = filename.replace(".tif", f"_{level.path.rsplit('_', 1)[-1]}")
+  return await raster_response(request, level, filename)
+
+
+def get_fire_stats(fire: Dict) -> Optional[Dict]:
+  mtbs_event_id = fire.get("mtbs_event_id")
+  if not mtbs_event_id:
+    return None
+  return fire_stats(raster_index.products(mtbs_event_id))
 
 
 def parse_priority(value: Optional[float], fallback: float) -> float:
@@ -149,10 +430,10 @@ def normalize_priorities(raw: Dict[str, float]) -> Dict[str, float]:
   return {k: v / total for k, v in raw.items()}
 
 
-def jitter_coords(lat: float, lng: float, delta: float = 0.18) -> List[float]:
+def jitter_coords(rng: random.Random, lat: float, lng: float, delta: float = 0.18) -> List[float]:
   return [
-    round(lat + random.uniform(-delta, delta), 4),
-    round(lng + random.uniform(-delta, delta), 4),
+    round(lat + rng.uniform(-delta, delta), 4),
+    round(lng + rng.uniform(-delta, delta), 4),
   ]
 
 
@@ -161,15 +442,15 @@ def get_timeline_meta(stage: int) -> Dict:
   return TIMELINE_STAGES[int(idx)]
 
 
-def generate_hotspots(fire: Dict) -> List[Dict]:
+def generate_hotspots(fire: Dict, rng: random.Random) -> List[Dict]:
   base_lat, base_lng = fire["lat"], fire["lng"]
   hotspots = []
   for idx in range(3):
-    coords = jitter_coords(base_lat, base_lng, delta=0.25)
+    coords = jitter_coords(rng, base_lat, base_lng, delta=0.25)
     hotspots.append({
       "id": f"{fire['id']}-sector-{idx}",
       "title": f"Sector {idx + 1}",
-      "details": random.choice([
+      "details": rng.choice([
         "Watershed slopes showing hydrophobic soils.",
         "Dense structure grid; ember threat remains.",
         "Steep canyon with unstable ash covering.",
@@ -180,62 +461,85 @@ def generate_hotspots(fire: Dict) -> List[Dict]:
   return hotspots
 
 
-def generate_layers(fire: Dict, timeline_meta: Dict, priorities: Dict[str, float]) -> Dict[str, List[Dict]]:
-  stage_index = timeline_meta["value"]
-  decay = 1 - (stage_index / (len(TIMELINE_STAGES) - 1)) * 0.55
-  layers: Dict[str, List[Dict]] = {
-    "burnSeverity": [],
-    "reburnRisk": [],
-    "bestNextSteps": [],
-  }
+LAYER_COLORS: Dict[str, str] = {
+  "burnSeverity": "#ff4e1f",
+  "reburnRisk": "#ff6b35",
+  "bestNextSteps": "#4ecdc4",
+}
+# Priority slider that scales each layer's footprint.
+LAYER_PRIORITIES: Dict[str, str] = {
+  "burnSeverity": "community",
+  "reburnRisk": "community",
+  "bestNextSteps": "community",
+}
+BLOBS_PER_LAYER = 2
+MIN_BLOB_RADIUS = 8000
+# Timeline x priority combinations per /api/scenario/batch request.
+MAX_BATCH_CELLS = 50_000
+
+# (coords, radius factor, intensity offset) per blob, per layer.
+LayerNoise = Dict[str, List[Tuple[List[float], float, float]]]
+
+
+def draw_layer_noise(fire: Dict, rng: random.Random) -> LayerNoise:
+  """
+  The random part of the layer blobs. It depends only on the fire and seed,
+  so blobs stay put while the timeline and priority sliders move, and the
+  batch endpoint can evaluate every slider state from the same draws.
+  """
+  noise: LayerNoise = {}
+  for layer_key in LAYER_COLORS:
+    noise[layer_key] = [
+      (jitter_coords(rng, fire["lat"], fire["lng"], delta=0.22), rng.uniform(0.8, 1.2), rng.uniform(-0.08, 0.08))
+      for _ in range(BLOBS_PER_LAYER)
+    ]
+  return noise
+
+
+def timeline_decay(stage_index: int) -> float:
+  return 1 - (stage_index / (len(TIMELINE_STAGES) - 1)) * 0.55
 
-  color_map = {
-    "burnSeverity": "#ff4e1f",
-    "reburnRisk": "#ff6b35",
-    "bestNextSteps": "#4ecdc4",
-  }
 
+def generate_layers(fire: Dict, timeline_meta: Dict, priorities: Dict[str, float], noise: LayerNoise) -> Dict[str, List[Dict]]:
+  decay = timeline_decay(timeline_meta["value"])
   base_radius = fire["perimeter_radius"]
-  center_lat, center_lng = fire["lat"], fire["lng"]
-
-  for layer_key in layers.keys():
-    weight = priorities.get({
-      "burnSeverity": "community",
-      "reburnRisk": "community",
-      "bestNextSteps": "community",
-    }[layer_key], 0.25)
-
-    for _ in range(2):
-      coords = jitter_coords(center_lat, center_lng, delta=0.22)
-      radius = int(base_radius * (0.6 + weight * 0.8) * decay * random.uniform(0.8, 1.2))
-      intensity = clamp((0.55 + weight * 0.5) * decay + random.uniform(-0.08, 0.08))
+  layers: Dict[str, List[Dict]] = {}
+
+  for layer_key, blobs in noise.items():
+    weight = priorities.get(LAYER_PRIORITIES[layer_key], 0.25)
+    layers[layer_key] = []
+    for coords, radius_factor, intensity_offset in blobs:
+      radius = int(base_radius * (0.6 + weight * 0.8) * decay * radius_factor)
+      intensity = clamp((0.55 + weight * 0.5) * decay + intensity_offset)
       layers[layer_key].append({
         "coords": coords,
-        "radius": max(8000, radius),
-        "color": color_map[layer_key],
+        "radius": max(MIN_BLOB_RADIUS, radius),
+        "color": LAYER_COLORS[layer_key],
         "intensity": round(intensity, 2),
       })
 
   return layers
 
 
+PRIORITY_LABELS: Dict[str, str] = {
+  "community": "Community safety",
+  "watershed": "Watershed health",
+  "infrastructure": "Infrastructure readiness",
+}
+PRIORITY_SUMMARIES: Dict[str, str] = {
+  "community": "Focus on structure protection and WUI buffers.",
+  "watershed": "Stabilize slopes and protect drinking water sheds.",
+  "infrastructure": "Keep roads, utilities, and comms online.",
+}
+
+
 def summarize_priorities(priorities: Dict[str, float]) -> List[Dict]:
-  labels = {
-    "community": "Community safety",
-    "watershed": "Watershed health",
-    "infrastructure": "Infrastructure readiness",
-  }
-  summaries = {
-    "community": "Focus on structure protection and WUI buffers.",
-    "watershed": "Stabilize slopes and protect drinking water sheds.",
-    "infrastructure": "Keep roads, utilities, and comms online.",
-  }
   result = []
   for key, value in priorities.items():
     result.append({
-      "label": labels[key],
+      "label": PRIORITY_LABELS[key],
       "score": round(value * 100),
-      "summary": summaries[key],
+      "summary": PRIORITY_SUMMARIES[key],
     })
   result.sort(key=lambda item: item["score"], reverse=True)
   return result
@@ -278,112 +582,243 @@ def generate_insights(fire: Dict, timeline_meta: Dict) -> List[Dict]:
   ]
 
 
-def format_stats(fire: Dict) -> Dict:
+def format_stats(fire: Dict, rng: random.Random) -> Dict:
   # Weather conditions (dummy data for now)
   temps = [68, 72, 75, 78, 82, 85]
   conditions = ["Clear", "Partly Cloudy", "Sunny", "Windy"]
-  temp = random.choice(temps)
-  condition = random.choice(conditions)
+  temp = rng.choice(temps)
+  condition = rng.choice(conditions)
   weather = f"{temp}°F, {condition}"
   
-  # Reburn risk (dummy data - will be calculated later based on burn history)
-  # For now, randomly assign High/Medium/Low
-  risk_levels = ["High", "Medium", "Low"]
-  risk_weights = [0.3, 0.5, 0.2]  # 30% High, 50% Medium, 20% Low
-  reburn_risk = random.choices(risk_levels, weights=risk_weights)[0]
+  severity_stats = get_fire_stats(fire)
+  if severity_stats and severity_stats["reburnRisk"] and severity_stats["reburnRisk"]["level"]:
+    # Dominant reburn risk class inside the burn boundary
+    reburn_risk = severity_stats["reburnRisk"]["level"]
+  else:
+    # No reburn raster for this fire yet - keep the demo distribution
+    risk_levels = ["High", "Medium", "Low"]
+    risk_weights = [0.3, 0.5, 0.2]  # 30% High, 50% Medium, 20% Low
+    reburn_risk = rng.choices(risk_levels, weights=risk_weights)[0]
   
-  incidents = random.randint(3, 8)
-  updated = f"{fire['region']} · Updated {random.randint(15, 80)} mins ago"
-  return {
+  if severity_stats:
+    # One alert per connected high-severity patch
+    incidents = severity_stats["highSeverityPatches"]
+  else:
+    incidents = rng.randint(3, 8)
+  updated = f"{fire['region']} · Updated {rng.randint(15, 80)} mins ago"
+  stats = {
     "weather": weather,
     "reburnRisk": reburn_risk,
     "incidents": incidents,
     "updated": updated,
     "acres": fire["acres"],
   }
+  if severity_stats:
+    stats["mappedAcres"] = severity_stats["mappedAcres"]
+    stats["highRatio"] = severity_stats["highRatio"]
+    stats["unburnedRatio"] = severity_stats["unburnedRatio"]
+  return stats
+
+
+def parse_coordinates(value: str, count: int, name: str) -> List[float]:
+  try:
+    parts = [float(part) for part in value.split(",")]
+  except ValueError:
+    parts = []
+  if len(parts) != count:
+    raise HTTPException(status_code=400, detail=f"{name} must be {count} comma-separated numbers")
+  return parts
 
 
 @app.get("/api/fires")
 async def list_fires(
   state: Optional[str] = Query(None, description="Filter by state code (e.g., CA, OR)"),
   year: Optional[int] = Query(None, description="Filter by year"),
+  bbox: Optional[str] = Query(None, description="minLng,minLat,maxLng,maxLat"),
+  near: Optional[str] = Query(None, description="lat,lng to search around"),
+  radius: float = Query(50, gt=0, le=5000, description="Search radius in km for `near`"),
+  limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum fires per page"),
+  cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
 ):
   """
-  Returns list of fires, optionally filtered by state and year.
-  Results are sorted by most recent first.
+  Returns list of fires, optionally filtered by state, year, bounding box
+  or distance. Results are sorted by most recent first; pass `limit` to page
+  through them with `cursor`.
   """
-  filtered_fires = FIRE_CATALOG.copy()
-  
-  # Apply filters
-  if state:
-    state_upper = state.upper().strip()
-    filtered_fires = [f for f in filtered_fires if f["state"].upper() == state_upper]
-  
-  if year:
-    filtered_fires = [
-      f for f in filtered_fires 
-      if f["start_date"] and int(f["start_date"].split("-")[0]) == year
-    ]
-  
-  # Sort by year descending (newest first), then by date within same year
-  def get_sort_key(fire: Dict) -> tuple:
-    date_str = fire.get("start_date", "") or ""
-    if date_str:
-      try:
-        # Extract year, month, day for proper sorting
-        parts = date_str.split("-")
-        if len(parts) >= 3:
-          year = int(parts[0])
-          month = int(parts[1])
-          day = int(parts[2])
-          # Return tuple for sorting: (-year, -month, -day) for descending order
-          return (-year, -month, -day)
-      except (ValueError, IndexError):
-        pass
-    return (0, 0, 0)  # Put fires without dates at the end
-  
-  sorted_fires = sorted(filtered_fires, key=get_sort_key)
+  bbox_value = parse_coordinates(bbox, 4, "bbox") if bbox else None
+  near_value = parse_coordinates(near, 2, "near") if near else None
+  try:
+    cursor_key = decode_cursor(cursor) if cursor else None
+  except (ValueError, TypeError):
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+  fires, next_key = catalog.index.query(
+    state=state,
+    year=year,
+    bbox=tuple(bbox_value) if bbox_value else None,
+    near=tuple(near_value) if near_value else None,
+    radius_m=radius * 1000,
+    limit=limit,
+    cursor=cursor_key,
+  )
   
-  return {"fires": sorted_fires}
+  return {"fires": fires, "nextCursor": encode_cursor(next_key) if next_key else None}
 
 
-@app.get("/api/scenario")
-async def get_scenario(
-  fireId: Optional[str] = Query(None, description="Fire identifier"),
-  timeline: int = Query(2, ge=0, le=4),
-  priorityCommunity: int = Query(70, ge=0, le=100),
-  priorityWatershed: int = Query(55, ge=0, le=100),
-  priorityInfrastructure: int = Query(60, ge=0, le=100),
+@app.get("/api/fires/{fire_id}/stats")
+async def get_fire_severity_stats(fire_id: str):
+  """
+  Returns burn-severity zonal statistics for an MTBS-mapped fire: acres per
+  dnbr6 class inside the burn boundary, the reburn-risk distribution and the
+  unburned/high ratios. Computed once per raster version and cached.
+  """
+  fire = catalog.lookup.get(fire_id)
+  if not fire:
+    raise HTTPException(status_code=404, detail=f"Unknown fire: {fire_id}")
+
+  severity_stats = await run_in_threadpool(get_fire_stats, fire)
+  if not severity_stats:
+    raise HTTPException(status_code=404, detail=f"No MTBS data available for fire: {fire_id}")
+
+  return {
+    "fireId": fire_id,
+    "eventId": fire["mtbs_event_id"],
+    **severity_stats,
+  }
+
+
+def parse_names(value: Optional[str], allowed: Tuple[str, ...], name: str) -> Tuple[str, ...]:
+  names = tuple(dict.fromkeys(part.strip() for part in (value or "").split(",") if part.strip()))
+  unknown = [part for part in names if part not in allowed]
+  if unknown:
+    raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(unknown)} (expected {', '.join(allowed)})")
+  return names
+
+
+@app.get("/api/aggregates")
+async def get_aggregates(
+  request: Request,
+  groupBy: Optional[str] = Query(None, description=f"Comma-separated dimensions ({', '.join(GROUP_DIMENSIONS)}); empty for catalog totals"),
+  metric: Optional[str] = Query(None, description="Comma-separated metrics (default: all)"),
 ):
-  fire = pick_fire(fireId)
-  timeline_meta = get_timeline_meta(timeline)
+  """
+  Returns catalog roll-ups: fire counts, reported and mapped acres, burned
+  acres per dnbr6 severity class and high-severity patches, summed per group.
+  Every grouping is kept materialized and updated per fire as fires are
+  ingested or their rasters change, so a read never scans the catalog.
+  """
+  if not rollups.synced:
+    raise HTTPException(
+      status_code=503,
+      detail="Aggregates are still being built",
+      headers={"Retry-After": str(int(INDEX_POLL_SECONDS) or 1)},
+    )
+  group_by = parse_names(groupBy, GROUP_DIMENSIONS, "groupBy dimension")
+  metric_names = parse_names(metric, METRICS, "metric") or METRICS
 
-  raw_priorities = {
-    "community": parse_priority(priorityCommunity, 70),
-    "watershed": parse_priority(priorityWatershed, 55),
-    "infrastructure": parse_priority(priorityInfrastructure, 60),
+  def build() -> Dict:
+    version, groups = rollups.query(group_by, metric_names)
+    return {"groupBy": list(group_by), "metrics": list(metric_names), "version": version, "groups": groups}
+
+  entry = aggregate_cache.get_or_build((rollups.version, group_by, metric_names), build)
+  return json_response(request, entry)
+
+
+def vector_response(request: Request, fire_id: str, product: str, zoom: Optional[int], tolerance: Optional[float]) -> Response:
+  fire = catalog.lookup.get(fire_id)
+  if not fire:
+    raise HTTPException(status_code=404, detail=f"Unknown fire: {fire_id}")
+  mtbs_event_id = fire.get("mtbs_event_id")
+  product_file = raster_index.get(mtbs_event_id, product) if mtbs_event_id else None
+  if not product_file:
+    raise HTTPException(status_code=404, detail=f"MTBS {product} shapefile not found for fire: {fire_id}")
+
+  payload = load_vector_payload(product_file.path, product_file.mtime_ns, tolerance_level(zoom, tolerance))
+  gzipped = accepts_encoding(request.headers.get("accept-encoding"), "gzip")
+  etag = payload.gzip_etag if gzipped else payload.etag
+  headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+  if etag_matches(request.headers.get("if-none-match"), etag):
+    return Response(status_code=304, headers=headers)
+  if gzipped:
+    return Response(content=payload.gzipped, media_type="application/geo+json", headers={**headers, "Content-Encoding": "gzip"})
+  return Response(content=payload.body, media_type="application/geo+json", headers=headers)
+
+
+@app.get("/api/fires/{fire_id}/perimeter")
+async def get_fire_perimeter(
+  request: Request,
+  fire_id: str,
+  zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom the geometry will be drawn at"),
+  tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in Web Mercator meters"),
+):
+  """
+  Returns the MTBS burn boundary (*_burn_bndy.shp) as WGS84 GeoJSON.
+  Pass `zoom` or `tolerance` for a simplified, coordinate-quantized version.
+  """
+  return await run_in_threadpool(vector_response, request, fire_id, "burn_bndy", zoom, tolerance)
+
+
+@app.get("/api/fires/{fire_id}/mask")
+async def get_fire_mask(
+  request: Request,
+  fire_id: str,
+  zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom the geometry will be drawn at"),
+  tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in Web Mercator meters"),
+):
+  """
+  Returns the MTBS non-processing mask (*_mask.shp: clouds, shadows, data gaps)
+  as WGS84 GeoJSON, with the same simplification options as /perimeter.
+  """
+  return await run_in_threadpool(vector_response, request, fire_id, "mask", zoom, tolerance)
+
+
+def scenario_seed(*key) -> int:
+  """Stable across processes and restarts, unlike hash()."""
+  digest = hashlib.sha256(json.dumps(key, separators=(",", ":")).encode("utf-8")).digest()
+  return int.from_bytes(digest[:8], "big")
+
+
+def fire_data_version(fire: Dict) -> Tuple:
+  """
+  A digest of the fire's catalog entry (re-ingested metadata changes it)
+  followed by the mtimes of the rasters behind its real stats, if any.
+  """
+  entry = hashlib.sha1(json.dumps(fire, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+  mtbs_event_id = fire.get("mtbs_event_id")
+  if not mtbs_event_id:
+    return (entry,)
+  products = raster_index.products(mtbs_event_id)
+  return (entry,) + tuple(products[product][0].mtime_ns for product in STATS_PRODUCTS if products.get(product))
+
+
+def scenario_fire(fire: Dict) -> Dict:
+  return {
+    "id": fire["id"],
+    "name": fire["name"],
+    "state": fire["state"],
+    "region": fire["region"],
+    "summary": fire["summary"],
+    "acres": fire["acres"],
+    "startDate": fire["start_date"],
+    "cause": fire["cause"],
+    "center": [fire["lat"], fire["lng"]],
   }
+
+
+def build_scenario(fire: Dict, timeline: int, raw_priorities: Dict[str, float], seed: int) -> Dict:
+  rng = random.Random(scenario_seed(fire["id"], seed))
+  timeline_meta = get_timeline_meta(timeline)
   normalized_priorities = normalize_priorities(raw_priorities)
 
-  layers = generate_layers(fire, timeline_meta, normalized_priorities)
+  layers = generate_layers(fire, timeline_meta, normalized_priorities, draw_layer_noise(fire, rng))
   priorities_summary = summarize_priorities(normalized_priorities)
-  hotspots = generate_hotspots(fire)
+  hotspots = generate_hotspots(fire, rng)
   next_steps = generate_next_steps(fire, normalized_priorities, timeline_meta)
   insights = generate_insights(fire, timeline_meta)
-  stats = format_stats(fire)
-
-  response = {
-    "fire": {
-      "id": fire["id"],
-      "name": fire["name"],
-      "state": fire["state"],
-      "region": fire["region"],
-      "summary": fire["summary"],
-      "acres": fire["acres"],
-      "startDate": fire["start_date"],
-      "cause": fire["cause"],
-      "center": [fire["lat"], fire["lng"]],
-    },
+  stats = format_stats(fire, rng)
+
+  return {
+    "fire": scenario_fire(fire),
     "timeline": timeline_meta,
     "stats": stats,
     "layers": layers,
@@ -394,193 +829,635 @@ async def get_scenario(
     "mapTip": f"{timeline_meta['label']} · {timeline_meta['description']}",
     "generatedAt": datetime.now(timezone.utc).isoformat(),
   }
-  return response
+
+
+def build_scenario_grid(fire: Dict, timelines: List[int], raw_vectors: List[Tuple[int, int, int]], seed: int) -> Dict:
+  """
+  Every (timeline, priority vector) combination at once. Uses the same draws
+  and formulas as build_scenario, evaluated as (timeline, vector, blob)
+  NumPy arrays, so each cell matches the single-scenario payload.
+  """
+  rng = random.Random(scenario_seed(fire["id"], seed))
+  noise = draw_layer_noise(fire, rng)
+  hotspots = generate_hotspots(fire, rng)
+  stats = format_stats(fire, rng)
+
+  timeline_metas = [get_timeline_meta(stage) for stage in timelines]
+  decay = 1 - (np.array([meta["value"] for meta in timeline_metas], dtype=np.float64) / (len(TIMELINE_STAGES) - 1)) * 0.55
+
+  # (vectors, priorities) normalized weights, as parse_priority + normalize_priorities
+  priority_keys = list(PRIORITY_LABELS)
+  raw = np.clip(np.array(raw_vectors, dtype=np.float64).reshape(-1, len(priority_keys)) / 100.0, 0.05, 1.0)
+  weights = raw / raw.sum(axis=1, keepdims=True)
+  scores = np.round(weights * 100).astype(np.int64)
+  # Stable sort keeps slider order on ties, like summarize_priorities
+  order = np.argsort(-scores, axis=1, kind="stable")
+
+  layers: Dict[str, Dict] = {}
+  for layer_key, blobs in noise.items():
+    weight = weights[:, priority_keys.index(LAYER_PRIORITIES[layer_key])]
+    radius_factors = np.array([blob[1] for blob in blobs])
+    intensity_offsets = np.array([blob[2] for blob in blobs])
+    radius = (fire["perimeter_radius"] * (0.6 + weight * 0.8))[None, :, None] * decay[:, None, None] * radius_factors
+    intensity = ((0.55 + weight * 0.5)[None, :, None] * decay[:, None, None] + intensity_offsets).clip(0.0, 1.0)
+    layers[layer_key] = {
+      "color": LAYER_COLORS[layer_key],
+      "coords": [blob[0] for blob in blobs],
+      "radius": np.maximum(MIN_BLOB_RADIUS, radius.astype(np.int64)).tolist(),
+      "intensity": np.round(intensity, 2).tolist(),
+    }
+
+  return {
+    "fire": scenario_fire(fire),
+    "timelines": timeline_metas,
+    "priorities": {
+      "keys": priority_keys,
+      "labels": [PRIORITY_LABELS[key] for key in priority_keys],
+      "summaries": [PRIORITY_SUMMARIES[key] for key in priority_keys],
+      "vectors": [list(vector) for vector in raw_vectors],
+      "scores": scores.tolist(),
+      "order": order.tolist(),
+    },
+    "layers": layers,
+    "stats": stats,
+    "markers": hotspots,
+    "generatedAt": datetime.now(timezone.utc).isoformat(),
+  }
+
+
+def json_response(request: Request, entry: CachedBody) -> Response:
+  headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+  if etag_matches(request.headers.get("if-none-match"), entry.etag):
+    return Response(status_code=304, headers=headers)
+  return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/scenario")
+async def get_scenario(
+  request: Request,
+  fireId: Optional[str] = Query(None, description="Fire identifier"),
+  timeline: int = Query(2, ge=0, le=4),
+  priorityCommunity: int = Query(70, ge=0, le=100),
+  priorityWatershed: int = Query(55, ge=0, le=100),
+  priorityInfrastructure: int = Query(60, ge=0, le=100),
+  seed: int = Query(0, description="Variant of the generated demo values"),
+):
+  """
+  Scenario for a fire at one timeline stage and priority mix.
+
+  Demo values are drawn from a generator seeded with (fire, seed), so the
+  same slider positions always give the same payload. Serialized bodies are
+  kept in an LRU keyed on the inputs plus versions of the fire's catalog
+  entry and rasters, and carry an ETag; scrubbing back to a seen position
+  costs a dict lookup.
+  """
+  fire = pick_fire(fireId)
+  raw_priorities = {
+    "community": parse_priority(priorityCommunity, 70),
+    "watershed": parse_priority(priorityWatershed, 55),
+    "infrastructure": parse_priority(priorityInfrastructure, 60),
+  }
+  key = (fire["id"], timeline, tuple(raw_priorities.values()), seed) + fire_data_version(fire)
+  entry = scenario_cache.get_or_build(key, lambda: build_scenario(fire, timeline, raw_priorities, seed))
+  return json_response(request, entry)
+
+
+def scenario_diff(previous: Dict, current: Dict) -> Dict:
+  """
+  Top-level scenario fields that changed; layers and stats are compared one
+  entry deeper so a tick only carries the layers/stats that moved.
+  """
+  changes: Dict = {}
+  for key, value in current.items():
+    if key in ("layers", "stats"):
+      nested = {name: item for name, item in value.items() if previous[key].get(name) != item}
+      if nested:
+        changes[key] = nested
+    elif previous.get(key) != value:
+      changes[key] = value
+  return changes
+
+
+async def produce_scenario_stream(channel: Channel, fire: Dict, raw_priorities: Dict[str, float], seed: int, stage: int, advance: bool) -> None:
+  previous: Optional[Dict] = None
+  while True:
+    try:
+      current = await run_in_threadpool(build_scenario, fire, stage, raw_priorities, seed)
+    except Exception as exc:
+      channel.publish("error", {"detail": str(exc)}, snapshot=None)
+    else:
+      if previous is None:
+        channel.publish("snapshot", current, snapshot=current)
+      else:
+        channel.publish("diff", {"changes": scenario_diff(previous, current)}, snapshot=current)
+      previous = current
+      if advance:
+        stage = (stage + 1) % len(TIMELINE_STAGES)
+    await asyncio.sleep(STREAM_TICK_SECONDS)
+
+
+@app.get("/api/scenario/stream")
+async def stream_scenario(
+  fireId: Optional[str] = Query(None, description="Fire identifier"),
+  timeline: int = Query(0, ge=0, le=4, description="Stage to start from (or to hold when advance=false)"),
+  advance: bool = Query(True, description="Step through the timeline stages on every tick"),
+  priorityCommunity: int = Query(70, ge=0, le=100),
+  priorityWatershed: int = Query(55, ge=0, le=100),
+  priorityInfrastructure: int = Query(60, ge=0, le=100),
+  seed: int = Query(0, description="Variant of the generated demo values"),
+  format: str = Query("sse", pattern="^(sse|ndjson)$", description="sse (text/event-stream) or ndjson"),
+):
+  """
+  Live scenario updates over one open connection.
+
+  The first event is a full `snapshot`; each tick (TERRANOVA_STREAM_TICK_SECONDS)
+  then sends a `diff` with only the changed fields (layers, stats, markers,
+  timeline, generatedAt). Clients asking for the same fire, priorities,
+  seed, mode and starting timeline share one producer, so each tick is computed once and fanned out.
+  """
+  fire = pick_fire(fireId)
+  raw_priorities = {
+    "community": parse_priority(priorityCommunity, 70),
+    "watershed": parse_priority(priorityWatershed, 55),
+    "infrastructure": parse_priority(priorityInfrastructure, 60),
+  }
+  # `timeline` is the starting stage when advancing, so it is part of the key either way.
+  key = (fire["id"], tuple(raw_priorities.values()), seed, advance, timeline)
+
+  async def events():
+    produce = lambda channel: produce_scenario_stream(channel, fire, raw_priorities, seed, timeline, advance)
+    async with scenario_broadcaster.subscribe(key, produce) as queue:
+      while True:
+        event = await queue.get()
+        yield event.sse() if format == "sse" else event.ndjson()
+
+  media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+  return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def parse_priority_vectors(priorities: Optional[str], step: Optional[int]) -> List[Tuple[int, int, int]]:
+  if step:
+    levels = list(range(0, 101, step))
+    if levels[-1] != 100:
+      levels.append(100)
+    return [(community, watershed, infrastructure) for community in levels for watershed in levels for infrastructure in levels]
+  if not priorities:
+    return [(70, 55, 60)]
+  vectors = []
+  for chunk in priorities.split(";"):
+    try:
+      vector = tuple(int(value) for value in chunk.split(","))
+    except ValueError:
+      vector = ()
+    if len(vector) != 3 or not all(0 <= value <= 100 for value in vector):
+      raise HTTPException(status_code=400, detail=f"Invalid priority vector: {chunk!r}")
+    vectors.append(vector)
+  return vectors
+
+
+@app.get("/api/scenario/batch")
+async def get_scenario_batch(
+  request: Request,
+  fireId: Optional[str] = Query(None, description="Fire identifier"),
+  timelines: Optional[str] = Query(None, description="Comma-separated timeline stages (default: all)"),
+  priorities: Optional[str] = Query(None, description="Priority vectors as community,watershed,infrastructure;..."),
+  step: Optional[int] = Query(None, ge=1, le=100, description="Instead of `priorities`, every slider combination at this step"),
+  seed: int = Query(0, description="Variant of the generated demo values"),
+):
+  """
+  Layer radii/intensities and priority rankings for a whole grid of
+  timeline stages x priority vectors, so the client can prefetch every
+  slider state and animate locally.
+
+  `layers.*.radius` and `layers.*.intensity` are indexed
+  [timeline][vector][blob]; `priorities.scores`/`order` are per vector.
+  """
+  fire = pick_fire(fireId)
+  if timelines:
+    try:
+      stages = [int(value) for value in timelines.split(",")]
+    except ValueError:
+      stages = []
+    if not stages or not all(0 <= stage < len(TIMELINE_STAGES) for stage in stages):
+      raise HTTPException(status_code=400, detail=f"Invalid timelines: {timelines!r}")
+  else:
+    stages = [stage["value"] for stage in TIMELINE_STAGES]
+  vectors = parse_priority_vectors(priorities, step)
+  if len(stages) * len(vectors) > MAX_BATCH_CELLS:
+    raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_CELLS:,} timeline x priority combinations per request")
+
+  key = ("batch", fire["id"], tuple(stages), tuple(vectors), seed) + fire_data_version(fire)
+  entry = await run_in_threadpool(scenario_cache.get_or_build, key, lambda: build_scenario_grid(fire, stages, vectors, seed))
+  return json_response(request, entry)
+
+
+# Question intents, most specific first; keywords match as word prefixes.
+ASK_INTENTS = (
+  ("origin", ("cause", "start", "ignit")),
+  ("severity", ("damage", "severe", "severity", "impact")),
+  ("date", ("when", "date")),
+  ("location", ("where", "location")),
+  ("recovery", ("recover", "rehab", "restor")),
+  ("model", ("model", "algorithm", "how")),
+)
+ask_intents = IntentMatcher(ASK_INTENTS)
+
+# Extra retrieval terms per intent, so the passages ranked for a terse
+# question favour the MTBS details that intent is about.
+ASK_INTENT_TERMS: Dict[Optional[str], List[str]] = {
+  "origin": tokenize("ignition start date cause"),
+  "severity": tokenize("burn severity dNBR thresholds high moderate low acres"),
+  "date": tokenize("ignition date assessment imagery"),
+  "location": tokenize("state latitude longitude bounding coordinates"),
+  "recovery": tokenize("recovery vegetation extended assessment"),
+  "model": tokenize("satellite imagery Landsat Sentinel dNBR 30 meter"),
+  None: [],
+}
+
+ASK_TEMPLATES: Dict[Optional[str], str] = {
+  "origin": "The {name} started on {start_date} in {region}, {state}. The cause was determined to be {cause_lower}.",
+  "severity": "The {name} burned approximately {acres_text}. {summary} Our burn severity model classifies the area into high, moderate, and low severity zones to help prioritize recovery efforts.",
+  "date": "The {name} ignited on {start_date}. The initial MTBS-style assessment typically occurs within 7 days of ignition, with follow-up mapping at 30 days and long-term recovery tracking extending to 1-5 years.",
+  "location": "The {name} occurred in {region}, {state}. You can see the exact location on the map above, with burn severity overlays showing the spatial extent of damage.",
+  "recovery": "Recovery from the {name} is ongoing. Our model tracks burn severity changes over time, helping land managers prioritize watershed stabilization, erosion control, and vegetation reseeding. Adjust the forecast slider to see predicted recovery at different time horizons.",
+  "model": "Our burn severity segmentation model analyzes Landsat imagery to classify each 30m pixel as unburned, low, moderate, or high severity. The model was trained on MTBS reference data and uses spectral indices (NDVI, NBR) to detect vegetation loss. The priority sliders let you weight community safety, watershed health, and infrastructure concerns to customize the analysis.",
+  None: "The {name} burned {acres_text} in {region}, {state}, starting {start_date}. Cause: {cause}. {summary} Use the map controls to explore burn severity layers, adjust priorities, and see how conditions change over time. Ask more specific questions about the fire's cause, damage, location, recovery, or our modeling approach.",
+}
+
+# Only event-specific passages beyond the catalog fields the templates already state are quoted.
+ASK_QUOTED_SOURCES = {"mtbs", "metadata"}
 
 
 @app.get("/api/ask")
 async def ask_about_fire(fireId: str = Query("camp-fire-2018"), question: str = Query("")):
   """
-  Simple LLM-style Q&A endpoint that returns plain-language fire summaries.
+  Answers a plain-language question about a fire (for an unknown `fireId`, the
+  fire whose text best matches the question). The question's intent picks
+  a template filled from the catalog; the best-scoring MTBS passage for the
+  fire (BM25 over catalog fields and metadata text, built at startup) is
+  quoted after it, and the top passages are returned as `sources`.
   In production, replace this with actual LLM calls (OpenAI, Anthropic, etc.).
   """
-  fire_info = next((f for f in FIRE_CATALOG if f["id"] == fireId), FIRE_CATALOG[0])
-  
-  # Template-based responses for common questions
-  question_lower = question.lower()
-  
-  if "cause" in question_lower or "start" in question_lower or "ignit" in question_lower:
-    answer = f"The {fire_info['name']} started on {fire_info['startDate']} in {fire_info['region']}, {fire_info['state']}. The cause was determined to be {fire_info['cause'].lower()}."
-  
-  elif "damage" in question_lower or "severe" in question_lower or "impact" in question_lower:
-    answer = f"The {fire_info['name']} burned approximately {fire_info['acres']:,} acres. {fire_info['summary']} Our burn severity model classifies the area into high, moderate, and low severity zones to help prioritize recovery efforts."
-  
-  elif "when" in question_lower or "date" in question_lower:
-    answer = f"The {fire_info['name']} ignited on {fire_info['startDate']}. The initial MTBS-style assessment typically occurs within 7 days of ignition, with follow-up mapping at 30 days and long-term recovery tracking extending to 1-5 years."
-  
-  elif "where" in question_lower or "location" in question_lower:
-    answer = f"The {fire_info['name']} occurred in {fire_info['region']}, {fire_info['state']}. You can see the exact location on the map above, with burn severity overlays showing the spatial extent of damage."
-  
-  elif "recovery" in question_lower or "rehab" in question_lower or "restoration" in question_lower:
-    answer = f"Recovery from the {fire_info['name']} is ongoing. Our model tracks burn severity changes over time, helping land managers prioritize watershed stabilization, erosion control, and vegetation reseeding. Adjust the forecast slider to see predicted recovery at different time horizons."
-  
-  elif "model" in question_lower or "algorithm" in question_lower or "how" in question_lower:
-    answer = f"Our burn severity segmentation model analyzes Landsat imagery to classify each 30m pixel as unburned, low, moderate, or high severity. The model was trained on MTBS reference data and uses spectral indices (NDVI, NBR) to detect vegetation loss. The priority sliders let you weight community safety, watershed health, and infrastructure concerns to customize the analysis."
-  
-  else:
-    answer = f"The {fire_info['name']} burned {fire_info['acres']:,} acres in {fire_info['region']}, {fire_info['state']}, starting {fire_info['startDate']}. Cause: {fire_info['cause']}. {fire_info['summary']} Use the map controls to explore burn severity layers, adjust priorities, and see how conditions change over time. Ask more specific questions about the fire's cause, damage, location, recovery, or our modeling approach."
-  
+  snapshot = catalog
+  fire_info = snapshot.lookup.get(fireId)
+  if fire_info is None:
+    # Unknown fire: answer about the fire whose text best matches the question.
+    best = snapshot.ask_index.search(tokenize(question), limit=1)
+    fire_info = snapshot.lookup[best[0][1].fire_id] if best else snapshot.fires[0]
+  intent = ask_intents.match(question)
+  hits = snapshot.ask_index.search(tokenize(question) + ASK_INTENT_TERMS[intent], fire_id=fire_info["id"])
+
+  acres = fire_info.get("acres")
+  answer = ASK_TEMPLATES[intent].format(
+    **fire_info,
+    acres_text=f"{acres:,} acres" if acres is not None else "an unreported number of acres",
+    cause_lower=fire_info["cause"].lower(),
+  )
+  quoted = next((passage for _, passage in hits if passage.source in ASK_QUOTED_SOURCES), None)
+  if quoted:
+    answer += f" From the MTBS record: {quoted.text}"
+
   return {
     "fireId": fireId,
     "question": question,
     "answer": answer,
+    "intent": intent,
+    "sources": [{"source": passage.source, "text": passage.text, "score": round(score, 3)} for score, passage in hits],
     "generatedAt": datetime.now(timezone.utc).isoformat(),
   }
 
 
 @app.get("/api/burn-severity/{fire_id}.tif")
-async def get_burn_severity_raster(fire_id: str):
+async def get_burn_severity_raster(
+  fire_id: str,
+  request: Request,
+  maxDim: Optional[int] = Query(None, ge=MIN_LEVEL_DIM, description="Longest side in pixels; served from the nearest pyramid level"),
+  resolution: Optional[float] = Query(None, gt=0, description="Coarsest acceptable pixel size in metres"),
+):
   """
   Returns MTBS GeoTIFF raster file (dnbr6.tif) for burn severity.
   
-  Maps fire_id to MTBS event_id and finds the dnbr6.tif file.
+  Maps fire_id to MTBS event_id and looks the dnbr6.tif file up in the raster index.
+  Supports If-None-Match and byte-range requests.
   """
-  fire = pick_fire(fire_id)
-  mtbs_event_id = fire.get("mtbs_event_id")
-  
-  if not mtbs_event_id:
-    raise HTTPException(
-      status_code=404,
-      detail=f"No MTBS data available for fire: {fire_id}"
-    )
-  
-  # GeoTIFF data now lives under UI_TEST3/CA_data/{mtbs_event_id}
-  ca_data_dir = os.path.join(DATA_ROOT, mtbs_event_id)
-  
-  if not os.path.exists(ca_data_dir):
-    raise HTTPException(
-      status_code=404,
-      detail=f"MTBS data directory not found: {ca_data_dir}"
-    )
-  
-  # Look for dnbr6.tif file (pattern: {event_id}_*_dnbr6.tif)
-  pattern = os.path.join(ca_data_dir, f"{mtbs_event_id}_*_dnbr6.tif")
-  matching_files = glob.glob(pattern)
-  
-  if not matching_files:
-    raise HTTPException(
-      status_code=404,
-      detail=f"MTBS burn severity raster (dnbr6.tif) not found for fire: {fire_id}"
-    )
-  
-  file_path = matching_files[0]  # Use first match
-  
-  return FileResponse(
-    file_path,
-    media_type="image/tiff",
-    headers={
-      "Content-Disposition": f"inline; filename={fire_id}_burn_severity.tif",
-      "Access-Control-Allow-Origin": "*"
-    }
-  )
+  product_file = find_mtbs_raster(fire_id, ["dnbr6"], "MTBS burn severity raster (dnbr6.tif)")
+  return await pyramid_response(request, product_file, f"{fire_id}_burn_severity.tif", maxDim, resolution)
 
 
 @app.get("/api/reburn-risk/{fire_id}.tif")
-async def get_reburn_risk_raster(fire_id: str):
+async def get_reburn_risk_raster(
+  fire_id: str,
+  request: Request,
+  maxDim: Optional[int] = Query(None, ge=MIN_LEVEL_DIM, description="Longest side in pixels; served from the nearest pyramid level"),
+  resolution: Optional[float] = Query(None, gt=0, description="Coarsest acceptable pixel size in metres"),
+):
   """
   Returns GeoTIFF raster file for reburn risk classification.
-  Maps fire_id to MTBS event_id and finds the reburn_risk.tif file.
+  Maps fire_id to MTBS event_id and looks the reburn_risk.tif file up in the raster index.
   """
-  fire = pick_fire(fire_id)
-  mtbs_event_id = fire.get("mtbs_event_id")
-  
-  if not mtbs_event_id:
-    raise HTTPException(
-      status_code=404,
-      detail=f"No MTBS data available for fire: {fire_id}"
-    )
-  
-  # GeoTIFF data now lives under UI_TEST3/CA_data/{mtbs_event_id}
-  ca_data_dir = os.path.join(DATA_ROOT, mtbs_event_id)
-  
-  if not os.path.exists(ca_data_dir):
-    raise HTTPException(
-      status_code=404,
-      detail=f"MTBS data directory not found: {ca_data_dir}"
-    )
-  
-  # Look for reburn_risk.tif file (pattern: {event_id}_*_reburn_risk.tif)
-  pattern = os.path.join(ca_data_dir, f"{mtbs_event_id}_*_reburn_risk.tif")
-  matching_files = glob.glob(pattern)
-  
-  if not matching_files:
-    raise HTTPException(
-      status_code=404,
-      detail=f"Reburn risk raster not found for fire: {fire_id}"
-    )
-  
-  file_path = matching_files[0]  # Use first match
-  
-  return FileResponse(
-    file_path,
-    media_type="image/tiff",
-    headers={
-      "Content-Disposition": f"inline; filename={fire_id}_reburn_risk.tif",
-      "Access-Control-Allow-Origin": "*"
-    }
-  )
+  product_file = find_mtbs_raster(fire_id, ["reburn_risk"], "Reburn risk raster")
+  return await pyramid_response(request, product_file, f"{fire_id}_reburn_risk.tif", maxDim, resolution)
 
 
 @app.get("/api/best-next-steps/{fire_id}.tif")
-async def get_best_next_steps_raster(fire_id: str):
+async def get_best_next_steps_raster(
+  fire_id: str,
+  request: Request,
+  maxDim: Optional[int] = Query(None, ge=MIN_LEVEL_DIM, description="Longest side in pixels; served from the nearest pyramid level"),
+  resolution: Optional[float] = Query(None, gt=0, description="Coarsest acceptable pixel size in metres"),
+):
   """
   Returns GeoTIFF raster file for best next steps classification (grid-based).
-  Maps fire_id to MTBS event_id and finds the best_next_steps_grid.tif file.
+  Prefers best_next_steps_grid.tif and falls back to best_next_steps.tif.
+  """
+  product_file = find_mtbs_raster(fire_id, ["best_next_steps_grid", "best_next_steps"], "Best next steps raster")
+  return await pyramid_response(request, product_file, f"{fire_id}_best_next_steps.tif", maxDim, resolution)
+
+
+@app.get("/api/burn-severity/{fire_id}.kmz")
+async def get_burn_severity_kmz(fire_id: str, request: Request):
+  """
+  Returns the MTBS KMZ (burn severity overlay for Google Earth) for a fire.
+  Served like the .tif routes: ETag, byte ranges and download limits.
   """
+  product_file = find_mtbs_raster(fire_id, ["kmz"], "MTBS KMZ (.kmz)")
+  return await raster_response(request, product_file, f"{fire_id}_burn_severity.kmz", "application/vnd.google-earth.kmz")
+
+
+@app.get("/api/reflectance/{fire_id}/{phase}.tif")
+async def get_reflectance_raster(
+  fire_id: str,
+  phase: str,
+  request: Request,
+  maxDim: Optional[int] = Query(None, ge=MIN_LEVEL_DIM, description="Longest side in pixels; served from the nearest pyramid level"),
+  resolution: Optional[float] = Query(None, gt=0, description="Coarsest acceptable pixel size in metres"),
+):
+  """
+  Returns the pre- or post-fire surface reflectance stack (Landsat or Sentinel-2).
+  After `python -m backend.cog` these are tiled COGs, so clients can fetch
+  just the header, overview and blocks they need with byte-range requests.
+  """
+  if phase not in ("pre", "post"):
+    raise HTTPException(status_code=404, detail=f"Unknown reflectance phase: {phase}")
+
   fire = pick_fire(fire_id)
   mtbs_event_id = fire.get("mtbs_event_id")
-  
-  if not mtbs_event_id:
-    raise HTTPException(
-      status_code=404,
-      detail=f"No MTBS data available for fire: {fire_id}"
-    )
-  
-  # GeoTIFF data now lives under UI_TEST3/CA_data/{mtbs_event_id}
-  ca_data_dir = os.path.join(DATA_ROOT, mtbs_event_id)
-  
-  if not os.path.exists(ca_data_dir):
-    raise HTTPException(
-      status_code=404,
-      detail=f"MTBS data directory not found: {ca_data_dir}"
-    )
-  
-  # Look for best_next_steps_grid.tif file (prefer grid version)
-  pattern_grid = os.path.join(ca_data_dir, f"{mtbs_event_id}_*_best_next_steps_grid.tif")
-  matching_files = glob.glob(pattern_grid)
-  
-  # Fallback to non-grid version if grid doesn't exist
-  if not matching_files:
-    pattern = os.path.join(ca_data_dir, f"{mtbs_event_id}_*_best_next_steps.tif")
-    matching_files = glob.glob(pattern)
-  
-  if not matching_files:
-    raise HTTPException(
-      status_code=404,
-      detail=f"Best next steps raster not found for fire: {fire_id}"
+  scenes = raster_index.all(mtbs_event_id, "refl") if mtbs_event_id else []
+  if not scenes:
+    raise HTTPException(status_code=404, detail=f"Reflectance raster not found for fire: {fire_id}")
+
+  product_file = scenes[0] if phase == "pre" else scenes[-1]
+  return await pyramid_response(request, product_file, f"{fire_id}_{phase}_refl.tif", maxDim, resolution)
+
+
+# Composite products by URL layer name, and the files they are derived from.
+COMPOSITE_PRODUCTS: Dict[str, str] = {
+  "reburn-risk": "reburn_risk",
+  "best-next-steps": "best_next_steps",
+}
+COMPOSITE_INPUTS = ("dnbr6", "burn_bndy", "mask")
+
+
+@app.get("/api/composite/{layer}/{fire_id}.tif")
+async def get_composite_raster(
+  layer: str,
+  fire_id: str,
+  request: Request,
+  priorityCommunity: int = Query(70, ge=0, le=100),
+  priorityWatershed: int = Query(55, ge=0, le=100),
+  priorityInfrastructure: int = Query(60, ge=0, le=100),
+):
+  """
+  Reburn risk or best next steps classified on the server from dnbr6 and the
+  priority sliders. Weights are normalized and quantized to 5% steps; each
+  classified GeoTIFF is cached per (raster version, weights), and the
+  derived input bands are computed once per dnbr6 version, so a new slider
+  position costs one vectorized pass over the fire.
+  """
+  product = COMPOSITE_PRODUCTS.get(layer)
+  if product is None:
+    raise HTTPException(status_code=404, detail=f"Unknown composite layer: {layer}")
+  fire = pick_fire(fire_id)
+  mtbs_event_id = fire.get("mtbs_event_id")
+  products = raster_index.products(mtbs_event_id) if mtbs_event_id else {}
+  if not products.get("dnbr6"):
+    raise HTTPException(status_code=404, detail=f"MTBS burn severity raster (dnbr6.tif) not found for fire: {fire_id}")
+
+  inputs_key = tuple(
+    (name, products[name][0].path, products[name][0].mtime_ns)
+    for name in COMPOSITE_INPUTS
+    if products.get(name)
+  )
+  weights = quantize_weights({
+    "community": priorityCommunity,
+    "watershed": priorityWatershed,
+    "infrastructure": priorityInfrastructure,
+  })
+  cache_key = (product, inputs_key, weights)
+  etag = version_etag(cache_key)
+  headers = {
+    "ETag": etag,
+    "Cache-Control": "no-cache",
+    "Content-Disposition": f"inline; filename={fire_id}_{product}_{'-'.join(map(str, weights))}.tif",
+  }
+  if etag_matches(request.headers.get("if-none-match"), etag):
+    return Response(status_code=304, headers=headers)
+
+  entry = composite_cache.get(cache_key)
+  if entry is None:
+    body = await run_in_threadpool(render_composite, product, inputs_key, weights)
+    entry = CachedBody(body, etag)
+    composite_cache.put(cache_key, entry)
+  return Response(content=entry.body, media_type="image/tiff", headers=headers)
+
+
+def sample_targets(fire_id: Optional[str]) -> List[SampleTarget]:
+  if fire_id:
+    fire = catalog.lookup.get(fire_id)
+    if not fire or not fire.get("mtbs_event_id"):
+      raise HTTPException(status_code=404, detail=f"No MTBS data available for fire: {fire_id}")
+    fires = [fire]
+  else:
+    # Oldest first so the most recent assessment wins where events overlap
+    fires = sorted((f for f in catalog.fires if f.get("mtbs_event_id")), key=lambda f: f["start_date"])
+  return [SampleTarget(fire["id"], raster_index.products(fire["mtbs_event_id"])) for fire in fires]
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+  """The request body, or 413 as soon as it is known to exceed `limit` bytes."""
+  too_large = HTTPException(status_code=413, detail=f"Request body larger than {limit:,} bytes")
+  try:
+    declared = int(request.headers.get("content-length", ""))
+  except ValueError:
+    declared = None
+  if declared is not None and declared > limit:
+    raise too_large
+  chunks: List[bytes] = []
+  received = 0
+  async for chunk in request.stream():
+    received += len(chunk)
+    if received > limit:
+      raise too_large
+    chunks.append(chunk)
+  return b"".join(chunks)
+
+
+@app.post("/api/sample")
+async def sample_raster_layers(
+  request: Request,
+  fireId: Optional[str] = Query(None, description="Restrict sampling to one fire"),
+  layers: Optional[str] = Query(None, description="Comma-separated layers (burnSeverity, reburnRisk, bestNextSteps, dnbr, rdnbr)"),
+):
+  """
+  Samples MTBS raster layers at many points in one request.
+
+  Accepts JSON `{"points": [[lat, lng], ...], "layers": [...]}` or an
+  `application/octet-stream` body of packed little-endian float64 (lat, lng)
+  pairs with `layers` in the query string. Returns one column per layer
+  (null where a point falls outside every raster or on nodata) plus the fire
+  each point was matched to.
+  """
+  binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+  body = await read_body(request, MAX_BINARY_SAMPLE_BYTES if binary else MAX_JSON_SAMPLE_BYTES)
+  try:
+    lats, lngs, requested = await run_in_threadpool(parse_sample_request, body, binary, layers)
+  except (ValueError, TypeError, AttributeError) as exc:
+    raise HTTPException(status_code=400, detail=f"Invalid sample request: {exc}")
+
+  requested = requested or list(SAMPLE_LAYERS)
+  unknown = [layer for layer in requested if layer not in SAMPLE_LAYERS]
+  if unknown:
+    raise HTTPException(status_code=400, detail=f"Unknown sample layers: {', '.join(unknown)}")
+  if len(lats) > MAX_SAMPLE_POINTS:
+    raise HTTPException(status_code=413, detail=f"At most {MAX_SAMPLE_POINTS:,} points per request")
+
+  targets = sample_targets(fireId)
+  content = await run_in_threadpool(lambda: json.dumps(sample_points(lats, lngs, targets, requested), separators=(",", ":")))
+  return Response(content=content, media_type="application/json")
+
+
+def parse_sample_request(body: bytes, binary: bool, layers: Optional[str]) -> Tuple[np.ndarray, np.ndarray, Optional[List[str]]]:
+  """(lats, lngs, layers) from a sample request body; large bodies take tenths of a second."""
+  requested = layers.split(",") if layers else None
+  if binary:
+    lats, lngs = parse_binary_points(body)
+    return lats, lngs, requested
+  payload = json.loads(body or b"{}")
+  lats, lngs = parse_points(payload.get("points", []))
+  return lats, lngs, payload.get("layers") or requested
+
+
+def risk_index_key(fires: List[Dict]) -> RiskIndexKey:
+  return tuple(
+    (
+      fire["id"],
+      fire.get("zipcode"),
+      fire.get("start_date") or "",
+      stats_key(raster_index.products(fire["mtbs_event_id"])) if fire.get("mtbs_event_id") else None,
     )
-  
-  file_path = matching_files[0]  # Use first match
-  
-  return FileResponse(
-    file_path,
-    media_type="image/tiff",
-    headers={
-      "Content-Disposition": f"inline; filename={fire_id}_best_next_steps.tif",
-      "Access-Control-Allow-Origin": "*"
-    }
+    for fire in fires
+  )
+
+
+@app.post("/api/risk/bulk")
+async def score_bulk_risk(request: Request):
+  """
+  Scores a large upload of ZIP codes or coordinates against the fire
+  catalog, streaming one NDJSON result per input row as rows arrive.
+
+  Accepts CSV with a header (`id`, `zip`, `lat`, `lng`, with common aliases)
+  or NDJSON objects with the same fields. Coordinates get the fire whose
+  burn boundary holds them, the dnbr6 severity and reburn-risk class there
+  and a 0-1 `score`; ZIP codes get the catalog fires recorded in that ZIP
+  with their area-weighted severity score. Bad rows yield an `error` entry.
+  """
+  index = await run_in_threadpool(build_risk_index, risk_index_key(catalog.fires))
+  spool = UploadSpool(request.stream())
+  lines = iter_lines(spool.chunks())
+  try:
+    parser, pending = await open_upload(lines, request.headers.get("content-type", ""))
+  except StopAsyncIteration:
+    spool.close()
+    raise HTTPException(status_code=400, detail="Empty upload")
+  except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+    spool.close()
+    raise HTTPException(status_code=400, detail=f"Invalid bulk upload: {exc}")
+  return BulkRiskResponse(index, parser, spool, lines, pending, run_in_threadpool)
+
+
+def _load_tile(layer: str, fire_id: str, z: int, x: int, y: int) -> bytes:
+  product_file = find_mtbs_raster(fire_id, TILE_PRODUCTS[layer])
+  key = tile_cache_key(layer, product_file.event_id, product_file.mtime_ns, z, x, y)
+  cached = tile_cache.get(key)
+  if cached is not None:
+    return cached
+
+  png = render_tile(layer, product_file.path, product_file.mtime_ns, z, x, y)
+  tile_cache.put(key, png)
+  return EMPTY_TILE if png is None else png
+
+
+@app.get("/api/tiles/{layer}/{fire_id}/{z}/{x}/{y}.png")
+async def get_map_tile(layer: str, fire_id: str, z: int, x: int, y: int):
+  """
+  Returns a 256px Web Mercator PNG tile for an MTBS raster layer
+  (burn-severity, reburn-risk or best-next-steps).
+
+  Tiles are reprojected and colormapped server-side and kept in a bounded
+  on-disk cache, so the map only downloads the tiles in view.
+  """
+  if layer not in TILE_COLORMAPS:
+    raise HTTPException(status_code=404, detail=f"Unknown tile layer: {layer}")
+  if not is_valid_tile(z, x, y):
+    raise HTTPException(status_code=404, detail=f"Tile out of range: {z}/{x}/{y}")
+
+  png = await run_in_threadpool(_load_tile, layer, fire_id, z, x, y)
+  return Response(
+    content=png,
+    media_type="image/png",
+    headers={"Cache-Control": "public, max-age=3600"},
   )
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+  """
+  Prometheus text exposition: per-route request counts, latency histograms
+  and response bytes, in-flight requests, raster file bytes served and
+  cache hit ratios.
+  """
+  return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/api/admin/profile")
+async def profile_server(
+  request: Request,
+  seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+  interval_ms: float = Query(5.0, ge=1, le=100, alias="intervalMs"),
+  route: Optional[str] = Query(None, description="Keep only stacks for this route template"),
+):
+  """
+  Samples the live worker for `seconds` and returns collapsed stacks, one
+  `route;frame;frame count` line each, ready for flamegraph.pl or speedscope.
+  Requires the X-Admin-Token header to match TERRANOVA_ADMIN_TOKEN; with no
+  token configured the route does not exist. Only one profile runs at a time
+  per worker.
+  """
+  if not ADMIN_TOKEN:
+    raise HTTPException(status_code=404, detail="Not Found")
+  # Compare bytes: compare_digest rejects non-ASCII str, and header values are latin-1.
+  supplied = request.headers.get("x-admin-token", "").encode("latin-1")
+  if not hmac.compare_digest(supplied, ADMIN_TOKEN.encode("utf-8")):
+    raise HTTPException(status_code=403, detail="Invalid admin token")
+  try:
+    collapsed = await profiler.profile(seconds, interval_ms / 1000)
+  except RuntimeError as exc:
+    raise HTTPException(status_code=409, detail=str(exc))
+  if route:
+    collapsed = "".join(line for line in collapsed.splitlines(keepends=True) if line.split(";", 1)[0].split(" ", 1)[-1] == route)
+  return Response(content=collapsed, media_type="text/plain; charset=utf-8", headers={"Cache-Control": "no-store"})
+
+
 @app.get("/api/health")
 async def health_check():
   return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
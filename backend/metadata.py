@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, Optional
+
+import shapefile
+
+
+# "Key: value" lines of the "Fire Information" block inside <supplinf>.
+FIRE_INFO_RE = re.compile(r"^\s*(?P<key>[^:\n]+?)\s*:\s*(?P<value>.+?)\s*$", re.MULTILINE)
+EVENT_ID_RE = re.compile(r"\b([a-z]{2}\d{19})\b", re.IGNORECASE)
+
+BOUNDING_TAGS = {"westbc": "west", "eastbc": "east", "northbc": "north", "southbc": "south"}
+# Everything we keep lives in <idinfo>; the rest of the file (lineage,
+# entity/attribute definitions, contacts) is never read.
+LAST_ELEMENT = "idinfo"
+
+# burn_bndy.dbf attributes -> catalog columns.
+BURN_BOUNDARY_FIELDS = {
+  "Incid_Name": "name",
+  "Incid_Type": "incident_type",
+  "Asmnt_Type": "assessment_type",
+  "BurnBndAc": "acres",
+  "BurnBndLat": "lat",
+  "BurnBndLon": "lng",
+  "Ig_Date": "ignition_date",
+  "dNBR_offst": "dnbr_offset",
+  "dNBR_stdDv": "dnbr_stddev",
+  "NoData_T": "nodata_threshold",
+  "IncGreen_T": "increased_greenness_threshold",
+  "Low_T": "low_threshold",
+  "Mod_T": "moderate_threshold",
+  "High_T": "high_threshold",
+}
+NUMERIC_FIELDS = {"acres", "lat", "lng"}
+
+
+def _parse_long_date(value: str) -> Optional[str]:
+  try:
+    return datetime.strptime(value.strip(), "%B %d, %Y").date().isoformat()
+  except ValueError:
+    return None
+
+
+def _parse_scene(value: str) -> Dict[str, str]:
+  # "Landsat 8 OLI, 2016-06-13, 804203620160613"
+  parts = [part.strip() for part in value.split(",")]
+  scene = {"sensor": parts[0]} if parts and parts[0] else {}
+  if len(parts) > 1:
+    scene["date"] = parts[1]
+  if len(parts) > 2:
+    scene["scene_id"] = parts[2]
+  return scene
+
+
+def _parse_fire_information(text: str, record: Dict) -> None:
+  for match in FIRE_INFO_RE.finditer(text):
+    key, value = match.group("key").lower(), match.group("value")
+    if key.startswith("mtbs event id"):
+      record["event_id"] = value.lower()
+    elif key.startswith("fire name"):
+      record["name"] = value
+    elif key.startswith("date of fire"):
+      record["ignition_date"] = _parse_long_date(value)
+    elif key.startswith("type of assessment"):
+      record["assessment_type"] = value
+    elif key.startswith("acres within fire perimeter"):
+      try:
+        record["acres"] = float(value.replace(",", ""))
+      except ValueError:
+        pass
+    elif key.startswith("pre-fire sensor"):
+      scene = _parse_scene(value)
+      record.update({f"pre_{name}": item for name, item in scene.items()})
+    elif key.startswith("post-fire sensor"):
+      scene = _parse_scene(value)
+      record.update({f"post_{name}": item for name, item in scene.items()})
+
+
+def parse_metadata_xml(path: str) -> Optional[Dict]:
+  """
+  Extracts catalog fields from an MTBS FGDC metadata file.
+
+  The file is read with iterparse and every element is cleared once handled,
+  so memory stays flat, and parsing stops at the end of <idinfo> instead of
+  walking the 30+ KB of lineage and attribute definitions that follow.
+  Returns None for XML that is not FGDC metadata (e.g. CA_data/xml.xml).
+  """
+  record: Dict = {}
+  description = []
+  context = ET.iterparse(path, events=("start", "end"))
+  try:
+    _, root = next(context)
+    if root.tag != "metadata":
+      return None
+    for event, element in context:
+      if event != "end":
+        continue
+      tag, text = element.tag, (element.text or "").strip()
+      if tag == "title" and "event_id" not in record:
+        match = EVENT_ID_RE.search(text)
+        if match:
+          record["event_id"] = match.group(1).lower()
+      elif tag == "caldate" and "ignition_date" not in record:
+        record["ignition_date"] = _parse_long_date(text)
+      elif tag in BOUNDING_TAGS:
+        try:
+          record[BOUNDING_TAGS[tag]] = float(text)
+        except ValueError:
+          pass
+      elif tag == "supplinf":
+        _parse_fire_information(text, record)
+        description.append(text)
+      elif tag in ("abstract", "purpose"):
+        description.append(text)
+      elif tag == "pubdate" and "published" not in record:
+        record["published"] = text
+      if tag == LAST_ELEMENT:
+        break
+      # Children are fully handled once their parent ends; drop them.
+      element.clear()
+  except ET.ParseError:
+    return None
+
+  if "event_id" not in record:
+    return None
+  record["description"] = "\n\n".join(description)
+  return record
+
+
+def read_burn_boundary_record(path: str) -> Dict:
+  """
+  Reads the attribute row of a burn_bndy shapefile (dbf only, no geometry):
+  the dNBR thresholds and offsets live there rather than in the XML.
+  """
+  with open(path[:-4] + ".dbf", "rb") as dbf:
+    reader = shapefile.Reader(dbf=dbf)
+    if not reader.numRecords:
+      return {}
+    attributes = reader.record(0).as_dict()
+
+  record: Dict = {}
+  for field, column in BURN_BOUNDARY_FIELDS.items():
+    value = attributes.get(field)
+    if value in (None, ""):
+      continue
+    if column == "ignition_date":
+      value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    elif column in NUMERIC_FIELDS:
+      try:
+        value = float(value)
+      except (TypeError, ValueError):
+        continue
+    record[column] = value
+  return record
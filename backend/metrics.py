@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+
+# Latency histogram upper bounds, in seconds.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+  0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class CacheStats(NamedTuple):
+  hits: int
+  misses: int
+  entries: int
+
+
+class Histogram:
+  __slots__ = ("counts", "total", "count")
+
+  def __init__(self):
+    # One slot per bucket plus the +Inf overflow; cumulated when rendered.
+    self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    self.total = 0.0
+    self.count = 0
+
+  def observe(self, value: float) -> None:
+    self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+    self.total += value
+    self.count += 1
+
+
+def _escape(value) -> str:
+  return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+  return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Metrics:
+  """
+  In-process request and cache metrics, rendered as Prometheus text.
+
+  Recording is a few dict operations with no locking: the middleware runs on
+  the event loop thread, and counters bumped from worker threads are plain
+  int increments, so under the GIL a rare lost update is the worst case.
+  Caches are not counted here; they register a callback that is only read
+  when /api/metrics is scraped.
+  """
+
+  def __init__(self):
+    self.requests: Dict[Tuple[str, str, int], int] = {}
+    self.latency: Dict[Tuple[str, str], Histogram] = {}
+    self.response_bytes: Dict[Tuple[str, str], int] = {}
+    self.in_flight = 0
+    self.file_bytes: Dict[str, int] = {}
+    self.caches: Dict[str, Callable[[], CacheStats]] = {}
+    self.values: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+    self.started = time.time()
+
+  def observe_request(self, method: str, route: str, status: int, seconds: float, body_bytes: int) -> None:
+    key = (method, route)
+    request_key = (method, route, status)
+    self.requests[request_key] = self.requests.get(request_key, 0) + 1
+    histogram = self.latency.get(key)
+    if histogram is None:
+      histogram = self.latency[key] = Histogram()
+    histogram.observe(seconds)
+    self.response_bytes[key] = self.response_bytes.get(key, 0) + body_bytes
+
+  def add_file_bytes(self, product: str, size: int) -> None:
+    self.file_bytes[product] = self.file_bytes.get(product, 0) + size
+
+  def register_cache(self, name: str, stats: Callable[[], CacheStats]) -> None:
+    self.caches[name] = stats
+
+  def register_value(self, name: str, kind: str, help_text: str, value: Callable[[], float]) -> None:
+    """Registers an unlabelled gauge or counter read from `value` at scrape time."""
+    self.values[name] = (kind, help_text, value)
+
+  def render(self) -> str:
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+      lines.append(f"# HELP {name} {help_text}")
+      lines.append(f"# TYPE {name} {kind}")
+
+    family("terranova_http_requests_total", "counter", "HTTP requests by route template and status.")
+    for (method, route, status), count in sorted(self.requests.items()):
+      lines.append(f"terranova_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    family("terranova_http_request_duration_seconds", "histogram", "Time to the last response byte, by route template.")
+    for (method, route), histogram in sorted(self.latency.items()):
+      cumulative = 0
+      for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"terranova_http_request_duration_seconds_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+      lines.append(f"terranova_http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram.total:.6f}")
+      lines.append(f"terranova_http_request_duration_seconds_count{_labels(method=method, route=route)} {histogram.count}")
+
+    family("terranova_http_response_bytes_total", "counter", "Response body bytes sent, by route template.")
+    for (method, route), size in sorted(self.response_bytes.items()):
+      lines.append(f"terranova_http_response_bytes_total{_labels(method=method, route=route)} {size}")
+
+    family("terranova_http_requests_in_flight", "gauge", "Requests currently being handled.")
+    lines.append(f"terranova_http_requests_in_flight {self.in_flight}")
+
+    family("terranova_raster_file_bytes_total", "counter", "Raster file bytes sent by the download routes, by MTBS product.")
+    for product, size in sorted(self.file_bytes.items()):
+      lines.append(f"terranova_raster_file_bytes_total{_labels(product=product)} {size}")
+
+    cache_stats = {name: stats() for name, stats in sorted(self.caches.items())}
+    family("terranova_cache_hits_total", "counter", "Cache lookups that hit.")
+    for name, stats in cache_stats.items():
+      lines.append(f"terranova_cache_hits_total{_labels(cache=name)} {stats.hits}")
+    family("terranova_cache_misses_total", "counter", "Cache lookups that missed.")
+    for name, stats in cache_stats.items():
+      lines.append(f"terranova_cache_misses_total{_labels(cache=name)} {stats.misses}")
+    family("terranova_cache_hit_ratio", "gauge", "Hits over lookups since startup.")
+    for name, stats in cache_stats.items():
+      lookups = stats.hits + stats.misses
+      lines.append(f"terranova_cache_hit_ratio{_labels(cache=name)} {stats.hits / lookups if lookups else 0.0:.4f}")
+    family("terranova_cache_entries", "gauge", "Entries currently held.")
+    for name, stats in cache_stats.items():
+      lines.append(f"terranova_cache_entries{_labels(cache=name)} {stats.entries}")
+
+    for name, (kind, help_text, value) in sorted(self.values.items()):
+      family(name, kind, help_text)
+      lines.append(f"{name} {value()}")
+
+    family("terranova_process_start_time_seconds", "gauge", "Unix time the API process started.")
+    lines.append(f"terranova_process_start_time_seconds {self.started:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def lru_cache_stats(function) -> Callable[[], CacheStats]:
+  """Stats callback for a functools.lru_cache-wrapped function."""
+  def stats() -> CacheStats:
+    info = function.cache_info()
+    return CacheStats(info.hits, info.misses, info.currsize)
+  return stats
+
+
+class MetricsMiddleware:
+  """
+  Pure ASGI middleware (no BaseHTTPMiddleware task hop) that times each HTTP
+  request to its final body chunk and counts the bytes sent. Requests are
+  labelled with the matched route template, not the raw path, so fire IDs
+  and tile coordinates do not explode the label space.
+  """
+
+  def __init__(self, app, metrics: Metrics):
+    self.app = app
+    self.metrics = metrics
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+
+    metrics = self.metrics
+    start = time.perf_counter()
+    status = 500
+    body_bytes = 0
+    metrics.in_flight += 1
+
+    async def send_wrapper(message):
+      nonlocal status, body_bytes
+      if message["type"] == "http.response.start":
+        status = message["status"]
+      elif message["type"] == "http.response.body":
+        body_bytes += len(message.get("body", b""))
+      await send(message)
+
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      metrics.in_flight -= 1
+      route = scope.get("route")
+      metrics.observe_request(
+        scope["method"],
+        getattr(route, "path", None) or UNMATCHED_ROUTE,
+        status,
+        time.perf_counter() - start,
+        body_bytes,
+      )
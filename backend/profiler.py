@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, TypeVar
+
+
+# Scope of the request being handled; copied into threadpool workers by anyio.
+current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("terranova_request_scope", default=None)
+# Scopes of executor threads running request work, keyed by thread ident.
+# Each thread only sets and pops its own key.
+thread_scopes: Dict[int, dict] = {}
+
+T = TypeVar("T")
+
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(code) -> str:
+  return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _route_label(scope: dict) -> str:
+  route = scope.get("route")
+  return f"{scope.get('method', '')} {getattr(route, 'path', None) or scope.get('path', '?')}"
+
+
+def in_request_context(function: Callable[..., T], *args) -> Callable[[], T]:
+  """
+  Wraps blocking work for `loop.run_in_executor`, which (unlike anyio's
+  threadpool) copies neither contextvars nor anything the profiler can see.
+  The returned callable runs `function(*args)` in a copy of the caller's
+  context and registers the caller's request scope for its thread.
+  """
+  context = contextvars.copy_context()
+  scope = current_scope.get()
+
+  def run() -> T:
+    if scope is None:
+      return context.run(function, *args)
+    thread_id = threading.get_ident()
+    thread_scopes[thread_id] = scope
+    try:
+      return context.run(function, *args)
+    finally:
+      thread_scopes.pop(thread_id, None)
+  return run
+
+
+def _worker_scope(thread_id: int, frame) -> Optional[dict]:
+  """
+  Finds the request scope of an executor thread: registered by
+  in_request_context, or else anyio's threadpool, which runs each job via
+  `context.run(func, ...)` so the worker's frame holds the copied Context.
+  The latter reads an anyio frame local and is best-effort.
+  """
+  scope = thread_scopes.get(thread_id)
+  if scope is not None:
+    return scope
+  while frame is not None:
+    if "anyio" in frame.f_code.co_filename:
+      context = frame.f_locals.get("context")
+      if isinstance(context, contextvars.Context):
+        return context.get(current_scope)
+    frame = frame.f_back
+  return None
+
+
+class SamplingProfiler:
+  """
+  Statistical profiler over the live process.
+
+  A daemon thread wakes every `interval` seconds, snapshots every thread's
+  Python stack with sys._current_frames() and attributes it to the request
+  being served: on the event loop thread via the running task, in executor
+  threads via in_request_context or the request context anyio copied in.
+  Idle threads, and work no request is waiting on, are skipped.
+  Nothing is hooked into the interpreter, so overhead is one stack walk per
+  thread per tick and zero when no profile is running.
+  """
+
+  def __init__(self):
+    self.active = False
+    self.task_scopes: Dict[asyncio.Task, dict] = {}
+    self._lock = threading.Lock()
+
+  def track(self, scope: dict):
+    """Called by the middleware for each request; returns a reset token."""
+    token = current_scope.set(scope)
+    if self.active:
+      task = asyncio.current_task()
+      if task is not None:
+        self.task_scopes[task] = scope
+    return token
+
+  def untrack(self, token) -> None:
+    current_scope.reset(token)
+    if self.task_scopes:
+      self.task_scopes.pop(asyncio.current_task(), None)
+
+  def _sample(self, loop: asyncio.AbstractEventLoop, loop_thread: int, counts: Counter) -> None:
+    own_thread = threading.get_ident()
+    running = asyncio.current_task(loop)
+    for thread_id, frame in sys._current_frames().items():
+      if thread_id == own_thread:
+        continue
+      if thread_id == loop_thread:
+        scope = self.task_scopes.get(running) if running is not None else None
+      else:
+        scope = _worker_scope(thread_id, frame)
+      if scope is None:
+        continue
+
+      stack: List[str] = []
+      while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+      stack.append(_route_label(scope))
+      counts[";".join(reversed(stack))] += 1
+
+  async def profile(self, seconds: float, interval: float) -> str:
+    """
+    Samples for `seconds` and returns collapsed stacks ("route;frame;... N"
+    per line, as consumed by flamegraph.pl / speedscope), hottest first.
+    Raises RuntimeError if a profile is already running.
+    """
+    if not self._lock.acquire(blocking=False):
+      raise RuntimeError("A profile is already running")
+    loop = asyncio.get_running_loop()
+    loop_thread = threading.get_ident()
+    counts: Counter = Counter()
+    done = threading.Event()
+
+    def run() -> None:
+      while not done.wait(interval):
+        self._sample(loop, loop_thread, counts)
+
+    sampler = threading.Thread(target=run, name="terranova-profiler", daemon=True)
+    try:
+      self.active = True
+      sampler.start()
+      await asyncio.sleep(seconds)
+    finally:
+      done.set()
+      sampler.join()
+      self.active = False
+      self.task_scopes.clear()
+      self._lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class ProfilerMiddleware:
+  """
+  Publishes each HTTP request's scope to the profiler. Costs one ContextVar
+  set/reset per request when idle; task bookkeeping only while sampling.
+  """
+
+  def __init__(self, app, profiler: SamplingProfiler):
+    self.app = app
+    self.profiler = profiler
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    token = self.profiler.track(scope)
+    try:
+      await self.app(scope, receive, send)
+    finally:
+      self.profiler.untrack(token)
@@ -0,0 +1,216 @@
+"""
+Power-of-two raster pyramids for the download routes.
+
+Each level is a standalone GeoTIFF decimated from the full-resolution product
+with class-preserving MODE resampling for categorical rasters and AVERAGE for
+continuous ones. Levels are built on first request and kept on disk; run this
+module to precompute every level ahead of time:
+
+  python -m backend.pyramid               # build all missing levels
+  python -m backend.pyramid --dry-run     # list what would be built
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import rasterio
+from rasterio.transform import Affine
+from rasterio.warp import Resampling, reproject
+
+from .cog import CATEGORICAL_PRODUCTS, COG_PRODUCTS, is_cog
+from .raster_index import ProductFile, RasterIndex
+
+
+PYRAMID_FACTORS = (2, 4, 8, 16, 32)
+# Levels smaller than this on their long side are not worth a file.
+MIN_LEVEL_DIM = 8
+
+
+class SourceShape(NamedTuple):
+  width: int
+  height: int
+  pixel_size: float
+  internal_overviews: tuple
+
+
+@lru_cache(maxsize=256)
+def source_shape(path: str, mtime_ns: int) -> SourceShape:
+  # mtime is part of the key so a replaced file is read again.
+  with rasterio.open(path) as dataset:
+    # Only COG overviews were built with the right resampling (backend.cog);
+    # the .rrd overviews shipped with MTBS are nearest-neighbour.
+    overviews = tuple(dataset.overviews(1)) if is_cog(path) else ()
+    return SourceShape(dataset.width, dataset.height, abs(dataset.res[0]), overviews)
+
+
+def resampling_for(product: str) -> Resampling:
+  return Resampling.mode if product in CATEGORICAL_PRODUCTS else Resampling.average
+
+
+def available_factors(shape: SourceShape) -> List[int]:
+  longest = max(shape.width, shape.height)
+  return [factor for factor in PYRAMID_FACTORS if math.ceil(longest / factor) >= MIN_LEVEL_DIM]
+
+
+def pyramid_factor(shape: SourceShape, max_dim: Optional[int] = None, resolution: Optional[float] = None) -> int:
+  """
+  Coarsest level still needed to satisfy the request: the smallest factor
+  whose long side fits in `max_dim`, and the largest one whose pixels are no
+  coarser than `resolution` (in CRS units, metres for MTBS), whichever is
+  larger. Returns 1 when full resolution already fits.
+  """
+  longest = max(shape.width, shape.height)
+  factors = available_factors(shape)
+  factor = 1
+  if max_dim is not None and longest > max_dim:
+    factor = next((f for f in factors if math.ceil(longest / f) <= max_dim), factors[-1] if factors else 1)
+  if resolution is not None:
+    for candidate in factors:
+      if shape.pixel_size * candidate <= resolution:
+        factor = max(factor, candidate)
+  return factor
+
+
+def build_level(source_path: str, product: str, factor: int, destination: str) -> None:
+  with rasterio.open(source_path) as source:
+    profile = source.profile.copy()
+    width = math.ceil(source.width / factor)
+    height = math.ceil(source.height / factor)
+    transform = source.transform * Affine.scale(source.width / width, source.height / height)
+    resampling = resampling_for(product)
+
+    overviews = source.overviews(1) if is_cog(source_path) else []
+    if factor in overviews:
+      with rasterio.open(source_path, overview_level=overviews.index(factor)) as level:
+        data = level.read()
+        width, height, transform = level.width, level.height, level.transform
+    else:
+      data = np.zeros((source.count, height, width), dtype=source.dtypes[0])
+      if source.nodata is not None:
+        data.fill(source.nodata)
+      reproject(
+        source=source.read(),
+        destination=data,
+        src_transform=source.transform,
+        src_crs=source.crs,
+        src_nodata=source.nodata,
+        dst_transform=transform,
+        dst_crs=source.crs,
+        dst_nodata=source.nodata,
+        resampling=resampling,
+      )
+
+  for key in ("blockxsize", "blockysize", "tiled", "interleave", "photometric"):
+    profile.pop(key, None)
+  profile.update(driver="GTiff", width=width, height=height, transform=transform, compress="deflate")
+  if resampling is Resampling.average and np.issubdtype(data.dtype, np.integer):
+    profile["predictor"] = 2
+
+  tmp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+  try:
+    with rasterio.open(tmp_path, "w", **profile) as target:
+      target.write(data)
+    os.replace(tmp_path, destination)
+  finally:
+    if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+
+
+class PyramidStore:
+  """
+  On-disk pyramid levels keyed by source file version and factor. A level
+  file is written once (atomically) and then served like any other product,
+  so ETags and byte ranges keep working. Levels of a replaced source are
+  removed when its first new level is built.
+  """
+
+  def __init__(self, root: str):
+    self.root = root
+    self._locks: Dict[str, threading.Lock] = {}
+    self._locks_guard = threading.Lock()
+    os.makedirs(root, exist_ok=True)
+
+  def _prefix(self, product_file: ProductFile) -> str:
+    return os.path.splitext(os.path.basename(product_file.path))[0]
+
+  def level_path(self, product_file: ProductFile, factor: int) -> str:
+    return os.path.join(self.root, f"{self._prefix(product_file)}_{product_file.mtime_ns:x}_{factor}x.tif")
+
+  def _lock_for(self, path: str) -> threading.Lock:
+    with self._locks_guard:
+      return self._locks.setdefault(path, threading.Lock())
+
+  def _remove_stale(self, product_file: ProductFile) -> None:
+    # Exact match: a bare prefix test would also take e.g. best_next_steps_grid
+    # levels for best_next_steps.
+    levels = re.compile(rf"^{re.escape(self._prefix(product_file))}_([0-9a-f]+)_\d+x\.tif$")
+    current = f"{product_file.mtime_ns:x}"
+    for name in os.listdir(self.root):
+      match = levels.match(name)
+      if match and match.group(1) != current:
+        try:
+          os.remove(os.path.join(self.root, name))
+        except OSError:
+          pass
+
+  def level(self, product_file: ProductFile, factor: int) -> ProductFile:
+    """Returns the level as a ProductFile, building it if needed; factor 1 is the source itself."""
+    if factor <= 1:
+      return product_file
+    path = self.level_path(product_file, factor)
+    with self._lock_for(path):
+      if not os.path.exists(path):
+        self._remove_stale(product_file)
+        build_level(product_file.path, product_file.product, factor, path)
+    return product_file._replace(path=path, stat=os.stat(path))
+
+  def select(self, product_file: ProductFile, max_dim: Optional[int], resolution: Optional[float]) -> ProductFile:
+    shape = source_shape(product_file.path, product_file.mtime_ns)
+    return self.level(product_file, pyramid_factor(shape, max_dim, resolution))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  backend_dir = os.path.dirname(os.path.abspath(__file__))
+  parser = argparse.ArgumentParser(description="Precompute downsampled raster pyramids for the download routes.")
+  parser.add_argument("--data-root", default=os.path.join(os.path.dirname(backend_dir), "CA_data"), help="Directory holding MTBS event folders")
+  parser.add_argument("--root", default=os.environ.get("TERRANOVA_PYRAMID_DIR", os.path.join(backend_dir, ".pyramid_cache")), help="Pyramid output directory")
+  parser.add_argument("--dry-run", action="store_true", help="List levels that would be built")
+  args = parser.parse_args(argv)
+
+  index = RasterIndex(args.data_root)
+  store = PyramidStore(args.root)
+  built = 0
+  for event_id in index.events():
+    for product, files in sorted(index.products(event_id).items()):
+      if product not in COG_PRODUCTS:
+        continue
+      for product_file in files:
+        if not product_file.path.endswith(".tif"):
+          continue
+        shape = source_shape(product_file.path, product_file.mtime_ns)
+        for factor in available_factors(shape):
+          path = store.level_path(product_file, factor)
+          if os.path.exists(path):
+            continue
+          if args.dry_run:
+            print(f"would build {os.path.basename(path)}")
+            continue
+          level = store.level(product_file, factor)
+          print(f"{os.path.basename(level.path)}: {product_file.size:,} -> {level.size:,} bytes")
+          built += 1
+  if not args.dry_run:
+    print(f"Built {built} pyramid level(s).")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
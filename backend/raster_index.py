@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+# {event_id}_{yyyymmdd}[_{yyyymmdd}][_{product}].{ext}, e.g.
+#   ca3472012055020160918_20160613_20170616_dnbr6.tif
+#   ca3519911969620240713_20240709_S2A_refl.tif
+#   CA3472012055020160918_20160613_20170616_metadata.xml
+PRODUCT_FILE_RE = re.compile(r"^(?P<event>[a-z]{2}\d{19})_(?P<rest>.+)\.(?P<ext>tif|shp|kmz|xml)$")
+DATE_TOKEN_RE = re.compile(r"^\d{8}$")
+
+# Sensor prefixes of the reflectance stacks collapse into a single "refl" product.
+REFL_SENSORS = ("l8", "s2a", "s2b", "l5", "l7", "l9")
+
+
+class ProductFile(NamedTuple):
+  path: str
+  event_id: str
+  product: str
+  dates: Tuple[str, ...]
+  stat: os.stat_result
+
+  @property
+  def size(self) -> int:
+    return self.stat.st_size
+
+  @property
+  def mtime_ns(self) -> int:
+    return self.stat.st_mtime_ns
+
+  @property
+  def etag(self) -> str:
+    return f'"{self.stat.st_mtime_ns:x}-{self.stat.st_size:x}"'
+
+
+def classify_product(filename: str) -> Optional[Tuple[str, str, Tuple[str, ...]]]:
+  """Returns (event_id, product, dates) for an MTBS product file, else None."""
+  match = PRODUCT_FILE_RE.match(filename.lower())
+  if not match:
+    return None
+
+  tokens = match.group("rest").split("_")
+  dates: List[str] = []
+  while tokens and DATE_TOKEN_RE.match(tokens[0]):
+    dates.append(tokens.pop(0))
+
+  ext = match.group("ext")
+  if ext == "kmz":
+    product = "kmz"
+  elif ext == "xml":
+    if tokens != ["metadata"]:
+      return None
+    product = "metadata"
+  elif len(tokens) == 2 and tokens[1] == "refl" and tokens[0] in REFL_SENSORS:
+    product = "refl"
+  elif tokens:
+    product = "_".join(tokens)
+  else:
+    return None
+
+  return match.group("event"), product, tuple(dates)
+
+
+def remove_overview_sidecars(path: str) -> None:
+  """Deletes external overview/statistics sidecars of a GeoTIFF whose pixels were replaced."""
+  for sidecar in (path[:-4] + ".aux", path[:-4] + ".rrd", path + ".ovr", path + ".aux.xml"):
+    if os.path.exists(sidecar):
+      os.remove(sidecar)
+
+
+def scan_event_dir(event_id: str, directory: str) -> Dict[str, List[ProductFile]]:
+  products: Dict[str, List[ProductFile]] = {}
+  with os.scandir(directory) as entries:
+    for entry in entries:
+      if not entry.is_file():
+        continue
+      parsed = classify_product(entry.name)
+      if not parsed or parsed[0] != event_id:
+        continue
+      _, product, dates = parsed
+      products.setdefault(product, []).append(
+        ProductFile(entry.path, event_id, product, dates, entry.stat())
+      )
+  for files in products.values():
+    # Oldest acquisition first, so refl[0] is pre-fire and refl[-1] post-fire.
+    files.sort(key=lambda item: (item.dates, item.path))
+  return products
+
+
+class RasterIndex:
+  """
+  In-memory index of every MTBS event directory under `root` and the product
+  files it contains, keyed by event ID then product name (dnbr, dnbr6, rdnbr,
+  reburn_risk, best_next_steps[_grid], refl, burn_bndy, mask, kmz, metadata).
+
+  `refresh()` rescans directories whose mtime changed, which catches files
+  being added, removed or atomically replaced, and re-stats the indexed files
+  of the others to catch files rewritten in place.
+  """
+
+  def __init__(self, root: str):
+    self.root = root
+    self._events: Dict[str, Dict[str, List[ProductFile]]] = {}
+    self._dir_mtimes: Dict[str, int] = {}
+    # Event ID -> directory as named on disk (MTBS folders may be upper case).
+    self._dir_paths: Dict[str, str] = {}
+    self._lock = threading.Lock()
+    self.refresh()
+
+  def refresh(self) -> List[str]:
+    """Rescans changed event directories; returns the event IDs that changed."""
+    with self._lock:
+      try:
+        with os.scandir(self.root) as entries:
+          directories = {entry.name.lower(): entry for entry in entries if entry.is_dir()}
+      except FileNotFoundError:
+        directories = {}
+
+      events = dict(self._events)
+      dir_mtimes = dict(self._dir_mtimes)
+      dir_paths = {event_id: entry.path for event_id, entry in directories.items()}
+      changed: List[str] = []
+
+      for event_id in list(events):
+        if event_id not in directories:
+          events.pop(event_id)
+          dir_mtimes.pop(event_id, None)
+          changed.append(event_id)
+
+      for event_id, entry in directories.items():
+        try:
+          mtime_ns = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+          continue
+        if dir_mtimes.get(event_id) == mtime_ns and not self._files_changed(events.get(event_id, {})):
+          continue
+        try:
+          events[event_id] = scan_event_dir(event_id, entry.path)
+        except FileNotFoundError:
+          continue
+        dir_mtimes[event_id] = mtime_ns
+        changed.append(event_id)
+
+      # Swap whole dicts so concurrent readers never see a partial scan.
+      self._events = events
+      self._dir_mtimes = dir_mtimes
+      self._dir_paths = dir_paths
+      return changed
+
+  @staticmethod
+  def _files_changed(products: Dict[str, List[ProductFile]]) -> bool:
+    """True if an indexed file was rewritten in place, which leaves the directory mtime alone."""
+    for files in products.values():
+      for item in files:
+        try:
+          current = os.stat(item.path)
+        except FileNotFoundError:
+          return True
+        if (current.st_mtime_ns, current.st_size, current.st_ino) != (item.stat.st_mtime_ns, item.stat.st_size, item.stat.st_ino):
+          return True
+    return False
+
+  def rescan(self, event_ids: Iterable[str]) -> None:
+    """Rescans `event_ids` even if their directory mtime is unchanged (files rewritten in place)."""
+    with self._lock:
+      events = dict(self._events)
+      for event_id in event_ids:
+        if event_id not in events or event_id not in self._dir_paths:
+          continue
+        try:
+          events[event_id] = scan_event_dir(event_id, self._dir_paths[event_id])
+        except FileNotFoundError:
+          continue
+      self._events = events
+
+  def events(self) -> List[str]:
+    return sorted(self._events)
+
+  def products(self, event_id: str) -> Dict[str, List[ProductFile]]:
+    return self._events.get(event_id, {})
+
+  def get(self, event_id: str, product: str) -> Optional[ProductFile]:
+    files = self._events.get(event_id, {}).get(product)
+    return files[0] if files else None
+
+  def first(self, event_id: str, products: Iterable[str]) -> Optional[ProductFile]:
+    for product in products:
+      found = self.get(event_id, product)
+      if found:
+        return found
+    return None
+
+  def all(self, event_id: str, product: str) -> List[ProductFile]:
+    return list(self._events.get(event_id, {}).get(product, []))
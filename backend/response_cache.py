@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+
+class CachedBody(NamedTuple):
+  body: bytes
+  etag: str
+
+
+def serialize(payload: Any, version: Optional[Hashable] = None) -> CachedBody:
+  """
+  JSON-encodes `payload` once. The ETag hashes `version` when given (so it
+  stays the same across workers even if the body embeds a timestamp),
+  otherwise the body itself.
+  """
+  body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+  return CachedBody(body, version_etag(version) if version is not None else content_etag(body))
+
+
+def content_etag(body: bytes) -> str:
+  return f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def version_etag(version: Hashable) -> str:
+  return content_etag(repr(version).encode("utf-8"))
+
+
+class ResponseCache:
+  """
+  Thread-safe LRU of serialized JSON bodies with their ETags.
+
+  Entries are built outside the lock, so a slow build never blocks hits on
+  other keys; two threads missing the same key at once both build it and the
+  last one wins, which is harmless for deterministic payloads.
+  """
+
+  def __init__(self, max_entries: int):
+    self.max_entries = max_entries
+    self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key: Hashable) -> Optional[CachedBody]:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry
+
+  def put(self, key: Hashable, entry: CachedBody) -> None:
+    with self._lock:
+      self._entries[key] = entry
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> CachedBody:
+    """`key` must capture every input of `build`; it doubles as the ETag version."""
+    entry = self.get(key)
+    if entry is None:
+      entry = serialize(build(), version=key)
+      self.put(key, entry)
+    return entry
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self) -> int:
+    return len(self._entries)
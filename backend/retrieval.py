@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+STOPWORDS = frozenset(
+  "a an and are as at be by did do does for from had has have how i in is it its of on or that the this to "
+  "was were what when where which who why will with".split()
+)
+MAX_PASSAGE_WORDS = 60
+
+# Okapi BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def stem(token: str) -> str:
+  """Crude suffix stripping so "burned"/"burns"/"burning" share a term."""
+  for suffix in ("ing", "ed", "es", "s"):
+    if len(token) > len(suffix) + 3 and token.endswith(suffix):
+      return token[: -len(suffix)]
+  return token
+
+
+def tokenize(text: str) -> List[str]:
+  return [stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_passages(text: str, max_words: int = MAX_PASSAGE_WORDS) -> List[str]:
+  """
+  Splits text into paragraphs, then packs each paragraph's consecutive
+  sentences (or lines) into passages of at most `max_words`.
+  """
+  passages: List[str] = []
+  for paragraph in PARAGRAPH_SPLIT_RE.split(text):
+    current: List[str] = []
+    words = 0
+    for sentence in SENTENCE_SPLIT_RE.split(paragraph):
+      sentence = sentence.strip()
+      if not sentence:
+        continue
+      count = len(sentence.split())
+      if current and words + count > max_words:
+        passages.append(" ".join(current))
+        current, words = [], 0
+      current.append(sentence)
+      words += count
+    if current:
+      passages.append(" ".join(current))
+  return passages
+
+
+class Passage(NamedTuple):
+  fire_id: str
+  source: str
+  text: str
+
+
+class PassageIndex:
+  """
+  Okapi BM25 over short passages, built once.
+
+  Passages are stored grouped by fire, so a question about one fire scores
+  only that fire's handful of passages (term lookups in per-passage
+  counters); an unscoped question walks the postings of its query terms.
+  Neither path touches passages that share no term with the question.
+  """
+
+  def __init__(self, passages: Iterable[Passage]):
+    self.passages: List[Passage] = sorted(passages, key=lambda passage: passage.fire_id)
+    self.by_fire: Dict[str, range] = {}
+    self.term_counts: List[Counter] = []
+    self.postings: Dict[str, List[Tuple[int, int]]] = {}
+    lengths: List[int] = []
+
+    start = 0
+    for position, passage in enumerate(self.passages):
+      if position and passage.fire_id != self.passages[position - 1].fire_id:
+        self.by_fire[self.passages[position - 1].fire_id] = range(start, position)
+        start = position
+      counts = Counter(tokenize(passage.text))
+      self.term_counts.append(counts)
+      lengths.append(sum(counts.values()))
+      for term, count in counts.items():
+        self.postings.setdefault(term, []).append((position, count))
+    if self.passages:
+      self.by_fire[self.passages[-1].fire_id] = range(start, len(self.passages))
+
+    total = len(self.passages)
+    average = (sum(lengths) / total) if total else 1.0
+    self.idf: Dict[str, float] = {
+      term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+      for term, postings in self.postings.items()
+    }
+    # Per-passage length normalisation, folded into one divisor term.
+    self.norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / average) for length in lengths]
+
+  def __len__(self) -> int:
+    return len(self.passages)
+
+  def _term_score(self, term: str, count: int, position: int) -> float:
+    return self.idf[term] * count * (BM25_K1 + 1) / (count + self.norms[position])
+
+  def search(self, terms: Sequence[str], fire_id: Optional[str] = None, limit: int = 3) -> List[Tuple[float, Passage]]:
+    terms = [term for term in dict.fromkeys(terms) if term in self.idf]
+    if not terms:
+      return []
+
+    scores: Dict[int, float] = {}
+    if fire_id is not None:
+      for position in self.by_fire.get(fire_id, ()):
+        counts = self.term_counts[position]
+        score = sum(self._term_score(term, counts[term], position) for term in terms if term in counts)
+        if score:
+          scores[position] = score
+    else:
+      for term in terms:
+        for position, count in self.postings[term]:
+          scores[position] = scores.get(position, 0.0) + self._term_score(term, count, position)
+
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [(score, self.passages[position]) for position, score in best]
+
+
+class IntentMatcher:
+  """
+  Keyword intents compiled into one alternation. Keywords match as word
+  prefixes ("ignit" catches "ignited"), and when several intents match, the
+  one listed first wins, independent of where it appears in the question.
+  """
+
+  def __init__(self, intents: Sequence[Tuple[str, Sequence[str]]]):
+    self.priority = {name: rank for rank, (name, _) in enumerate(intents)}
+    self.pattern = re.compile(
+      "|".join(
+        f"(?P<{name}>\\b(?:{'|'.join(re.escape(keyword) for keyword in keywords)}))"
+        for name, keywords in intents
+      ),
+      re.IGNORECASE,
+    )
+
+  def match(self, question: str) -> Optional[str]:
+    found = {match.lastgroup for match in self.pattern.finditer(question)}
+    return min(found, key=self.priority.__getitem__) if found else None
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.warp import transform
+
+from .raster_index import ProductFile
+from .rasters import open_dataset
+from .shared_rasters import read_raster_band
+
+
+WGS84 = CRS.from_epsg(4326)
+
+# Sampleable layers -> MTBS products, in order of preference.
+SAMPLE_LAYERS: Dict[str, List[str]] = {
+  "burnSeverity": ["dnbr6"],
+  "reburnRisk": ["reburn_risk"],
+  "bestNextSteps": ["best_next_steps_grid", "best_next_steps"],
+  "dnbr": ["dnbr"],
+  "rdnbr": ["rdnbr"],
+}
+
+MAX_SAMPLE_POINTS = 1_000_000
+# Body size limits for MAX_SAMPLE_POINTS: packed float64 pairs, or JSON
+# pairs at a generous 64 bytes each (full-precision floats, spaces, commas).
+MAX_BINARY_SAMPLE_BYTES = 16 * MAX_SAMPLE_POINTS
+MAX_JSON_SAMPLE_BYTES = 64 * MAX_SAMPLE_POINTS
+
+# Marks "no value" inside the sampled arrays; never a valid MTBS pixel value.
+MISSING = np.iinfo(np.int32).min
+
+
+class SampleTarget:
+  """One MTBS event that points may fall in, with the products to read."""
+
+  def __init__(self, fire_id: str, products: Dict[str, List[ProductFile]]):
+    self.fire_id = fire_id
+    self.products = products
+
+  def product_for(self, layer: str) -> Optional[ProductFile]:
+    for product in SAMPLE_LAYERS[layer]:
+      files = self.products.get(product)
+      if files:
+        return files[0]
+    return None
+
+
+def parse_points(points: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+  """Splits [[lat, lng], ...] into float64 lat and lng arrays."""
+  array = np.asarray(points, dtype=np.float64)
+  if array.size == 0:
+    return np.empty(0), np.empty(0)
+  if array.ndim != 2 or array.shape[1] != 2:
+    raise ValueError("points must be a list of [lat, lng] pairs")
+  return array[:, 0], array[:, 1]
+
+
+def parse_binary_points(body: bytes) -> Tuple[np.ndarray, np.ndarray]:
+  """Splits a packed little-endian float64 (lat, lng) body into arrays."""
+  if len(body) % 16:
+    raise ValueError("binary body must be packed float64 (lat, lng) pairs")
+  array = np.frombuffer(body, dtype="<f8").reshape(-1, 2)
+  return array[:, 0], array[:, 1]
+
+
+class ProjectedPoints:
+  """Lat/lng points reprojected lazily, once per target CRS."""
+
+  def __init__(self, lats: np.ndarray, lngs: np.ndarray):
+    self.lats = lats
+    self.lngs = lngs
+    self._by_crs: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+  def project(self, crs: CRS) -> Tuple[np.ndarray, np.ndarray]:
+    key = crs.to_wkt()
+    if key not in self._by_crs:
+      xs, ys = transform(WGS84, crs, self.lngs, self.lats)
+      self._by_crs[key] = (np.asarray(xs), np.asarray(ys))
+    return self._by_crs[key]
+
+
+def sample_band(path: str, mtime_ns: int, points: ProjectedPoints) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Returns (point indices inside the raster, values at those points), looked
+  up in the band shared by all workers; only its header is read here.
+  """
+  dataset = open_dataset(path, mtime_ns)
+  xs, ys = points.project(dataset.crs)
+  inverse = ~dataset.transform
+  cols, rows = inverse * (xs, ys)
+  cols = np.floor(cols).astype(np.int64)
+  rows = np.floor(rows).astype(np.int64)
+
+  inside = (cols >= 0) & (cols < dataset.width) & (rows >= 0) & (rows < dataset.height)
+  indices = np.nonzero(inside)[0]
+  if not len(indices):
+    return indices, np.empty(0, dtype=np.int32)
+
+  band = read_raster_band(path, mtime_ns)
+  values = band[rows[indices], cols[indices]].astype(np.int32)
+
+  if dataset.nodata is not None and not math.isnan(dataset.nodata):
+    values[values == int(dataset.nodata)] = MISSING
+  return indices, values
+
+
+def sample_points(lats: np.ndarray, lngs: np.ndarray, targets: List[SampleTarget], layers: List[str]) -> Dict:
+  """
+  Samples every requested layer at every point in one pass per raster.
+
+  Points are reprojected in bulk to each raster's CRS and looked up with
+  vectorized row/col indexing. A point belongs to a fire where that fire's
+  dnbr6 is inside the burn (class > 0), or, without a dnbr6, where any of
+  its layers has data; the rest of its rectangular extent is ignored. When
+  burns overlap, later targets win, so callers pass them oldest first.
+  """
+  count = len(lats)
+  fire_index = np.full(count, -1, dtype=np.int32)
+  values = {layer: np.full(count, MISSING, dtype=np.int32) for layer in layers}
+  valid = np.isfinite(lats) & np.isfinite(lngs)
+  valid_indices = np.nonzero(valid)[0]
+  projected = ProjectedPoints(lats[valid_indices], lngs[valid_indices])
+
+  for target_number, target in enumerate(targets):
+    sampled: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for layer in dict.fromkeys([*layers, "burnSeverity"]):
+      product_file = target.product_for(layer)
+      if product_file:
+        sampled[layer] = sample_band(product_file.path, product_file.mtime_ns, projected)
+
+    owned = np.zeros(len(valid_indices), dtype=bool)
+    if "burnSeverity" in sampled:
+      indices, classes = sampled["burnSeverity"]
+      owned[indices[classes > 0]] = True
+    else:
+      for indices, layer_values in sampled.values():
+        owned[indices[layer_values != MISSING]] = True
+    if not owned.any():
+      continue
+
+    points = valid_indices[owned]
+    fire_index[points] = target_number
+    for layer in layers:
+      # Re-matched points take only this fire's values, never an older fire's.
+      values[layer][points] = MISSING
+      if layer not in sampled:
+        continue
+      indices, layer_values = sampled[layer]
+      keep = owned[indices] & (layer_values != MISSING)
+      values[layer][valid_indices[indices[keep]]] = layer_values[keep]
+
+  fire_ids = [target.fire_id for target in targets]
+  return {
+    "count": count,
+    "fireIds": [fire_ids[number] if number >= 0 else None for number in fire_index.tolist()],
+    "layers": {
+      layer: [None if value == MISSING else value for value in column.tolist()]
+      for layer, column in values.items()
+    },
+  }
@@ -0,0 +1,290 @@
+"""
+Recomputes MTBS severity products from the pre/post reflectance stacks.
+
+For each event with two reflectance scenes this derives NBR for both dates,
+then dNBR, RdNBR and the thresholded dnbr6 classes, using the thresholds in
+the event's burn_bndy attributes unless overridden. Rasters are processed in
+row strips spread over a process pool, so memory stays bounded by
+`--chunk-rows` x workers however large the scene. Run from the project root:
+
+  python -m backend.severity                         # every event, into backend/.severity/
+  python -m backend.severity --event ca3472012055020160918 --high 280
+  python -m backend.severity --output-dir CA_data    # replace the served products in place
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.features import rasterize
+from rasterio.windows import Window, transform as window_transform
+
+from .metadata import read_burn_boundary_record
+from .raster_index import ProductFile, RasterIndex, remove_overview_sidecars
+from .vectors import read_shapefile_geometries
+
+
+# MTBS reflectance stacks (Landsat and Sentinel-2 alike) carry NIR in band 4
+# and SWIR2 in band 6; with these the dNBR matches the shipped dnbr.tif.
+NIR_BAND = 4
+SWIR2_BAND = 6
+
+INT16_NODATA = -32768
+DEFAULT_CHUNK_ROWS = 256
+
+# dnbr6 classes (see stats.SEVERITY_CLASSES); 0 is outside the burn boundary.
+OUTSIDE_CLASS = 0
+UNBURNED_TO_LOW_CLASS = 1
+LOW_CLASS = 2
+MODERATE_CLASS = 3
+HIGH_CLASS = 4
+INCREASED_GREENNESS_CLASS = 5
+NON_PROCESSING_CLASS = 6
+
+
+class Thresholds(NamedTuple):
+  """dNBR class breaks (upper bounds, inclusive) and the RdNBR offset."""
+  increased_greenness: float
+  low: float
+  moderate: float
+  high: float
+  offset: float
+
+
+class SeverityJob(NamedTuple):
+  event_id: str
+  pre: ProductFile
+  post: ProductFile
+  boundary: Optional[str]
+  mask: Optional[str]
+  thresholds: Thresholds
+
+
+def nbr(nir: np.ndarray, swir2: np.ndarray) -> np.ndarray:
+  """
+  Normalized Burn Ratio x 1000 as whole numbers, as MTBS stores it; NaN
+  where both bands are zero (no data). MTBS truncates for the legacy 8-bit
+  Landsat stacks and rounds for the 16-bit ones (Landsat Collection 2,
+  Sentinel-2). With this, dNBR matches the shipped dnbr.tif exactly on
+  99.8-100% of pixels, against 66-75% for unquantized NBR.
+  """
+  quantize = np.trunc if nir.dtype == np.uint8 else np.rint
+  nir = nir.astype(np.float64)
+  swir2 = swir2.astype(np.float64)
+  total = nir + swir2
+  with np.errstate(divide="ignore", invalid="ignore"):
+    return np.where(total > 0, quantize(1000.0 * (nir - swir2) / total), np.nan)
+
+
+def classify_dnbr(dnbr: np.ndarray, thresholds: Thresholds) -> np.ndarray:
+  classes = np.full(dnbr.shape, UNBURNED_TO_LOW_CLASS, dtype=np.uint8)
+  classes[dnbr <= thresholds.increased_greenness] = INCREASED_GREENNESS_CLASS
+  classes[dnbr > thresholds.low] = LOW_CLASS
+  classes[dnbr > thresholds.moderate] = MODERATE_CLASS
+  classes[dnbr > thresholds.high] = HIGH_CLASS
+  return classes
+
+
+def to_int16(values: np.ndarray, quantize: Callable[[np.ndarray], np.ndarray] = np.rint) -> np.ndarray:
+  rounded = quantize(np.clip(values, INT16_NODATA + 1, np.iinfo(np.int16).max))
+  return np.where(np.isfinite(values), rounded, INT16_NODATA).astype(np.int16)
+
+
+# Per-process state, set once by the pool initializer so each chunk task only
+# carries its window.
+_worker_job: Optional[SeverityJob] = None
+_worker_shapes: Dict[str, List[Dict]] = {}
+
+
+def _init_worker(job: SeverityJob) -> None:
+  global _worker_job, _worker_shapes
+  _worker_job = job
+  _worker_shapes = {
+    name: read_shapefile_geometries(path)
+    for name, path in (("boundary", job.boundary), ("mask", job.mask))
+    if path
+  }
+
+
+def _shape_mask(name: str, window: Window, transform) -> Optional[np.ndarray]:
+  geometries = _worker_shapes.get(name)
+  if not geometries:
+    return None
+  out_shape = (int(window.height), int(window.width))
+  return rasterize(geometries, out_shape=out_shape, transform=transform, fill=0, default_value=1, dtype="uint8").astype(bool)
+
+
+def process_chunk(window: Window) -> Tuple[Window, np.ndarray, np.ndarray, np.ndarray]:
+  """Returns (window, dNBR, RdNBR, dnbr6) for one strip of the scene."""
+  job = _worker_job
+  with rasterio.open(job.pre.path) as pre, rasterio.open(job.post.path) as post:
+    pre_nbr = nbr(*pre.read((NIR_BAND, SWIR2_BAND), window=window))
+    post_nbr = nbr(*post.read((NIR_BAND, SWIR2_BAND), window=window))
+    transform = window_transform(window, pre.transform)
+
+  dnbr = pre_nbr - post_nbr
+  with np.errstate(divide="ignore", invalid="ignore"):
+    # A pre-fire NBR of 0 is taken as 1 (0.001), as in the shipped rdnbr.tif.
+    rdnbr = (dnbr - job.thresholds.offset) / np.sqrt(np.maximum(np.abs(pre_nbr), 1.0) / 1000.0)
+
+  classes = classify_dnbr(dnbr, job.thresholds)
+  classes[~np.isfinite(dnbr)] = OUTSIDE_CLASS
+  masked = _shape_mask("mask", window, transform)
+  if masked is not None:
+    classes[masked] = NON_PROCESSING_CLASS
+  inside = _shape_mask("boundary", window, transform)
+  if inside is not None:
+    classes[~inside] = OUTSIDE_CLASS
+  # MTBS truncates RdNBR toward zero; rounding it disagrees on about half the pixels.
+  return window, to_int16(dnbr), to_int16(rdnbr, np.trunc), classes
+
+
+def strips(width: int, height: int, chunk_rows: int) -> Iterator[Window]:
+  for row in range(0, height, chunk_rows):
+    yield Window(0, row, width, min(chunk_rows, height - row))
+
+
+def event_thresholds(boundary: Optional[str], overrides: Dict[str, Optional[float]]) -> Thresholds:
+  record = read_burn_boundary_record(boundary) if boundary else {}
+  values = {
+    "increased_greenness": record.get("increased_greenness_threshold"),
+    "low": record.get("low_threshold"),
+    "moderate": record.get("moderate_threshold"),
+    "high": record.get("high_threshold"),
+    "offset": record.get("dnbr_offset", 0.0),
+  }
+  values.update({key: value for key, value in overrides.items() if value is not None})
+  missing = [key for key, value in values.items() if value is None]
+  if missing:
+    raise ValueError(f"missing thresholds ({', '.join(missing)}); pass them on the command line")
+  return Thresholds(**{key: float(value) for key, value in values.items()})
+
+
+def find_jobs(index: RasterIndex, event_ids: Optional[List[str]], overrides: Dict[str, Optional[float]]) -> List[SeverityJob]:
+  jobs = []
+  for event_id in event_ids or index.events():
+    scenes = [item for item in index.all(event_id, "refl") if item.path.endswith(".tif")]
+    if len(scenes) < 2:
+      continue
+    boundary = index.first(event_id, ["burn_bndy"])
+    mask = index.first(event_id, ["mask"])
+    boundary_path = boundary.path if boundary else None
+    jobs.append(SeverityJob(
+      event_id,
+      scenes[0],
+      scenes[-1],
+      boundary_path,
+      mask.path if mask else None,
+      event_thresholds(boundary_path, overrides),
+    ))
+  return jobs
+
+
+def output_paths(job: SeverityJob, output_dir: str) -> Dict[str, str]:
+  directory = os.path.join(output_dir, job.event_id)
+  stem = f"{job.event_id}_{job.pre.dates[0]}_{job.post.dates[0]}"
+  return {product: os.path.join(directory, f"{stem}_{product}.tif") for product in ("dnbr", "rdnbr", "dnbr6")}
+
+
+def run_job(job: SeverityJob, output_dir: str, workers: int, chunk_rows: int) -> Dict[str, str]:
+  """
+  Computes one event and writes its three products atomically. At most
+  2 x `workers` strips are in flight, so finished strips never pile up
+  waiting to be written.
+  """
+  with rasterio.open(job.pre.path) as pre:
+    profile = pre.profile.copy()
+    width, height = pre.width, pre.height
+  for key in ("blockxsize", "blockysize", "tiled", "interleave", "photometric"):
+    profile.pop(key, None)
+  profile.update(driver="GTiff", count=1, compress="deflate")
+
+  paths = output_paths(job, output_dir)
+  os.makedirs(os.path.dirname(paths["dnbr"]), exist_ok=True)
+  tmp_paths = {product: f"{path}.{os.getpid()}.tmp" for product, path in paths.items()}
+  outputs = {
+    "dnbr": rasterio.open(tmp_paths["dnbr"], "w", **{**profile, "dtype": "int16", "nodata": INT16_NODATA, "predictor": 2}),
+    "rdnbr": rasterio.open(tmp_paths["rdnbr"], "w", **{**profile, "dtype": "int16", "nodata": INT16_NODATA, "predictor": 2}),
+    "dnbr6": rasterio.open(tmp_paths["dnbr6"], "w", **{**profile, "dtype": "uint8", "nodata": None}),
+  }
+
+  def write(result: Tuple[Window, np.ndarray, np.ndarray, np.ndarray]) -> None:
+    window, dnbr, rdnbr, classes = result
+    outputs["dnbr"].write(dnbr, 1, window=window)
+    outputs["rdnbr"].write(rdnbr, 1, window=window)
+    outputs["dnbr6"].write(classes, 1, window=window)
+
+  try:
+    windows = strips(width, height, chunk_rows)
+    if workers <= 1:
+      _init_worker(job)
+      for window in windows:
+        write(process_chunk(window))
+    else:
+      with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(job,)) as pool:
+        pending: Set[Future] = set()
+        for window in windows:
+          if len(pending) >= 2 * workers:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+              write(future.result())
+          pending.add(pool.submit(process_chunk, window))
+        for future in pending:
+          write(future.result())
+    for dataset in outputs.values():
+      dataset.close()
+    for product, path in paths.items():
+      os.replace(tmp_paths[product], path)
+      # Overview sidecars of a replaced product describe the old pixels.
+      remove_overview_sidecars(path)
+  finally:
+    for dataset in outputs.values():
+      dataset.close()
+    for path in tmp_paths.values():
+      if os.path.exists(path):
+        os.remove(path)
+  return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+  backend_dir = os.path.dirname(os.path.abspath(__file__))
+  parser = argparse.ArgumentParser(description="Recompute dNBR, RdNBR and dnbr6 from MTBS pre/post reflectance stacks.")
+  parser.add_argument("--data-root", default=os.path.join(os.path.dirname(backend_dir), "CA_data"), help="Directory holding MTBS event folders")
+  parser.add_argument("--output-dir", default=os.path.join(backend_dir, ".severity"), help="Products are written to <output-dir>/<event_id>/")
+  parser.add_argument("--event", action="append", dest="events", help="Event ID to process (repeatable; default: all)")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (1 runs inline)")
+  parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per processing strip")
+  for name in ("increased-greenness", "low", "moderate", "high", "offset"):
+    parser.add_argument(f"--{name}", type=float, help=f"Override the event's dNBR {name.replace('-', ' ')} value")
+  args = parser.parse_args(argv)
+
+  overrides = {
+    "increased_greenness": args.increased_greenness,
+    "low": args.low,
+    "moderate": args.moderate,
+    "high": args.high,
+    "offset": args.offset,
+  }
+  try:
+    jobs = find_jobs(RasterIndex(args.data_root), args.events, overrides)
+  except ValueError as exc:
+    print(exc, file=sys.stderr)
+    return 1
+  if not jobs:
+    print("No events with pre/post reflectance stacks found.")
+    return 0
+
+  for job in jobs:
+    paths = run_job(job, args.output_dir, max(1, args.workers), max(1, args.chunk_rows))
+    print(f"{job.event_id}: " + ", ".join(paths.values()))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
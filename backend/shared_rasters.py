@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+import rasterio
+
+
+def _default_root() -> str:
+  # RAM-backed where available; any local disk works since reads go through the page cache.
+  base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+  return os.path.join(base, "terranova-rasters")
+
+
+SHARED_RASTER_DIR = os.environ.get("TERRANOVA_SHARED_RASTER_DIR") or _default_root()
+SHARED_RASTER_MAX_BYTES = int(os.environ.get("TERRANOVA_SHARED_RASTER_MB", "512")) * 1024 * 1024
+# How often an in-process hit refreshes its entry's mtime (the LRU clock shared
+# by every worker) and checks that another worker has not evicted it.
+TOUCH_INTERVAL_SECONDS = 30.0
+
+ArrayGroup = Dict[str, np.ndarray]
+
+
+class _Attachment(NamedTuple):
+  group: ArrayGroup
+  nbytes: int
+  touched: float
+
+
+class SharedArrayStore:
+  """
+  Decoded rasters and derived arrays shared by every worker on the host.
+
+  Each entry is a directory of .npy files under `root`, named after its
+  source file version, so a replaced raster gets a new entry. The first
+  process to need an entry builds it under an flock while the others wait,
+  then every process attaches it with np.load(mmap_mode="r"): the pages
+  live once in the OS page cache (or /dev/shm), not once per worker.
+
+  Total size is capped at `max_bytes`; the least recently used entries are
+  deleted first. Hits touch the entry's directory at most once per
+  TOUCH_INTERVAL_SECONDS, which is also when a worker notices that another
+  one deleted it and drops its own mapping. Unlinking is safe while other
+  workers still map the files, and a worker that finds an entry gone simply
+  rebuilds it. Each worker also keeps at most `max_bytes` attached.
+  """
+
+  def __init__(self, root: str, max_bytes: int):
+    self.root = root
+    self.max_bytes = max_bytes
+    self._attached: "OrderedDict[str, _Attachment]" = OrderedDict()
+    self._attached_bytes = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    os.makedirs(root, exist_ok=True)
+
+  def _path_for(self, name: str) -> str:
+    return os.path.join(self.root, name)
+
+  def _attach(self, name: str) -> Optional[ArrayGroup]:
+    path = self._path_for(name)
+    try:
+      group = {
+        filename[:-4]: np.load(os.path.join(path, filename), mmap_mode="r")
+        for filename in os.listdir(path)
+        if filename.endswith(".npy")
+      }
+      os.utime(path)
+    except (FileNotFoundError, NotADirectoryError):
+      return None
+    return group or None
+
+  def _remember(self, name: str, group: ArrayGroup) -> ArrayGroup:
+    attachment = _Attachment(group, sum(array.nbytes for array in group.values()), time.monotonic())
+    with self._lock:
+      self._detach(name)
+      self._attached[name] = attachment
+      self._attached_bytes += attachment.nbytes
+      while self._attached_bytes > self.max_bytes and len(self._attached) > 1:
+        self._detach(next(iter(self._attached)))
+    return group
+
+  def _detach(self, name: str) -> None:
+    attachment = self._attached.pop(name, None)
+    if attachment is not None:
+      self._attached_bytes -= attachment.nbytes
+
+  def _cached(self, name: str) -> Optional[ArrayGroup]:
+    with self._lock:
+      attachment = self._attached.get(name)
+      if attachment is None:
+        return None
+      self._attached.move_to_end(name)
+      now = time.monotonic()
+      if now - attachment.touched < TOUCH_INTERVAL_SECONDS:
+        return attachment.group
+      self._attached[name] = attachment._replace(touched=now)
+    try:
+      os.utime(self._path_for(name))
+    except FileNotFoundError:
+      # Evicted by another worker: let go of the mapping and re-attach or rebuild.
+      with self._lock:
+        self._detach(name)
+      return None
+    return attachment.group
+
+  def _count(self, hit: bool) -> None:
+    with self._lock:
+      if hit:
+        self.hits += 1
+      else:
+        self.misses += 1
+
+  def get(self, name: str, build: Callable[[], ArrayGroup]) -> ArrayGroup:
+    """Returns the read-only arrays stored as `name`, building them once per host if missing."""
+    group = self._cached(name)
+    if group is not None:
+      self._count(hit=True)
+      return group
+
+    group = self._attach(name)
+    if group is not None:
+      self._count(hit=True)
+      return self._remember(name, group)
+
+    with open(self._path_for(name) + ".lock", "w") as lock_file:
+      fcntl.flock(lock_file, fcntl.LOCK_EX)
+      # Another worker may have built it while we waited for the lock.
+      group = self._attach(name)
+      if group is None:
+        self._count(hit=False)
+        self._write(name, build())
+        self._evict(keep=name)
+        group = self._attach(name)
+      else:
+        self._count(hit=True)
+    return self._remember(name, group)
+
+  def _write(self, name: str, arrays: ArrayGroup) -> None:
+    tmp_path = tempfile.mkdtemp(prefix=f".{name}.", dir=self.root)
+    try:
+      for key, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{key}.npy"), np.ascontiguousarray(array))
+      try:
+        os.rename(tmp_path, self._path_for(name))
+      except OSError:
+        # Already built (e.g. by a worker holding another lock file); the
+        # temp copy is dropped below and the caller attaches the existing one.
+        if not os.path.isdir(self._path_for(name)):
+          raise
+    finally:
+      if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+  def _evict(self, keep: str) -> None:
+    entries = []
+    total = 0
+    with os.scandir(self.root) as found:
+      for entry in found:
+        if not entry.is_dir() or entry.name.startswith("."):
+          continue
+        try:
+          size = sum(item.stat().st_size for item in os.scandir(entry.path))
+          entries.append((entry.stat().st_mtime, entry.name, size))
+        except FileNotFoundError:
+          continue
+        total += size
+    for _, name, size in sorted(entries):
+      if total <= self.max_bytes:
+        break
+      if name == keep:
+        continue
+      shutil.rmtree(self._path_for(name), ignore_errors=True)
+      with self._lock:
+        self._detach(name)
+      # The .lock file stays: another worker may hold or wait on an flock for
+      # it, and a new file would give the next one a separate lock.
+      total -= size
+
+  def __len__(self) -> int:
+    return len(self._attached)
+
+
+shared_arrays = SharedArrayStore(SHARED_RASTER_DIR, SHARED_RASTER_MAX_BYTES)
+
+
+def version_name(path: str, mtime_ns: int, suffix: str = "") -> str:
+  """Store entry name for data derived from one version of `path`."""
+  stem = os.path.splitext(os.path.basename(path))[0]
+  return f"{stem}-{mtime_ns:x}{suffix}"
+
+
+def read_raster_band(path: str, mtime_ns: int, band: int = 1) -> np.ndarray:
+  """One band of a raster, decoded once per host and memory-mapped read-only."""
+  def build() -> ArrayGroup:
+    with rasterio.open(path) as dataset:
+      return {"data": dataset.read(band)}
+  return shared_arrays.get(version_name(path, mtime_ns, f"-b{band}"), build)["data"]
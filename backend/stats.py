@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.features import rasterize, shapes, sieve
+
+from .raster_index import ProductFile
+from .shared_rasters import read_raster_band
+from .vectors import read_shapefile_geometries
+
+
+SQUARE_METERS_PER_ACRE = 4046.8564224
+
+# MTBS thematic burn severity classes (dnbr6.tif); 0 is outside the assessment.
+SEVERITY_CLASSES: Dict[int, Tuple[str, str]] = {
+  1: ("unburnedToLow", "Unburned to low"),
+  2: ("low", "Low"),
+  3: ("moderate", "Moderate"),
+  4: ("high", "High"),
+  5: ("increasedGreenness", "Increased greenness"),
+  6: ("nonProcessing", "Non-processing area"),
+}
+# Classes that count as mapped burn area when computing ratios.
+MAPPED_CLASSES = (1, 2, 3, 4, 5)
+HIGH_SEVERITY_CLASS = 4
+# High-severity patches smaller than this (~10 acres at 30 m) are not counted.
+MIN_PATCH_PIXELS = 45
+
+# reburn_risk.tif values; 255 is nodata.
+REBURN_CLASSES: Dict[int, Tuple[str, str]] = {
+  0: ("low", "Low"),
+  1: ("medium", "Medium"),
+  2: ("high", "High"),
+}
+
+
+# Products whose files feed the statistics.
+STATS_PRODUCTS = ("dnbr6", "reburn_risk", "burn_bndy", "mask")
+
+# Input signature: ((product, path, mtime_ns), ...) so a rewritten file misses the cache.
+StatsKey = Tuple[Tuple[str, str, int], ...]
+
+
+def rasterize_mask(path: str, out_shape: Tuple[int, int], transform) -> Optional[np.ndarray]:
+  geometries = read_shapefile_geometries(path)
+  if not geometries:
+    return None
+  return rasterize(geometries, out_shape=out_shape, transform=transform, fill=0, default_value=1, dtype="uint8").astype(bool)
+
+
+def _class_breakdown(counts: np.ndarray, classes: Dict[int, Tuple[str, str]], pixel_acres: float, total: int) -> List[Dict]:
+  breakdown = []
+  for value, (key, label) in classes.items():
+    pixels = int(counts[value])
+    breakdown.append({
+      "class": value,
+      "key": key,
+      "label": label,
+      "pixels": pixels,
+      "acres": round(pixels * pixel_acres, 1),
+      "percent": round(100.0 * pixels / total, 2) if total else 0.0,
+    })
+  return breakdown
+
+
+def _count_patches(binary: np.ndarray) -> int:
+  if not binary.any():
+    return 0
+  data = sieve(binary.astype(np.uint8), size=MIN_PATCH_PIXELS, connectivity=8)
+  return sum(1 for _, value in shapes(data, mask=data == 1, connectivity=8) if value == 1)
+
+
+@lru_cache(maxsize=256)
+def compute_stats(key: StatsKey) -> Dict:
+  paths = {product: path for product, path, _ in key}
+  mtimes = {product: mtime_ns for product, _, mtime_ns in key}
+
+  with rasterio.open(paths["dnbr6"]) as dataset:
+    transform = dataset.transform
+  severity = read_raster_band(paths["dnbr6"], mtimes["dnbr6"])
+  pixel_acres = abs(transform.a * transform.e) / SQUARE_METERS_PER_ACRE
+
+  valid = np.ones(severity.shape, dtype=bool)
+  if "burn_bndy" in paths:
+    inside = rasterize_mask(paths["burn_bndy"], severity.shape, transform)
+    if inside is not None:
+      valid &= inside
+  if "mask" in paths:
+    masked = rasterize_mask(paths["mask"], severity.shape, transform)
+    if masked is not None:
+      valid &= ~masked
+
+  severity_counts = np.bincount(severity[valid].ravel(), minlength=256)
+  mapped_pixels = int(severity_counts[list(MAPPED_CLASSES)].sum())
+
+  reburn = None
+  if "reburn_risk" in paths:
+    reburn_values = read_raster_band(paths["reburn_risk"], mtimes["reburn_risk"])
+    if reburn_values.shape == severity.shape:
+      reburn_counts = np.bincount(reburn_values[valid].ravel(), minlength=256)
+      reburn_pixels = int(reburn_counts[list(REBURN_CLASSES)].sum())
+      distribution = _class_breakdown(reburn_counts, REBURN_CLASSES, pixel_acres, reburn_pixels)
+      dominant = max(distribution, key=lambda item: item["pixels"]) if reburn_pixels else None
+      reburn = {
+        "level": dominant["label"] if dominant else None,
+        "distribution": distribution,
+      }
+
+  return {
+    "pixelAcres": round(pixel_acres, 4),
+    "mappedAcres": round(mapped_pixels * pixel_acres, 1),
+    "severity": _class_breakdown(severity_counts, SEVERITY_CLASSES, pixel_acres, mapped_pixels),
+    "unburnedRatio": round(severity_counts[1] / mapped_pixels, 4) if mapped_pixels else 0.0,
+    "highRatio": round(severity_counts[HIGH_SEVERITY_CLASS] / mapped_pixels, 4) if mapped_pixels else 0.0,
+    "highSeverityPatches": _count_patches(valid & (severity == HIGH_SEVERITY_CLASS)),
+    "reburnRisk": reburn,
+  }
+
+
+def stats_key(products: Dict[str, List[ProductFile]]) -> Optional[StatsKey]:
+  """The input signature of an event's statistics; None without a dnbr6 raster."""
+  if not products.get("dnbr6"):
+    return None
+  return tuple(
+    (product, products[product][0].path, products[product][0].mtime_ns)
+    for product in STATS_PRODUCTS
+    if products.get(product)
+  )
+
+
+def fire_stats(products: Dict[str, List[ProductFile]]) -> Optional[Dict]:
+  """
+  Zonal burn-severity statistics for one MTBS event, computed from dnbr6.tif
+  (clipped to the burn boundary, minus the MTBS mask) and reburn_risk.tif.
+
+  Results are memoized on the input files' paths and mtimes, so repeat calls
+  cost a dict lookup and a changed raster is recomputed on next access.
+  Returns None when the event has no dnbr6 raster.
+  """
+  key = stats_key(products)
+  return compute_stats(key) if key else None
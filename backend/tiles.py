@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.crs import CRS
+from rasterio.transform import from_bounds
+from rasterio.warp import Resampling, reproject
+
+from .rasters import densified_bounds, open_dataset, read_window
+
+
+TILE_SIZE = 256
+MAX_ZOOM = 18
+WEB_MERCATOR = CRS.from_epsg(3857)
+MERCATOR_EXTENT = 20037508.342789244
+
+# Colormaps mirror the ones scripts/map.js used for client-side rendering.
+# Any value not listed renders fully transparent.
+TILE_COLORMAPS: Dict[str, Dict[int, Tuple[int, int, int, int]]] = {
+  "burn-severity": {
+    1: (0, 100, 0, 200),        # Low severity - dark green
+    2: (144, 238, 144, 200),    # Low-Moderate - light green
+    3: (255, 255, 0, 200),      # Moderate - yellow
+    4: (255, 165, 0, 200),      # High - orange
+    5: (255, 0, 0, 200),        # High (increased) - red
+  },
+  "reburn-risk": {
+    0: (0, 153, 0, 200),        # Low - green
+    1: (255, 165, 0, 200),      # Medium - orange
+    2: (255, 0, 0, 200),        # High - red
+  },
+  "best-next-steps": {
+    0: (128, 128, 128, 200),    # Abandon/Monitor - gray
+    1: (255, 255, 0, 200),      # Fuel Reduction - yellow
+    2: (0, 102, 0, 200),        # Reforest - dark green
+    3: (153, 102, 51, 200),     # Soil Stabilization - brown
+  },
+}
+
+# Sentinel written into tile pixels that fall outside the source raster.
+FILL_VALUE = 255
+
+
+def _build_lut(colors: Dict[int, Tuple[int, int, int, int]]) -> np.ndarray:
+  lut = np.zeros((256, 4), dtype=np.uint8)
+  for value, rgba in colors.items():
+    lut[value] = rgba
+  return lut
+
+
+TILE_LUTS: Dict[str, np.ndarray] = {name: _build_lut(colors) for name, colors in TILE_COLORMAPS.items()}
+
+
+def _encode_png(rgba: np.ndarray) -> bytes:
+  buffer = io.BytesIO()
+  Image.fromarray(rgba, mode="RGBA").save(buffer, format="PNG", optimize=False, compress_level=6)
+  return buffer.getvalue()
+
+
+EMPTY_TILE = _encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+  """Web Mercator (left, bottom, right, top) of an XYZ tile."""
+  span = 2 * MERCATOR_EXTENT / (2 ** z)
+  left = -MERCATOR_EXTENT + x * span
+  top = MERCATOR_EXTENT - y * span
+  return left, top - span, left + span, top
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+  if z < 0 or z > MAX_ZOOM:
+    return False
+  limit = 2 ** z
+  return 0 <= x < limit and 0 <= y < limit
+
+
+class SourceRaster:
+  """Georeferencing of a single-band product, read once per file version."""
+
+  def __init__(self, path: str):
+    with rasterio.open(path) as dataset:
+      self.crs = dataset.crs
+      self.nodata = dataset.nodata
+      self.mercator_bounds = densified_bounds(dataset.crs, WEB_MERCATOR, tuple(dataset.bounds))
+
+  def intersects(self, bounds: Tuple[float, float, float, float]) -> bool:
+    left, bottom, right, top = self.mercator_bounds
+    return not (bounds[2] <= left or bounds[0] >= right or bounds[3] <= bottom or bounds[1] >= top)
+
+
+@lru_cache(maxsize=64)
+def load_source(path: str, mtime_ns: int) -> SourceRaster:
+  # mtime is part of the key so a replaced file is read again.
+  return SourceRaster(path)
+
+
+def render_tile(layer: str, path: str, mtime_ns: int, z: int, x: int, y: int) -> Optional[bytes]:
+  """
+  Reprojects the raster at `path` into one 256px Web Mercator tile and applies
+  the layer colormap. Returns None when the tile does not touch the raster.
+  """
+  source = load_source(path, mtime_ns)
+  bounds = tile_bounds(z, x, y)
+  if not source.intersects(bounds):
+    return None
+
+  dataset = open_dataset(path, mtime_ns)
+  src_bounds = densified_bounds(WEB_MERCATOR, source.crs, bounds)
+  target_resolution = (src_bounds[2] - src_bounds[0]) / TILE_SIZE
+  window = read_window(dataset, src_bounds, target_resolution)
+  if window is None:
+    return None
+  array, window_transform = window
+
+  destination = np.full((TILE_SIZE, TILE_SIZE), FILL_VALUE, dtype=np.uint8)
+  reproject(
+    source=array,
+    destination=destination,
+    src_transform=window_transform,
+    src_crs=source.crs,
+    src_nodata=source.nodata,
+    dst_transform=from_bounds(*bounds, TILE_SIZE, TILE_SIZE),
+    dst_crs=WEB_MERCATOR,
+    dst_nodata=FILL_VALUE,
+    resampling=Resampling.nearest,
+  )
+  rgba = TILE_LUTS[layer][destination]
+  if not rgba[..., 3].any():
+    return None
+  return _encode_png(rgba)
+
+
+# What an empty-tile marker is charged against max_bytes: its file system block.
+EMPTY_ENTRY_BYTES = 4096
+
+
+def _charge(size: int) -> int:
+  return size or EMPTY_ENTRY_BYTES
+
+
+class TileCache:
+  """
+  Size-bounded on-disk tile cache with least-recently-used eviction.
+
+  Tiles are stored as individual PNG files under `root`; an in-memory index of
+  path -> size keeps lookups and eviction off the filesystem metadata path.
+  Tiles with nothing to draw are stored as empty files and served as the
+  shared EMPTY_TILE, so they are not re-rendered on every request.
+  """
+
+  def __init__(self, root: str, max_bytes: int):
+    self.root = root
+    self.max_bytes = max_bytes
+    self.total_bytes = 0
+    self._entries: "OrderedDict[str, int]" = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    os.makedirs(root, exist_ok=True)
+    self._load_existing()
+
+  def _load_existing(self) -> None:
+    found = []
+    for dirpath, _, filenames in os.walk(self.root):
+      for filename in filenames:
+        if not filename.endswith(".png"):
+          continue
+        path = os.path.join(dirpath, filename)
+        try:
+          stat = os.stat(path)
+        except OSError:
+          continue
+        found.append((stat.st_mtime, path, stat.st_size))
+    for _, path, size in sorted(found):
+      self._entries[path] = size
+      self.total_bytes += _charge(size)
+    with self._lock:
+      self._evict()
+
+  def _path_for(self, key: str) -> str:
+    return os.path.join(self.root, key)
+
+  def _forget(self, path: str) -> None:
+    if path in self._entries:
+      self.total_bytes -= _charge(self._entries.pop(path))
+
+  def get(self, key: str) -> Optional[bytes]:
+    """The cached PNG (EMPTY_TILE for an empty tile), or None on a miss."""
+    path = self._path_for(key)
+    with self._lock:
+      size = self._entries.get(path)
+      if size is None:
+        self.misses += 1
+        return None
+      self._entries.move_to_end(path)
+      if size == 0:
+        self.hits += 1
+        return EMPTY_TILE
+    try:
+      with open(path, "rb") as handle:
+        data = handle.read()
+    except OSError:
+      with self._lock:
+        self._forget(path)
+        self.misses += 1
+      return None
+    with self._lock:
+      self.hits += 1
+    return data
+
+  def put(self, key: str, data: Optional[bytes]) -> None:
+    """Stores a rendered PNG, or None to remember that the tile is empty."""
+    data = data or b""
+    path = self._path_for(key)
+    # Workers share the cache directory, and thread idents repeat across processes.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    for attempt in range(2):
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      try:
+        with open(tmp_path, "wb") as handle:
+          handle.write(data)
+        break
+      except FileNotFoundError:
+        # An eviction removed the emptied directory in between; recreate it once.
+        if attempt:
+          raise
+    os.replace(tmp_path, path)
+    with self._lock:
+      self._forget(path)
+      self._entries[path] = len(data)
+      self.total_bytes += _charge(len(data))
+      self._evict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def _evict(self) -> None:
+    while self.total_bytes > self.max_bytes and self._entries:
+      path, size = self._entries.popitem(last=False)
+      self.total_bytes -= _charge(size)
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+      self._remove_empty_dirs(os.path.dirname(path))
+
+  def _remove_empty_dirs(self, directory: str) -> None:
+    """Removes `directory` and its parents up to `root` while they are empty."""
+    root = os.path.abspath(self.root)
+    directory = os.path.abspath(directory)
+    while directory != root and directory.startswith(root + os.sep):
+      try:
+        os.rmdir(directory)
+      except OSError:
+        return  # Not empty (or already gone / being written to)
+      directory = os.path.dirname(directory)
+
+
+def tile_cache_key(layer: str, event_id: str, mtime_ns: int, z: int, x: int, y: int) -> str:
+  return os.path.join(layer, event_id, str(mtime_ns), str(z), str(x), f"{y}.png")
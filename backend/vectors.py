@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import shapefile
+from rasterio.crs import CRS
+from rasterio.warp import transform
+
+
+WGS84 = CRS.from_epsg(4326)
+METERS_PER_DEGREE = 111_320.0
+
+# Simplification ladder: about half a Web Mercator pixel at each zoom level.
+MAX_SIMPLIFY_ZOOM = 16
+ZOOM_TOLERANCES: List[float] = [156_543.034 / (2 ** zoom) / 2 for zoom in range(MAX_SIMPLIFY_ZOOM + 1)]
+
+
+def read_shapefile_geometries(path: str) -> List[Dict]:
+  """GeoJSON-like geometries of a shapefile, in the file's own CRS."""
+  reader = shapefile.Reader(path)
+  try:
+    return [shape.__geo_interface__ for shape in reader.shapes() if shape.points]
+  finally:
+    reader.close()
+
+
+def _read_shapefile_features(path: str) -> Tuple[Optional[CRS], List[Tuple[Dict, Dict]]]:
+  prj_path = os.path.splitext(path)[0] + ".prj"
+  crs = None
+  if os.path.exists(prj_path):
+    with open(prj_path) as handle:
+      crs = CRS.from_wkt(handle.read())
+
+  reader = shapefile.Reader(path)
+  try:
+    features = []
+    for shape_record in reader.iterShapeRecords():
+      if not shape_record.shape.points:
+        continue
+      properties = {
+        key: value.isoformat() if isinstance(value, datetime.date) else value
+        for key, value in shape_record.record.as_dict().items()
+      }
+      features.append((shape_record.shape.__geo_interface__, properties))
+    return crs, features
+  finally:
+    reader.close()
+
+
+def simplify_line(points: np.ndarray, tolerance: float) -> np.ndarray:
+  """Douglas-Peucker over an (n, 2) array, always keeping both endpoints."""
+  if tolerance <= 0 or len(points) <= 4:
+    return points
+
+  keep = np.zeros(len(points), dtype=bool)
+  keep[0] = keep[-1] = True
+  stack = [(0, len(points) - 1)]
+  while stack:
+    start, end = stack.pop()
+    if end <= start + 1:
+      continue
+    a, b = points[start], points[end]
+    segment = points[start + 1:end]
+    direction = b - a
+    length = math.hypot(direction[0], direction[1])
+    if length == 0:
+      distances = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+    else:
+      distances = np.abs(direction[0] * (segment[:, 1] - a[1]) - direction[1] * (segment[:, 0] - a[0])) / length
+    farthest = int(np.argmax(distances))
+    if distances[farthest] > tolerance:
+      split = start + 1 + farthest
+      keep[split] = True
+      stack.append((start, split))
+      stack.append((split, end))
+  return points[keep]
+
+
+def _polygons(geometry: Dict) -> List[List[np.ndarray]]:
+  if geometry["type"] == "Polygon":
+    parts = [geometry["coordinates"]]
+  elif geometry["type"] == "MultiPolygon":
+    parts = geometry["coordinates"]
+  else:
+    return []
+  return [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon] for polygon in parts]
+
+
+def _simplify_and_project(geometry: Dict, src_crs: Optional[CRS], tolerance: float, decimals: int) -> Optional[Dict]:
+  polygons = []
+  for rings in _polygons(geometry):
+    simplified = []
+    for ring_number, ring in enumerate(rings):
+      ring = simplify_line(ring, tolerance)
+      if len(ring) < 4:
+        if ring_number == 0:
+          break  # Outer ring collapsed; drop the whole part
+        continue
+      if src_crs is not None:
+        lngs, lats = transform(src_crs, WGS84, ring[:, 0], ring[:, 1])
+        ring = np.column_stack([lngs, lats])
+      simplified.append(np.round(ring, decimals).tolist())
+    if simplified:
+      polygons.append(simplified)
+
+  if not polygons:
+    return None
+  if len(polygons) == 1:
+    return {"type": "Polygon", "coordinates": polygons[0]}
+  return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _source_tolerance(src_crs: Optional[CRS], features: List[Tuple[Dict, Dict]], tolerance: float) -> float:
+  """
+  Converts a Web Mercator tolerance into the shapefile's CRS units at the
+  features' latitude. Mercator stretches distances by 1/cos(latitude), so
+  the ground distance is the Mercator one times cos(latitude). Shapefiles
+  without a .prj are taken to be in degrees.
+  """
+  rings = [ring for geometry, _ in features for polygon in _polygons(geometry) for ring in polygon]
+  if not tolerance or not rings:
+    return tolerance
+  points = np.concatenate(rings)
+  x, y = (points.min(axis=0) + points.max(axis=0)) / 2
+  if src_crs is None or src_crs.is_geographic:
+    return tolerance * math.cos(math.radians(y)) / METERS_PER_DEGREE
+  _, lats = transform(src_crs, WGS84, [x], [y])
+  return tolerance * math.cos(math.radians(lats[0])) / src_crs.linear_units_factor[1]
+
+
+def tolerance_level(zoom: Optional[int], tolerance: Optional[float]) -> int:
+  """
+  Maps a requested zoom or tolerance (Web Mercator meters) onto the precomputed ladder.
+  Returns the ladder index, or -1 for full resolution.
+  """
+  if zoom is not None:
+    return min(max(zoom, 0), MAX_SIMPLIFY_ZOOM)
+  if tolerance:
+    # Coarsest precomputed level that is still at least as detailed as asked
+    for level, level_tolerance in enumerate(ZOOM_TOLERANCES):
+      if level_tolerance <= tolerance:
+        return level
+  return -1
+
+
+class VectorPayload:
+  """
+  A serialized GeoJSON FeatureCollection, kept plain and gzip-compressed.
+  The two bodies are different representations, so each has its own ETag.
+  """
+
+  def __init__(self, collection: Dict):
+    self.body = json.dumps(collection, separators=(",", ":")).encode("utf-8")
+    self.gzipped = gzip.compress(self.body, compresslevel=6)
+    digest = hashlib.sha1(self.body).hexdigest()[:20]
+    self.etag = f'"{digest}"'
+    self.gzip_etag = f'"{digest}-gzip"'
+    self.feature_count = len(collection["features"])
+
+
+@lru_cache(maxsize=512)
+def load_vector_payload(path: str, mtime_ns: int, level: int) -> VectorPayload:
+  """
+  Builds the GeoJSON (WGS84) for a shapefile at one simplification level.
+  Memoized on (path, mtime, level), so each level is simplified, quantized,
+  serialized and compressed once per file version. The ladder is in Web
+  Mercator meters; simplification runs in the shapefile's own CRS.
+  """
+  src_crs, features = _read_shapefile_features(path)
+  tolerance = ZOOM_TOLERANCES[level] if level >= 0 else 0.0
+  source_tolerance = _source_tolerance(src_crs, features, tolerance)
+  # Keep roughly one decimal place finer than the tolerance, in degrees.
+  precision = tolerance / METERS_PER_DEGREE if tolerance else 1e-6
+  decimals = min(7, max(3, math.ceil(-math.log10(precision)) + 1))
+
+  collection_features = []
+  for geometry, properties in features:
+    projected = _simplify_and_project(geometry, src_crs, source_tolerance, decimals)
+    if projected:
+      collection_features.append({"type": "Feature", "geometry": projected, "properties": properties})
+
+  return VectorPayload({
+    "type": "FeatureCollection",
+    "features": collection_features,
+    "simplification": {
+      "level": level if level >= 0 else None,
+      "toleranceMeters": round(tolerance, 2),
+      "decimals": decimals,
+    },
+  })
@@ -276,475 +276,59 @@ const renderFirePins = (fires) => {
   });
 };
 
-// Function to render MTBS burn severity raster
-const renderBurnSeverityRaster = async (fireId) => {
-  // Check if georaster libraries are loaded
-  const parseGeorasterFn = window.parseGeoraster || (window.georaster && window.georaster.parseGeoraster);
-  const GeoRasterLayerClass = window.GeoRasterLayer || (window.georasterLayerForLeaflet && window.georasterLayerForLeaflet.GeoRasterLayer);
-  
-  if (!parseGeorasterFn || !GeoRasterLayerClass) {
-    console.error('Georaster libraries not loaded. Available globals:', Object.keys(window).filter(k => k.toLowerCase().includes('georaster')));
-    console.error('parseGeoraster available:', !!parseGeorasterFn);
-    console.error('GeoRasterLayer available:', !!GeoRasterLayerClass);
-    return;
-  }
-  
-  // Define MTBS Albers Conical Equal Area projection (if proj4 is available)
-  // MTBS uses: Albers Conical Equal Area with standard parallels 29.5 and 45.5, central meridian -96.0
-  if (typeof proj4 !== 'undefined') {
-    // EPSG:5070 is USA_Contiguous_Albers_Equal_Area_Conic
-    // But MTBS uses custom parameters, so we'll define it
-    try {
-      proj4.defs('ESRI:102003', '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs');
-      console.log('MTBS Albers projection defined');
-    } catch (e) {
-      console.warn('Could not define projection:', e);
-    }
-  }
-  
-  // Clear existing raster layer - AGGRESSIVE CLEARING
-  if (rasterLayers.burnSeverity) {
+// Render an MTBS raster from server-side XYZ tiles. The backend reprojects
+// and colormaps each product, so the browser only fetches the tiles in view.
+const renderRasterTiles = (key, tileLayerName, fireId) => {
+  const group = featureLayerGroups[key];
+
+  // Clear existing raster layer
+  if (rasterLayers[key]) {
     try {
-      // Remove from map directly if it's there
-      if (map.hasLayer(rasterLayers.burnSeverity)) {
-        map.removeLayer(rasterLayers.burnSeverity);
+      if (map.hasLayer(rasterLayers[key])) {
+        map.removeLayer(rasterLayers[key]);
       }
-      // Remove from group
-      if (featureLayerGroups.burnSeverity.hasLayer(rasterLayers.burnSeverity)) {
-        featureLayerGroups.burnSeverity.removeLayer(rasterLayers.burnSeverity);
+      if (group.hasLayer(rasterLayers[key])) {
+        group.removeLayer(rasterLayers[key]);
       }
     } catch (e) {
-      console.warn('Error clearing burn severity raster:', e);
+      console.warn(`Error clearing ${key} raster:`, e);
     }
-    rasterLayers.burnSeverity = null;
+    rasterLayers[key] = null;
   }
-  
+
   // Clear any existing circles and all layers from group
-  featureLayerGroups.burnSeverity.clearLayers();
-  
-  // Ensure group is removed from map before adding new layer
-  if (map.hasLayer(featureLayerGroups.burnSeverity)) {
-    map.removeLayer(featureLayerGroups.burnSeverity);
-  }
-  
-  try {
-    console.log('Loading MTBS burn severity raster for fire:', fireId);
-    // Load GeoTIFF from backend
-    const response = await fetch(`${API_BASE_URL}/api/burn-severity/${fireId}.tif`);
-    
-    if (!response.ok) {
-      console.warn('MTBS raster not available (status:', response.status, '), using fallback circles');
-      return; // Will fall back to circles
-    }
-    
-    const arrayBuffer = await response.arrayBuffer();
-    console.log('GeoTIFF loaded, size:', arrayBuffer.byteLength, 'bytes');
-    
-    // IMPORTANT: Define MTBS projection BEFORE parsing georaster
-    // GeoRasterLayer needs the projection to be defined in proj4 during initialization
-    if (typeof proj4 !== 'undefined') {
-      // MTBS Albers Conical Equal Area projection definition
-      // From metadata: standard parallels 29.5 and 45.5, central meridian -96.0, latitude of origin 23.0
-      const mtbsAlbersDef = '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs';
-      
-      // Define in multiple formats that GeoRasterLayer might look for
-      const projectionCodes = [
-        '32767',           // Numeric code as string (common for user-defined)
-        'EPSG:32767',      // EPSG format
-        'EPSG:5070',       // USA Contiguous Albers (similar parameters)
-        'ESRI:102003',     // ESRI Albers code
-        'MTBS_ALBERS'      // Custom name
-      ];
-      
-      projectionCodes.forEach(code => {
-        if (!proj4.defs(code)) {
-          proj4.defs(code, mtbsAlbersDef);
-          console.log(`Defined projection: ${code}`);
-        }
-      });
-    }
-    
-    // Now parse the georaster (GeoRasterLayer will use the projection we just defined)
-    const georaster = await parseGeorasterFn(arrayBuffer);
-    console.log('Georaster parsed successfully:', {
-      width: georaster.width,
-      height: georaster.height,
-      pixelWidth: georaster.pixelWidth,
-      pixelHeight: georaster.pixelHeight,
-      projection: georaster.projection,
-      noDataValue: georaster.noDataValue
-    });
-    
-    // If georaster has a numeric projection code, convert it to string format
-    // GeoRasterLayer expects projection codes as strings that proj4 can recognize
-    if (georaster.projection && typeof georaster.projection === 'number') {
-      const projCode = georaster.projection;
-      console.log('Numeric projection code detected:', projCode);
-      // Convert to string format - GeoRasterLayer will look for this in proj4
-      // We've already defined it as both "32767" and "EPSG:32767"
-      georaster.projection = String(projCode);
-      console.log('Converted projection to string:', georaster.projection);
-    } else if (georaster.projection && typeof georaster.projection === 'string') {
-      console.log('Projection code is already a string:', georaster.projection);
-    }
-    
-    // MTBS 6-Class Burn Severity Color Map
-    const mtbsColorMap = {
-      0: [255, 255, 255, 0],      // Unburned - transparent
-      1: [0, 100, 0, 200],        // Low severity - dark green
-      2: [144, 238, 144, 200],    // Low-Moderate - light green
-      3: [255, 255, 0, 200],      // Moderate - yellow
-      4: [255, 165, 0, 200],      // High - orange
-      5: [255, 0, 0, 200],        // High (increased) - red
-    };
-    
-    // Create raster layer with exact pixel mapping
-    // GeoRasterLayer will automatically handle projection conversion using proj4
-    // It reads projection from georaster and converts to Web Mercator (Leaflet's default)
-    const rasterLayer = new GeoRasterLayerClass({
-      georaster: georaster,
-      opacity: 0.7,  // Semi-transparent overlay
-      pixelValuesToColorFn: (values) => {
-        const severity = Math.round(values[0]); // Get severity value (0-5)
-        return mtbsColorMap[severity] || [255, 255, 255, 0];
-      },
-      resolution: 256,  // Higher = more detail
-      updateWhenIdle: true,  // Update when idle to prevent tile caching issues
-      keepBuffer: 0  // Don't keep buffer - ensures clean switching
-      // Note: GeoRasterLayer automatically reads projection from georaster
-      // and uses proj4 to convert to Web Mercator for Leaflet
-    });
-    
-    rasterLayer.addTo(featureLayerGroups.burnSeverity);
-    rasterLayers.burnSeverity = rasterLayer;
-    
-    console.log('MTBS burn severity raster layer added to map successfully');
-    
-    // Force map refresh to ensure new layer is visible at all zoom levels
-    map.invalidateSize();
-    
-    // Ensure layer is visible
-    syncLayerVisibility();
-    
-  } catch (error) {
-    console.error('Failed to load MTBS burn severity raster:', error);
-    console.error('Error details:', error.message, error.stack);
-    // Fallback: will use circles from backend
+  group.clearLayers();
+  if (map.hasLayer(group)) {
+    map.removeLayer(group);
   }
+
+  const rasterLayer = L.tileLayer(`${API_BASE_URL}/api/tiles/${tileLayerName}/${fireId}/{z}/{x}/{y}.png`, {
+    opacity: 0.7,  // Semi-transparent overlay
+    maxZoom: 18,
+    updateWhenIdle: true,
+    keepBuffer: 0,  // Don't keep buffer - ensures clean switching
+  });
+
+  rasterLayer.addTo(group);
+  rasterLayers[key] = rasterLayer;
+
+  // Ensure layer is visible
+  syncLayerVisibility();
+};
+
+// Function to render MTBS burn severity raster
+const renderBurnSeverityRaster = async (fireId) => {
+  renderRasterTiles('burnSeverity', 'burn-severity', fireId);
 };
 
-// Function to render reburn risk raster - EXACTLY like burn severity, just different image
+// Function to render reburn risk raster
 const renderReburnRiskRaster = async (fireId) => {
-  // Check if georaster libraries are loaded
-  const parseGeorasterFn = window.parseGeoraster || (window.georaster && window.georaster.parseGeoraster);
-  const GeoRasterLayerClass = window.GeoRasterLayer || (window.georasterLayerForLeaflet && window.georasterLayerForLeaflet.GeoRasterLayer);
-  
-  if (!parseGeorasterFn || !GeoRasterLayerClass) {
-    console.error('Georaster libraries not loaded. Available globals:', Object.keys(window).filter(k => k.toLowerCase().includes('georaster')));
-    console.error('parseGeoraster available:', !!parseGeorasterFn);
-    console.error('GeoRasterLayer available:', !!GeoRasterLayerClass);
-    return;
-  }
-  
-  // Define MTBS Albers Conical Equal Area projection (if proj4 is available)
-  // MTBS uses: Albers Conical Equal Area with standard parallels 29.5 and 45.5, central meridian -96.0
-  if (typeof proj4 !== 'undefined') {
-    // EPSG:5070 is USA_Contiguous_Albers_Equal_Area_Conic
-    // But MTBS uses custom parameters, so we'll define it
-    try {
-      proj4.defs('ESRI:102003', '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs');
-      console.log('MTBS Albers projection defined');
-    } catch (e) {
-      console.warn('Could not define projection:', e);
-    }
-  }
-  
-  // Clear existing raster layer - AGGRESSIVE CLEARING
-  if (rasterLayers.reburnRisk) {
-    try {
-      // Remove from map directly if it's there
-      if (map.hasLayer(rasterLayers.reburnRisk)) {
-        map.removeLayer(rasterLayers.reburnRisk);
-      }
-      // Remove from group
-      if (featureLayerGroups.reburnRisk.hasLayer(rasterLayers.reburnRisk)) {
-        featureLayerGroups.reburnRisk.removeLayer(rasterLayers.reburnRisk);
-      }
-    } catch (e) {
-      console.warn('Error clearing reburn risk raster:', e);
-    }
-    rasterLayers.reburnRisk = null;
-  }
-  
-  // Clear any existing circles and all layers from group
-  featureLayerGroups.reburnRisk.clearLayers();
-  
-  // Ensure group is removed from map before adding new layer
-  if (map.hasLayer(featureLayerGroups.reburnRisk)) {
-    map.removeLayer(featureLayerGroups.reburnRisk);
-  }
-  
-  try {
-    console.log('Loading reburn risk raster for fire:', fireId);
-    // Load GeoTIFF from backend
-    const response = await fetch(`${API_BASE_URL}/api/reburn-risk/${fireId}.tif`);
-    
-    if (!response.ok) {
-      console.warn('Reburn risk raster not available (status:', response.status, '), using fallback circles');
-      return; // Will fall back to circles
-    }
-    
-    const arrayBuffer = await response.arrayBuffer();
-    console.log('GeoTIFF loaded, size:', arrayBuffer.byteLength, 'bytes');
-    
-    // IMPORTANT: Define MTBS projection BEFORE parsing georaster
-    // GeoRasterLayer needs the projection to be defined in proj4 during initialization
-    if (typeof proj4 !== 'undefined') {
-      // MTBS Albers Conical Equal Area projection definition
-      // From metadata: standard parallels 29.5 and 45.5, central meridian -96.0, latitude of origin 23.0
-      const mtbsAlbersDef = '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs';
-      
-      // Define in multiple formats that GeoRasterLayer might look for
-      const projectionCodes = [
-        '32767',           // Numeric code as string (common for user-defined)
-        'EPSG:32767',      // EPSG format
-        'EPSG:5070',       // USA Contiguous Albers (similar parameters)
-        'ESRI:102003',     // ESRI Albers code
-        'MTBS_ALBERS'      // Custom name
-      ];
-      
-      projectionCodes.forEach(code => {
-        if (!proj4.defs(code)) {
-          proj4.defs(code, mtbsAlbersDef);
-          console.log(`Defined projection: ${code}`);
-        }
-      });
-    }
-    
-    // Now parse the georaster (GeoRasterLayer will use the projection we just defined)
-    const georaster = await parseGeorasterFn(arrayBuffer);
-    console.log('Georaster parsed successfully:', {
-      width: georaster.width,
-      height: georaster.height,
-      pixelWidth: georaster.pixelWidth,
-      pixelHeight: georaster.pixelHeight,
-      projection: georaster.projection,
-      noDataValue: georaster.noDataValue
-    });
-    
-    // If georaster has a numeric projection code, convert it to string format
-    // GeoRasterLayer expects projection codes as strings that proj4 can recognize
-    if (georaster.projection && typeof georaster.projection === 'number') {
-      const projCode = georaster.projection;
-      console.log('Numeric projection code detected:', projCode);
-      // Convert to string format - GeoRasterLayer will look for this in proj4
-      // We've already defined it as both "32767" and "EPSG:32767"
-      georaster.projection = String(projCode);
-      console.log('Converted projection to string:', georaster.projection);
-    } else if (georaster.projection && typeof georaster.projection === 'string') {
-      console.log('Projection code is already a string:', georaster.projection);
-    }
-    
-    // Reburn Risk Color Map: 0=Low (green), 1=Medium (orange), 2=High (red), 255=NoData/Unburned (transparent)
-    const reburnColorMap = {
-      0: [0, 153, 0, 200],        // Low - green
-      1: [255, 165, 0, 200],      // Medium - orange
-      2: [255, 0, 0, 200],        // High - red
-      255: [255, 255, 255, 0],    // NoData/Unburned - transparent
-    };
-    
-    // Create raster layer with exact pixel mapping
-    // GeoRasterLayer will automatically handle projection conversion using proj4
-    // It reads projection from georaster and converts to Web Mercator (Leaflet's default)
-    const rasterLayer = new GeoRasterLayerClass({
-      georaster: georaster,
-      opacity: 0.7,  // Semi-transparent overlay
-      pixelValuesToColorFn: (values) => {
-        const risk = Math.round(values[0]); // Get risk value (0-2, or 255 for NoData)
-        return reburnColorMap[risk] || [255, 255, 255, 0];
-      },
-      resolution: 256,  // Higher = more detail
-      updateWhenIdle: true,  // Update when idle to prevent tile caching issues
-      keepBuffer: 0  // Don't keep buffer - ensures clean switching
-      // Note: GeoRasterLayer automatically reads projection from georaster
-      // and uses proj4 to convert to Web Mercator for Leaflet
-    });
-    
-    rasterLayer.addTo(featureLayerGroups.reburnRisk);
-    rasterLayers.reburnRisk = rasterLayer;
-    
-    console.log('Reburn risk raster layer added to map successfully');
-    
-    // Force map refresh to ensure new layer is visible at all zoom levels
-    map.invalidateSize();
-    
-    // Ensure layer is visible
-    syncLayerVisibility();
-    
-  } catch (error) {
-    console.error('Failed to load reburn risk raster:', error);
-    console.error('Error details:', error.message, error.stack);
-    // Fallback: will use circles from backend
-  }
+  renderRasterTiles('reburnRisk', 'reburn-risk', fireId);
 };
 
-// Function to render best next steps raster - EXACTLY like burn severity, just different image
+// Function to render best next steps raster (grid-based)
 const renderBestNextStepsRaster = async (fireId) => {
-  // Check if georaster libraries are loaded
-  const parseGeorasterFn = window.parseGeoraster || (window.georaster && window.georaster.parseGeoraster);
-  const GeoRasterLayerClass = window.GeoRasterLayer || (window.georasterLayerForLeaflet && window.georasterLayerForLeaflet.GeoRasterLayer);
-  
-  if (!parseGeorasterFn || !GeoRasterLayerClass) {
-    console.error('Georaster libraries not loaded. Available globals:', Object.keys(window).filter(k => k.toLowerCase().includes('georaster')));
-    console.error('parseGeoraster available:', !!parseGeorasterFn);
-    console.error('GeoRasterLayer available:', !!GeoRasterLayerClass);
-    return;
-  }
-  
-  // Define MTBS Albers Conical Equal Area projection (if proj4 is available)
-  // MTBS uses: Albers Conical Equal Area with standard parallels 29.5 and 45.5, central meridian -96.0
-  if (typeof proj4 !== 'undefined') {
-    // EPSG:5070 is USA_Contiguous_Albers_Equal_Area_Conic
-    // But MTBS uses custom parameters, so we'll define it
-    try {
-      proj4.defs('ESRI:102003', '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs');
-      console.log('MTBS Albers projection defined');
-    } catch (e) {
-      console.warn('Could not define projection:', e);
-    }
-  }
-  
-  // Clear existing raster layer - AGGRESSIVE CLEARING
-  if (rasterLayers.bestNextSteps) {
-    try {
-      // Remove from map directly if it's there
-      if (map.hasLayer(rasterLayers.bestNextSteps)) {
-        map.removeLayer(rasterLayers.bestNextSteps);
-      }
-      // Remove from group
-      if (featureLayerGroups.bestNextSteps.hasLayer(rasterLayers.bestNextSteps)) {
-        featureLayerGroups.bestNextSteps.removeLayer(rasterLayers.bestNextSteps);
-      }
-    } catch (e) {
-      console.warn('Error clearing best next steps raster:', e);
-    }
-    rasterLayers.bestNextSteps = null;
-  }
-  
-  // Clear any existing circles and all layers from group
-  featureLayerGroups.bestNextSteps.clearLayers();
-  
-  // Ensure group is removed from map before adding new layer
-  if (map.hasLayer(featureLayerGroups.bestNextSteps)) {
-    map.removeLayer(featureLayerGroups.bestNextSteps);
-  }
-  
-  try {
-    console.log('Loading best next steps raster for fire:', fireId);
-    // Load GeoTIFF from backend
-    const response = await fetch(`${API_BASE_URL}/api/best-next-steps/${fireId}.tif`);
-    
-    if (!response.ok) {
-      console.warn('Best next steps raster not available (status:', response.status, '), using fallback circles');
-      return; // Will fall back to circles
-    }
-    
-    const arrayBuffer = await response.arrayBuffer();
-    console.log('GeoTIFF loaded, size:', arrayBuffer.byteLength, 'bytes');
-    
-    // IMPORTANT: Define MTBS projection BEFORE parsing georaster
-    // GeoRasterLayer needs the projection to be defined in proj4 during initialization
-    if (typeof proj4 !== 'undefined') {
-      // MTBS Albers Conical Equal Area projection definition
-      // From metadata: standard parallels 29.5 and 45.5, central meridian -96.0, latitude of origin 23.0
-      const mtbsAlbersDef = '+proj=aea +lat_1=29.5 +lat_2=45.5 +lat_0=23.0 +lon_0=-96.0 +x_0=0 +y_0=0 +datum=NAD83 +units=m +no_defs';
-      
-      // Define in multiple formats that GeoRasterLayer might look for
-      const projectionCodes = [
-        '32767',           // Numeric code as string (common for user-defined)
-        'EPSG:32767',      // EPSG format
-        'EPSG:5070',       // USA Contiguous Albers (similar parameters)
-        'ESRI:102003',     // ESRI Albers code
-        'MTBS_ALBERS'      // Custom name
-      ];
-      
-      projectionCodes.forEach(code => {
-        if (!proj4.defs(code)) {
-          proj4.defs(code, mtbsAlbersDef);
-          console.log(`Defined projection: ${code}`);
-        }
-      });
-    }
-    
-    // Now parse the georaster (GeoRasterLayer will use the projection we just defined)
-    const georaster = await parseGeorasterFn(arrayBuffer);
-    console.log('Georaster parsed successfully:', {
-      width: georaster.width,
-      height: georaster.height,
-      pixelWidth: georaster.pixelWidth,
-      pixelHeight: georaster.pixelHeight,
-      projection: georaster.projection,
-      noDataValue: georaster.noDataValue
-    });
-    
-    // If georaster has a numeric projection code, convert it to string format
-    // GeoRasterLayer expects projection codes as strings that proj4 can recognize
-    if (georaster.projection && typeof georaster.projection === 'number') {
-      const projCode = georaster.projection;
-      console.log('Numeric projection code detected:', projCode);
-      // Convert to string format - GeoRasterLayer will look for this in proj4
-      // We've already defined it as both "32767" and "EPSG:32767"
-      georaster.projection = String(projCode);
-      console.log('Converted projection to string:', georaster.projection);
-    } else if (georaster.projection && typeof georaster.projection === 'string') {
-      console.log('Projection code is already a string:', georaster.projection);
-    }
-    
-    // Best Next Steps Color Map
-    const stepsColorMap = {
-      0: [128, 128, 128, 200],    // Abandon/Monitor - gray
-      1: [255, 255, 0, 200],      // Fuel Reduction - yellow
-      2: [0, 102, 0, 200],        // Reforest - dark green
-      3: [153, 102, 51, 200],     // Soil Stabilization - brown
-      255: [255, 255, 255, 0],   // NoData - transparent
-    };
-    
-    // Create raster layer with exact pixel mapping
-    // GeoRasterLayer will automatically handle projection conversion using proj4
-    // It reads projection from georaster and converts to Web Mercator (Leaflet's default)
-    const rasterLayer = new GeoRasterLayerClass({
-      georaster: georaster,
-      opacity: 0.7,  // Semi-transparent overlay
-      pixelValuesToColorFn: (values) => {
-        const step = Math.round(values[0]); // Get step value (0-3, or 255 for NoData)
-        if (step === 255 || isNaN(step)) {
-          return [255, 255, 255, 0]; // Transparent
-        }
-        return stepsColorMap[step] || [255, 255, 255, 0];
-      },
-      resolution: 256,  // Higher = more detail
-      updateWhenIdle: true,  // Update when idle to prevent tile caching issues
-      keepBuffer: 0  // Don't keep buffer - ensures clean switching
-      // Note: GeoRasterLayer automatically reads projection from georaster
-      // and uses proj4 to convert to Web Mercator for Leaflet
-    });
-    
-    rasterLayer.addTo(featureLayerGroups.bestNextSteps);
-    rasterLayers.bestNextSteps = rasterLayer;
-    
-    console.log('Best next steps raster layer added to map successfully');
-    
-    // Force map refresh to ensure new layer is visible at all zoom levels
-    map.invalidateSize();
-    
-    // Ensure layer is visible
-    syncLayerVisibility();
-    
-  } catch (error) {
-    console.error('Failed to load best next steps raster:', error);
-    console.error('Error details:', error.message, error.stack);
-    // Fallback: will use circles from backend
-  }
+  renderRasterTiles('bestNextSteps', 'best-next-steps', fireId);
 };
 
 const renderLayerGroup = async (key, features = []) => {